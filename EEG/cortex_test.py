@@ -1,18 +1,40 @@
-import websocket
+import asyncio
 import json
 import time
 import csv
-import ssl
 import traceback
 import sys
 import os
+from contextlib import nullcontext
+import numpy as np
+
+# Shared EEG helpers live in ml_model/eeg_realtime
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ml_model"))
+from eeg_realtime.band_power_ring import BandPowerRing, DEFAULT_CAPACITY
+from eeg_realtime.frame_writer import GroupCommitWriter
+from eeg_realtime.cortex_client import CortexClient, CortexError
+from eeg_realtime.pow_decoder import PowDecoder
+from eeg_realtime import json_codec
 
 APP_CLIENT_ID = "FgVsoeJ5NktN4sxZPSaG0noURJmTH0CXug09aEHW"  # your Client ID
 APP_CLIENT_SECRET = "pSAxu4ZKFuatiH244Ecxjv0AwcNHwibDIqUsGo55Z6kHsOn2dEoFIJlyHY543r5vwknL5Pi8fa6Oeu2QSCe5neUIrYCzvoDBAKspgsJmICaeWzfU5QnTDPwvTg8suR9f"
 APP_ID = "com.aman6.eeg_capstone_disabled"
 CSV_FILE = "eeg_live_data.csv"
-
-DEBUG = True
+# Binary ring of pow frames read by the Flask server (/latest_avg_eeg)
+RING_FILE = "eeg_live_ring.bin"
+RING_CAPACITY = DEFAULT_CAPACITY
+# Text CSV is an optional export (EEG_EXPORT_CSV=0 to disable)
+EXPORT_CSV = os.getenv("EEG_EXPORT_CSV", "1") != "0"
+
+# Persistence runs on a background thread; frames are fsynced in groups
+FSYNC_INTERVAL_MS = float(os.getenv("EEG_FSYNC_INTERVAL_MS", "500"))
+FSYNC_EVERY_FRAMES = int(os.getenv("EEG_FSYNC_EVERY_FRAMES", "50"))
+WRITE_QUEUE_SIZE = 1024
+# Quiet mode: no per-frame output, only a summary every SUMMARY_INTERVAL seconds
+QUIET = os.getenv("EEG_QUIET", "0") == "1"
+SUMMARY_INTERVAL = 5.0
+
+DEBUG = not QUIET
 TRUNCATE_LEN = 1000
 
 def pretty(msg):
@@ -30,123 +52,62 @@ def log_raw(prefix, raw):
     if DEBUG:
         print(f"{prefix} (len={len(raw)}): {raw[:TRUNCATE_LEN]}{'...' if len(raw)>TRUNCATE_LEN else ''}")
 
-def send(ws, msg, debug=True):
-    ws.send(json.dumps(msg))
-    if debug:
-        print("[->]", msg)
-    # read responses until we get a valid JSON object (skip pings/empty)
-    while True:
-        try:
-            raw = ws.recv()
-            if not raw:
-                continue
-            log_raw("[<- raw]", raw)
-            data = json.loads(raw)
-            if debug:
-                print("[<- parsed]", data)
-            return data
-        except ValueError:
-            # non-json or partial message, continue reading
-            if DEBUG:
-                print("[<-] Partial/non-json message, continuing read")
-            continue
-        except Exception as e:
-            print("recv error:", e)
-            raise
-
-def main():
+async def main():
+    client = CortexClient(APP_CLIENT_ID, APP_CLIENT_SECRET)
     try:
         print("[*] Connecting to Cortex service...")
-        # ignore cert checks for local dev if Cortex uses self-signed cert
-        ws = websocket.create_connection("wss://localhost:6868", sslopt={"cert_reqs": ssl.CERT_NONE})
-        ws.settimeout(10)
+        # the client ignores cert checks: Cortex uses a self-signed cert on localhost
+        await client.connect()
         print("[+] Connected!")
 
-        # Step 1: Get Cortex Info
-        msg = {"id": 1, "jsonrpc": "2.0", "method": "getCortexInfo"}
-        resp = send(ws, msg)
-        print("getCortexInfo result keys:", list(resp.keys()))
-
-        # Step 2: Request Access
-        msg = {
-            "id": 2,
-            "jsonrpc": "2.0",
-            "method": "requestAccess",
-            "params": {"clientId": APP_CLIENT_ID, "clientSecret": APP_CLIENT_SECRET}
-        }
-        resp = send(ws, msg)
-        print("requestAccess:", resp)
-
-        # Step 3: Authorize
-        msg = {
-            "id": 3,
-            "jsonrpc": "2.0",
-            "method": "authorize",
-            "params": {"clientId": APP_CLIENT_ID, "clientSecret": APP_CLIENT_SECRET}
-        }
-        resp = send(ws, msg)
-        print("authorize:", resp)
-        if "result" not in resp or "cortexToken" not in resp["result"]:
-            print("Authorization failure (no cortexToken). Full resp:")
-            print(pretty(resp))
-            return
-        cortex_token = resp["result"]["cortexToken"]
-        print("[+] Authorized — token received (len):", len(cortex_token))
-
-        # Step 4: Query Headset
-        msg = {"id": 4, "jsonrpc": "2.0", "method": "queryHeadsets"}
-        headsets = send(ws, msg)
-        print("queryHeadsets:", pretty(headsets))
-        if not headsets.get("result"):
-            print("No headsets found:", headsets)
-            return
-        headset_list = headsets["result"]
-        if len(headset_list) == 0:
-            print("No headsets connected. Please pair/connect the headset.")
-            return
-        headset_id = headset_list[0]["id"]
-        print(f"[+] Headset found: {headset_id}")
-
-        # Step 5: Create Session
-        msg = {
-            "id": 5,
-            "jsonrpc": "2.0",
-            "method": "createSession",
-            "params": {"cortexToken": cortex_token, "headset": headset_id, "status": "open"}
-        }
-        resp = send(ws, msg)
-        print("createSession:", pretty(resp))
-        if "result" not in resp:
-            print("createSession failed:", resp)
+        # Steps 1-6: authorize + query headsets (concurrently), create session, subscribe to 'pow'
+        started = time.perf_counter()
+        try:
+            session = await client.handshake(["pow"])
+        except CortexError as e:
+            print(f"[!] Handshake failed at {e.method}:")
+            print(pretty(e.error))
             return
-        session_id = resp["result"]["id"]
-        print(f"[+] Session created: {session_id}")
-
-        # Step 6: Subscribe to 'pow' (band power)
-        msg = {
-            "id": 6,
-            "jsonrpc": "2.0",
-            "method": "subscribe",
-            "params": {"cortexToken": cortex_token, "session": session_id, "streams": ["pow"]}
-        }
-        resp = send(ws, msg)
-        print("subscribe response:", pretty(resp))
-        # Check common success indicators
-        if resp.get("result") or (isinstance(resp.get("success"), bool) and resp["success"]):
-            print("[+] Subscribe reported success (result present).")
-        elif resp.get("error"):
-            print("[!] Subscribe error:", pretty(resp["error"]))
-        else:
-            print("[!] Subscribe response ambiguous; watch incoming messages for confirmation.")
+        print(f"[+] Authorized — token received (len): {len(session.token)}")
+        print(f"[+] Headset found: {session.headset_id}")
+        print(f"[+] Session created: {session.session_id}")
+        print(f"[+] Handshake took {(time.perf_counter() - started) * 1000:.0f} ms")
+        if DEBUG:
+            print("pow cols:", session.cols.get("pow"))
 
         print("[+] Subscribed to EEG Power Bands stream.")
-
-        # Step 7: Prepare CSV
-        with open(CSV_FILE, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(["Timestamp", "SID", "Channel", "Band", "Value"])
-            f.flush()
-            os.fsync(f.fileno())
+        pow_queue = client.stream("pow")
+
+        # Step 7: Prepare ring buffer and (optional) CSV
+        ring = BandPowerRing.create(RING_FILE, capacity=RING_CAPACITY)
+        print(f"[+] Writing pow frames to ring buffer {RING_FILE} (capacity {RING_CAPACITY} frames)")
+        with (open(CSV_FILE, "w", newline="") if EXPORT_CSV else nullcontext()) as f:
+            writer = csv.writer(f) if f else None
+            if writer:
+                writer.writerow(["Timestamp", "SID", "Channel", "Band", "Value"])
+                f.flush()
+                os.fsync(f.fileno())
+
+            def write_frame(item):
+                """Persist one pow frame (runs on the writer thread)"""
+                timestamp, sid, frame, rows = item
+                ring.write(float(timestamp), frame)
+                if writer:
+                    writer.writerows(rows)
+
+            def sync_frames():
+                ring.flush()
+                if f:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            frame_writer = GroupCommitWriter(
+                write_frame, sync_frames,
+                sync_interval_ms=FSYNC_INTERVAL_MS,
+                sync_every_frames=FSYNC_EVERY_FRAMES,
+                max_queue=WRITE_QUEUE_SIZE
+            )
+            last_summary = time.time()
 
             print("\n--- Live EEG Data Stream --- (Press Ctrl+C to stop)\n")
             incoming_count = 0
@@ -156,149 +117,141 @@ def main():
             # adjust if your headset uses a different channel or band order
             SELECTED_CHANNELS = ["AF3", "AF4", "T7", "T8", "Pz"]
             BAND_NAMES = ["delta", "theta", "alpha", "beta", "gamma"]  # assumed ordering in pow frames
-            # accumulators: sums[channel][band] and frame counts per channel
-            sums = {ch: {b: 0.0 for b in BAND_NAMES} for ch in SELECTED_CHANNELS}
-            frame_counts = {ch: 0 for ch in SELECTED_CHANNELS}
+            # the subscription's cols header (if any) gives the real channel/band order;
+            # float64 so the CSV export keeps the values exactly as received
+            try:
+                decoder = PowDecoder(session.cols.get("pow") or None, channels=SELECTED_CHANNELS,
+                                     bands=BAND_NAMES, dtype=np.float64)
+                if decoder.n_bands != len(BAND_NAMES):
+                    raise ValueError(f"{decoder.n_bands} bands per channel, expected {len(BAND_NAMES)}")
+            except ValueError as e:
+                print(f"[!] Ignoring pow cols header ({e}); assuming channel-major frames")
+                decoder = PowDecoder(channels=SELECTED_CHANNELS, bands=BAND_NAMES, dtype=np.float64)
+            # The ring (BAND_ORDER), eeg_csv_reader and the model all name bands by position as
+            # BAND_NAMES, so the CSV does too, whatever names Cortex gives them (theta/alpha/betaL/...)
+            bands = BAND_NAMES
+            if decoder.bands != BAND_NAMES:
+                print(f"[*] pow bands {'/'.join(decoder.bands)} are stored as {'/'.join(BAND_NAMES)}")
+            # Ring and CSV hold the selected channels only, matched by name when the cols header
+            # is known; a channel the headset lacks (e.g. Pz on a 14-channel EPOC) stays NaN in
+            # the ring, is left out of the CSV and gets no frames in the averages below
+            missing = [ch for ch in SELECTED_CHANNELS if decoder.from_cols and ch not in decoder.channels]
+            if missing:
+                print(f"[!] Headset has no {', '.join(missing)} channel(s); they are left out")
+            # accumulators: sums[channel, band] and frame counts per selected channel
+            sums = np.zeros((len(SELECTED_CHANNELS), len(bands)))
+            frame_counts = np.zeros(len(SELECTED_CHANNELS), dtype=np.int64)
             total_frames = 0
             # ------------------------------------------------------
 
+            stopped_by_user = False
             try:
                 while True:
                     try:
-                        raw = ws.recv()
-                    except websocket.WebSocketTimeoutException:
-                        # ping or keepalive; continue listening
+                        data = await asyncio.wait_for(pow_queue.get(), 10)
+                    except asyncio.TimeoutError:
+                        # headset idle or disconnected; continue listening
                         if DEBUG:
-                            print("[*] recv timeout (keepalive).")
-                        continue
-                    if not raw:
+                            print("[*] no pow frame for 10s, still listening.")
                         continue
+                    if data is None:
+                        print("[!] Cortex connection closed.")
+                        break
 
                     incoming_count += 1
-                    log_raw(f"[MSG #{incoming_count} raw]", raw)
-
-                    # try parse JSON
-                    try:
-                        data = json.loads(raw)
-                    except Exception:
-                        if DEBUG:
-                            print("[!] Could not parse JSON for message #", incoming_count)
-                        continue
-
-                    # Show basic routing info
-                    if "id" in data:
-                        print(f"[RPC id={data.get('id')}] keys={list(data.keys())}")
-                    if "result" in data and not data.get("stream"):
-                        print(f"[RPC result] keys={list(data['result'].keys()) if isinstance(data['result'], dict) else type(data['result'])}")
+                    if DEBUG:
+                        log_raw(f"[MSG #{incoming_count} raw]", json_codec.dumps(data))
 
                     # Stream messages often have 'pow' key
                     if "pow" in data:
                         pow_count += 1
-                        pow_data = data["pow"]
-
-                        # Normalize different payload formats
-                        if isinstance(pow_data, dict):
-                            cols = pow_data.get("cols", [])
-                            values = pow_data.get("values", [])
-                        elif isinstance(pow_data, list) and len(pow_data) > 0 and isinstance(pow_data[0], dict):
-                            cols = pow_data[0].get("cols", [])
-                            values = pow_data[0].get("values", [])
-                        elif isinstance(pow_data, list) and all(isinstance(x, (int, float)) for x in pow_data):
-                            # flat numeric list (your current case)
-                            cols = []  # no cols provided
-                            values = [pow_data]
-                        else:
-                            cols, values = [], []
-
-                        if not values:
+                        # (n_channels, n_bands), channel-major in the subscription's cols order
+                        values = decoder.decode(data)
+                        if values is None:
                             if DEBUG:
-                                print("[*] pow message had no values, skipping")
+                                print(f"[!] pow message had no usable values (expected a multiple of {len(bands)}), skipping")
                             continue
 
                         timestamp = data.get("time", time.time())
                         sid = data.get("sid", None)
-                        display_dict = {}
-
-                        # VALUES: values[0] is the numeric list for this frame (length should be channels*bands)
-                        frame = values[0]
-                        n_vals = len(frame)
-                        n_bands = len(BAND_NAMES)
-                        # defensive check: expected 5 channels * 5 bands = 25
-                        if n_vals % n_bands != 0:
-                            if DEBUG:
-                                print(f"[!] Unexpected pow length {n_vals}, not divisible by {n_bands}")
-                        n_channels = n_vals // n_bands
-
-                        for idx, val in enumerate(frame):
-                            # determine channel/band by index
-                            ch_idx = idx // n_bands
-                            band_idx = idx % n_bands
-                            channel = SELECTED_CHANNELS[ch_idx] if ch_idx < len(SELECTED_CHANNELS) else f"Ch{ch_idx}"
-                            band = BAND_NAMES[band_idx] if band_idx < len(BAND_NAMES) else f"Band{band_idx}"
-
-                            # write CSV row
-                            writer.writerow([timestamp, sid if sid else "", channel, band, float(val)])
-
-                            # update display & accumulators only for selected channels
-                            if channel in sums:
-                                sums[channel][band] += float(val)
-                                # count frames once per channel per frame
-                                # increment frame_counts[channel] the first time we encounter that channel in this frame
-                                # (we detect that by when band_idx == 0)
-                                if band_idx == 0:
-                                    frame_counts[channel] += 1
-                            if channel not in display_dict:
-                                display_dict[channel] = {}
-                            display_dict[channel][band] = float(val)
-
+                        # selected channels in SELECTED_CHANNELS order (NaN rows = channel not in this frame)
+                        selected = decoder.project(values, SELECTED_CHANNELS)
+                        present = ~np.isnan(selected[:, 0])
+                        sums[present] += selected[present]
+                        frame_counts += present
                         total_frames += 1
 
-                        # ensure data is written to disk
-                        f.flush()
-                        os.fsync(f.fileno())
-
-                        # print summary to terminal
-                        print(f"\n--- Live EEG (pow #{pow_count}) ---")
-                        for ch in display_dict:
-                            bands = " | ".join(f"{b}:{display_dict[ch][b]:.3f}" for b in display_dict[ch])
-                            print(f"{ch:4s}: {bands}")
-
-                    else:
-                        # show other messages for debugging
-                        print(f"[MSG #{incoming_count}] non-pow message keys: {list(data.keys())}")
-
-            except KeyboardInterrupt:
-                print("\n[!] Stopped by user. Data saved to", CSV_FILE)
-                print(f"[!] messages seen: total={incoming_count}, pow={pow_count}")
-                # ---- ADDED: compute & print averages ----
-                print("\n--- AVERAGE BAND POWERS (per channel) ---")
-                for ch in SELECTED_CHANNELS:
-                    c_frames = frame_counts.get(ch, 0)
-                    if c_frames == 0:
-                        print(f"{ch}: no frames")
-                        continue
-                    print(f"{ch}: (frames={c_frames})")
-                    for b in BAND_NAMES:
-                        avg = sums[ch][b] / c_frames
-                        print(f"  {b:6s}: {avg:.4f}")
-                # overall averages across selected channels
-                print("\n--- AVERAGE BAND POWERS (across selected channels) ---")
-                for b in BAND_NAMES:
-                    total = sum(sums[ch][b] for ch in SELECTED_CHANNELS if frame_counts.get(ch,0)>0)
-                    denom = sum(frame_counts[ch] for ch in SELECTED_CHANNELS if frame_counts.get(ch,0)>0)
-                    overall_avg = total / denom if denom>0 else 0.0
-                    print(f"  {b:6s}: {overall_avg:.4f}")
-                # -------------------------------------------
-
-        ws.close()
+                        # CSV rows (written by the background writer)
+                        csv_rows = []
+                        if writer:
+                            sid_field = sid if sid else ""
+                            csv_rows = [[timestamp, sid_field, ch, band, val]
+                                        for ch, row, ok in zip(SELECTED_CHANNELS, selected.tolist(), present)
+                                        if ok
+                                        for band, val in zip(bands, row)]
+
+                        # hand the frame to the writer thread (ring buffer, CSV, grouped fsync)
+                        frame_writer.submit((timestamp, sid, selected, csv_rows))
+
+                        if not QUIET:
+                            # print summary to terminal
+                            print(f"\n--- Live EEG (pow #{pow_count}) ---")
+                            for ch, row in zip(decoder.channel_names(values.shape[0]), values.tolist()):
+                                print(f"{ch:4s}: " + " | ".join(f"{b}:{v:.3f}" for b, v in zip(bands, row)))
+                        elif time.time() - last_summary >= SUMMARY_INTERVAL:
+                            last_summary = time.time()
+                            stats = frame_writer.stats()
+                            print(f"[stats] pow frames received={stats['frames_received']} "
+                                  f"written={stats['frames_written']} syncs={stats['syncs']} "
+                                  f"queue high-water={stats['queue_high_water']} errors={stats['write_errors']}")
+
+            except (KeyboardInterrupt, asyncio.CancelledError):
+                stopped_by_user = True
+            finally:
+                # make sure queued frames reach disk before the CSV file is closed
+                frame_writer.close()
+                ring.close()
+
+            stats = frame_writer.stats()
+            print("\n[!] " + ("Stopped by user." if stopped_by_user else "Stream ended.") + " Data saved to",
+                  RING_FILE + (f" and {CSV_FILE}" if EXPORT_CSV else ""))
+            print(f"[!] messages seen: total={incoming_count}, pow={pow_count}, "
+                  f"dropped by client queue={client.dropped.get('pow', 0)}")
+            print(f"[!] frames received={stats['frames_received']}, written={stats['frames_written']}, "
+                  f"syncs={stats['syncs']}, queue high-water={stats['queue_high_water']}, "
+                  f"write errors={stats['write_errors']}")
+            # ---- ADDED: compute & print averages ----
+            print("\n--- AVERAGE BAND POWERS (per channel) ---")
+            for i, ch in enumerate(SELECTED_CHANNELS):
+                c_frames = int(frame_counts[i])
+                if c_frames == 0:
+                    print(f"{ch}: no frames")
+                    continue
+                print(f"{ch}: (frames={c_frames})")
+                for j, b in enumerate(bands):
+                    print(f"  {b:6s}: {sums[i, j] / c_frames:.4f}")
+            # overall averages across selected channels
+            print("\n--- AVERAGE BAND POWERS (across selected channels) ---")
+            denom = frame_counts.sum()
+            for j, b in enumerate(bands):
+                overall_avg = sums[:, j].sum() / denom if denom > 0 else 0.0
+                print(f"  {b:6s}: {overall_avg:.4f}")
+            # -------------------------------------------
+
+        if client.is_open and not stopped_by_user:
+            try:
+                await client.close_session(session.token, session.session_id)
+            except Exception as e:
+                print("Warning: close session failed:", e)
 
     except Exception:
         print("Exception in main:")
         traceback.print_exc()
-        try:
-            ws.close()
-        except:
-            pass
+    finally:
+        await client.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
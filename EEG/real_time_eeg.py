@@ -4,7 +4,13 @@ Demo: connect to Cortex API, authorize, create session, subscribe to eeg+pow,
 print and save a few samples. Meant ONLY to validate streaming — no ML integration.
 Replace CLIENT_ID and CLIENT_SECRET with your Cortex App credentials.
 """
-import websocket, json, ssl, time, itertools, csv, os, sys
+import asyncio, json, time, csv, os, sys
+
+# Shared Cortex client lives in ml_model/eeg_realtime
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ml_model"))
+from eeg_realtime.cortex_client import CortexClient, CortexError
+from eeg_realtime.pow_decoder import PowDecoder
+from eeg_realtime import json_codec
 
 # ---------- CONFIG ----------
 CLIENT_ID = "YOUR_CLIENT_ID_HERE"
@@ -12,45 +18,15 @@ CLIENT_SECRET = "YOUR_CLIENT_SECRET_HERE"
 WS_URL = "wss://localhost:6868"
 SAVE_DIR = "cortex_samples"
 SAVE_RAW_CSV = True
+STREAMS = ["eeg", "pow"]
 # ----------------------------
 
-id_counter = itertools.count(1)
-notif_buffer = []  # simple buffer for notifications you might want to inspect
-
 def pretty(obj):
     try:
         return json.dumps(obj, indent=2)
     except:
         return str(obj)
 
-def connect_ws():
-    print("[*] Connecting to", WS_URL)
-    ws = websocket.create_connection(WS_URL, sslopt={"cert_reqs": ssl.CERT_NONE})
-    print("[+] WebSocket connected")
-    return ws
-
-def send_request(ws, method, params=None, timeout=5):
-    req_id = next(id_counter)
-    payload = {"jsonrpc":"2.0", "id": req_id, "method": method}
-    if params:
-        payload["params"] = params
-    ws.send(json.dumps(payload))
-    # wait for response matching id; also collect notifications while waiting
-    start = time.time()
-    while True:
-        if time.time() - start > timeout:
-            raise TimeoutError(f"Timeout waiting for response to {method}")
-        raw = ws.recv()
-        try:
-            msg = json.loads(raw)
-        except Exception:
-            continue
-        # If this is a response to our request:
-        if isinstance(msg, dict) and msg.get("id") == req_id:
-            return msg
-        # else it's a notification / streaming data — preserve for main loop
-        notif_buffer.append(msg)
-
 def handle_notification(msg, csv_writer=None):
     # Print only EEG/POW to avoid flooding
     if not isinstance(msg, dict):
@@ -63,19 +39,52 @@ def handle_notification(msg, csv_writer=None):
         eeg = msg.get("eeg")
         print(f"[EEG] t={t} len={len(eeg)} first3={eeg[:3]}")
         if csv_writer:
-            csv_writer.writerow([time.time(), "eeg", t, json.dumps(eeg)])
+            csv_writer.writerow([time.time(), "eeg", t, json_codec.dumps(eeg)])
     elif "pow" in msg:
         t = msg.get("time")
         powr = msg.get("pow")
         print(f"[POW] t={t} keys={list(powr.keys()) if isinstance(powr, dict) else 'unknown'}")
         if csv_writer:
-            csv_writer.writerow([time.time(), "pow", t, json.dumps(powr)])
+            csv_writer.writerow([time.time(), "pow", t, json_codec.dumps(powr)])
     else:
         # Other notifications (session updates, sys messages) — optional print
         # print("[NOTIF]", pretty(msg))
         pass
 
-def main():
+def handle_pow_batch(msgs, decoder, csv_writer=None):
+    """Decode every buffered pow message at once and print one line for the batch"""
+    frames = decoder.decode_batch(msgs)
+    if len(frames) == 0:
+        print(f"[POW] {len(msgs)} message(s) without usable values")
+    else:
+        means = " ".join(f"{b}={v:.3f}" for b, v in zip(decoder.bands, frames.mean(axis=(0, 1))))
+        print(f"[POW] t={msgs[-1].get('time')} frames={len(frames)} shape={frames.shape[1:]} mean {means}")
+    if csv_writer:
+        for msg in msgs:
+            csv_writer.writerow([time.time(), "pow", msg.get("time"), json_codec.dumps(msg.get("pow"))])
+
+async def consume(client, stream, csv_writer, decoder=None):
+    """Print/save every notification of one stream until the connection closes"""
+    queue = client.stream(stream)
+    while True:
+        msg = await queue.get()
+        if msg is None:
+            return
+        if stream != "pow" or decoder is None:
+            handle_notification(msg, csv_writer)
+            continue
+        # drain what is already buffered and decode it as one (frames, channels, bands) array
+        msgs = [msg]
+        while not queue.empty():
+            msg = queue.get_nowait()
+            if msg is None:
+                break
+            msgs.append(msg)
+        handle_pow_batch(msgs, decoder, csv_writer)
+        if msg is None:
+            return
+
+async def main():
     if CLIENT_ID.startswith("YOUR_"):
         print("ERROR: Replace CLIENT_ID and CLIENT_SECRET in the script before running.")
         sys.exit(1)
@@ -88,87 +97,55 @@ def main():
         csv_writer = csv.writer(csv_file)
         csv_writer.writerow(["recv_time_unix", "stream", "stream_time", "payload_json"])
 
-    ws = connect_ws()
+    print("[*] Connecting to", WS_URL)
+    client = CortexClient(CLIENT_ID, CLIENT_SECRET, url=WS_URL)
+    await client.connect()
+    print("[+] WebSocket connected")
+    session = None
     try:
-        print("[*] getCortexInfo")
-        print(pretty(send_request(ws, "getCortexInfo")))
-
-        print("[*] requestAccess")
-        print(pretty(send_request(ws, "requestAccess", {"clientId": CLIENT_ID, "clientSecret": CLIENT_SECRET})))
-
-        print("[*] authorize (getting cortexToken)")
-        auth_resp = send_request(ws, "authorize", {"clientId": CLIENT_ID, "clientSecret": CLIENT_SECRET})
-        token = auth_resp.get("result", {}).get("cortexToken")
-        if not token:
-            print("ERROR: authorize failed (no cortexToken). Response:", pretty(auth_resp))
-            return
-        print("[+] Authorized, cortexToken obtained")
-
-        # query headsets (may be empty if not connected)
-        print("[*] queryHeadsets")
-        head_resp = send_request(ws, "queryHeadsets", {"cortexToken": token})
-        print(pretty(head_resp))
-        headsets = head_resp.get("result", [])
-        if not headsets:
-            print("ERROR: No headsets found. Ensure headset is connected and recognized by Emotiv App.")
-            return
-        headset_id = headsets[0].get("id")
-        print("[+] Using headset:", headset_id)
-
-        # create session
-        print("[*] createSession (open)")
-        sess_resp = send_request(ws, "createSession", {"cortexToken": token, "headset": headset_id, "status": "open"})
-        print(pretty(sess_resp))
-        session_id = sess_resp.get("result", {}).get("id")
-        if not session_id:
-            print("ERROR: createSession didn't return session id.")
+        # requestAccess + authorize + queryHeadsets go out together, then createSession, then subscribe
+        print("[*] handshake (authorize, queryHeadsets, createSession, subscribe to eeg and pow)")
+        try:
+            session = await client.handshake(STREAMS)
+        except CortexError as e:
+            print(f"ERROR: {e}")
             return
-        print("[+] Session open:", session_id)
-
-        # subscribe to streams
-        print("[*] subscribe to eeg and pow")
-        sub_resp = send_request(ws, "subscribe", {"cortexToken": token, "session": session_id, "streams": ["eeg", "pow"]})
-        print(pretty(sub_resp))
+        print("[+] Using headset:", session.headset_id)
+        print("[+] Session open:", session.session_id)
+        print(pretty(session.cols))
+        try:
+            decoder = PowDecoder(session.cols.get("pow") or None)
+        except ValueError as e:
+            print("Warning: ignoring pow cols header:", e)
+            decoder = PowDecoder()
         print("[+] Subscribed — streaming will begin, printing EEG/POW lines")
 
-        # handle the notification buffer first (responses that arrived while waiting)
-        while notif_buffer:
-            n = notif_buffer.pop(0)
-            handle_notification(n, csv_writer)
-
-        # streaming loop — receives notifications indefinitely
+        # streaming — one consumer per stream, until Ctrl+C or the connection closes
         print("\n--- STREAMING START (press Ctrl+C to stop) ---\n")
         try:
-            while True:
-                raw = ws.recv()
-                try:
-                    msg = json.loads(raw)
-                except Exception:
-                    continue
-                # direct notifications will arrive here
-                handle_notification(msg, csv_writer)
-        except KeyboardInterrupt:
+            await asyncio.gather(*(consume(client, stream, csv_writer, decoder) for stream in STREAMS))
+        except asyncio.CancelledError:
             print("\n[!] KeyboardInterrupt — cleaning up...")
-        finally:
+    finally:
+        if session is not None and client.is_open:
             # unsubscribe & close session
             try:
                 print("[*] unsubscribe")
-                print(pretty(send_request(ws, "unsubscribe", {"cortexToken": token, "session": session_id, "streams": ["eeg", "pow"]})))
+                print(pretty(await client.unsubscribe(session.token, session.session_id, STREAMS)))
             except Exception as e:
                 print("Warning: unsubscribe failed:", e)
             try:
                 print("[*] updateSession close")
-                print(pretty(send_request(ws, "updateSession", {"cortexToken": token, "session": session_id, "status":"close"})))
+                print(pretty(await client.close_session(session.token, session.session_id)))
             except Exception as e:
                 print("Warning: close session failed:", e)
-    finally:
-        try:
-            ws.close()
-        except:
-            pass
+        await client.close()
         if csv_file:
             csv_file.close()
         print("[+] Done. Files (if any) saved in", SAVE_DIR)
 
 if __name__ == "__main__":
-    main()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -1,22 +1,38 @@
 import os
 import pickle
 import numpy as np
-from flask import Flask, request, jsonify, session
+from flask import Flask, request, jsonify, session, Response, stream_with_context
 from flask_cors import CORS
 import logging
 import socket
 import subprocess
 import json as json_module
-import csv
 import traceback
-from collections import defaultdict
+import threading
+import time
 from functools import wraps
 from typing import Dict
+from confidence_scoring import ConfidenceScorer
+from forest_engine import build_engine, ENGINE_SKLEARN
+from prediction_cache import PredictionCache
+from micro_batcher import MicroBatcher
+from json_provider import CodecJSONProvider
+from eeg_csv_reader import EEGCsvTailReader
+from biometric_ring import BiometricStore, FIELDS
+from biometric_batch import decode_batch
+from doctor_cache import DoctorCache
+from doctor_token import DoctorTokenSigner, bearer_token
+from eeg_realtime.band_power_ring import BandPowerRingReader, BAND_ORDER
+from eeg_realtime.band_stream import BandAverageBroadcaster
+from eeg_realtime.stream_hub import get_hub, biometric_topic
+from eeg_realtime import json_codec
+from pagination import parse_page_size
 # Use Firebase database instead of SQLite
 from firebase_database import (
-    initialize_firebase, create_doctor, verify_doctor, get_doctor_by_id, get_all_doctors,
+    initialize_firebase, create_doctor, verify_doctor, fetch_doctor_by_id, get_all_doctors,
     create_patient, update_patient, get_patient_by_id, get_all_patients,
-    save_test_report, get_patient_reports, get_report_by_id
+    save_test_report, get_patient_reports, get_report_by_id, get_cache_stats,
+    get_patients_page, get_patient_reports_page
 )
 
 # Initialize Firebase on startup (replaces init_database)
@@ -37,7 +53,12 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
-app.secret_key = 'anxiety_clinic_secret_key_2024_change_in_production'
+# jsonify/get_json through orjson when installed; NumPy values serialise as-is
+app.json = CodecJSONProvider(app)
+# Signs session cookies and doctor tokens: every worker/node must share the same key
+app.secret_key = os.getenv('FLASK_SECRET_KEY', 'anxiety_clinic_secret_key_2024_change_in_production')
+# Bearer tokens issued on login/register, verified without any database read
+doctor_tokens = DoctorTokenSigner(app.secret_key, ttl=float(os.getenv('DOCTOR_TOKEN_TTL', str(12 * 3600))))
 
 # Configure session cookie for CORS compatibility
 app.config['SESSION_COOKIE_SAMESITE'] = 'None'
@@ -73,10 +94,47 @@ random_forest_model = None
 scaler = None
 label_encoder = None
 combined_model = None
+# Icon/note tables for the current label encoder (built in load_models)
+confidence_scorer = None
+# Objects used for predict_proba: the sklearn models or their flattened copies
+eeg_forest = None
+biometric_forest = None
+active_inference_engine = None
+# Bumped on every load_models() so cached predictions never outlive their model
+model_version = 0
+
+# Cache of recent predictions keyed by quantized features + model version
+# PREDICTION_CACHE_SIZE=0 disables it
+prediction_cache = PredictionCache(
+    maxsize=int(os.getenv('PREDICTION_CACHE_SIZE', '1024')),
+    decimals=int(os.getenv('PREDICTION_CACHE_DECIMALS', '2'))
+)
+# Doctor records by id, so header/query/body authentication does not read Firestore per request
+# DOCTOR_CACHE_SIZE=0 disables it
+doctor_cache = DoctorCache(
+    fetch_doctor_by_id,
+    maxsize=int(os.getenv('DOCTOR_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('DOCTOR_CACHE_TTL', '300')),
+    negative_ttl=float(os.getenv('DOCTOR_CACHE_NEGATIVE_TTL', '10'))
+)
+# Inference engine: 'sklearn' or 'flat' (see forest_engine.py)
+INFERENCE_ENGINE = os.getenv('RF_INFERENCE_ENGINE', ENGINE_SKLEARN)
 
 # Global variable to store latest Arduino data
 latest_arduino_data = None
 
+# In-process pub/sub for live frames (Cortex pow per headset, Arduino readings per device)
+stream_hub = get_hub()
+
+def arduino_device_id(data):
+    """Device key of an Arduino reading: its device_id field, else the sender's address"""
+    return str(data.get('device_id') or request.remote_addr or 'unknown')
+
+# Recent Arduino samples per device, for windowed means (/latest_avg_biometric)
+BIOMETRIC_RING_CAPACITY = int(os.getenv('BIOMETRIC_RING_CAPACITY', '3600'))
+BIOMETRIC_AVG_WINDOW_SECONDS = float(os.getenv('BIOMETRIC_AVG_WINDOW_SECONDS', '60'))
+biometric_store = BiometricStore(capacity=BIOMETRIC_RING_CAPACITY)
+
 def get_local_ip():
     """Get the local IP address of the machine"""
     try:
@@ -90,14 +148,20 @@ def get_local_ip():
         logger.error(f"Could not determine local IP: {e}")
         return "127.0.0.1"
 
-def load_models():
-    """Load all ML models with error handling"""
+def load_models(inference_engine=None):
+    """
+    Load all ML models with error handling.
+    inference_engine selects how forests are evaluated: 'sklearn' (default,
+    or RF_INFERENCE_ENGINE env var) or 'flat' for the array-based evaluator.
+    """
     global random_forest_model, scaler, label_encoder, combined_model
+    global eeg_forest, biometric_forest, active_inference_engine, model_version
     
     # Always create a fallback label encoder first
     label_encoder = create_fallback_label_encoder()
     print("✅ Label Encoder ready (fallback)")
     print(f"📋 Available disorders: {list(label_encoder.classes_)}")
+    get_confidence_scorer(label_encoder)
     
     # Try to load models, but don't fail if they don't exist
     model_files = {
@@ -128,6 +192,22 @@ def load_models():
                 scaler = None
             elif var_name == 'combined_model':
                 combined_model = None
+    
+    engine = inference_engine or INFERENCE_ENGINE
+    try:
+        eeg_forest = build_engine(random_forest_model, engine)
+        biometric_forest = build_engine(combined_model, engine)
+    except ValueError as e:
+        print(f"❌ {e}")
+        engine = ENGINE_SKLEARN
+        eeg_forest = random_forest_model
+        biometric_forest = combined_model
+    active_inference_engine = engine
+    print(f"⚙️ Inference engine: {engine}")
+    
+    # New models: drop cached predictions from the previous ones
+    model_version += 1
+    prediction_cache.invalidate()
 
 def create_fallback_label_encoder():
     """Create a fallback label encoder with common anxiety disorders"""
@@ -148,23 +228,20 @@ def create_fallback_label_encoder():
     le.fit(disorders)
     return le
 
-def get_confidence_scores(prediction_proba, label_encoder):
-    """Convert prediction probabilities to confidence scores for all disorders"""
-    disorders = label_encoder.classes_
-    confidence_scores = []
-    
-    for i, disorder in enumerate(disorders):
-        confidence = float(prediction_proba[0][i] * 100)
-        confidence_scores.append({
-            'disorder': disorder,
-            'confidence': round(confidence, 1),
-            'status': get_status_icon(confidence),
-            'note': get_disorder_note(disorder, confidence)
-        })
-    
-    # Sort by confidence (highest first)
-    confidence_scores.sort(key=lambda x: x['confidence'], reverse=True)
-    return confidence_scores
+def get_confidence_scorer(encoder):
+    """Return the precomputed ConfidenceScorer for this label encoder, building it once"""
+    global confidence_scorer
+    if confidence_scorer is None or confidence_scorer.label_encoder is not encoder:
+        confidence_scorer = ConfidenceScorer(encoder, get_status_icon, get_disorder_note)
+    return confidence_scorer
+
+def get_confidence_scores(prediction_proba, label_encoder, top_k=None):
+    """Convert prediction probabilities to confidence scores (highest first), optionally top_k only"""
+    return get_confidence_scorer(label_encoder).score(prediction_proba, top_k)
+
+def get_confidence_scores_batch(prediction_proba, label_encoder, top_k=None):
+    """Convert an (N, n_classes) probability matrix to one confidence_scores list per row"""
+    return get_confidence_scorer(label_encoder).score_batch(prediction_proba, top_k)
 
 def get_status_icon(confidence):
     """Get status icon based on confidence level"""
@@ -240,20 +317,32 @@ def predict_eeg_with_models(data):
                 float(data['theta'])
             ]).reshape(1, -1)
             
-            # Scale the features
-            scaled_features = scaler.transform(features)
+            # Serve repeated inputs from the cache
+            cache_key = prediction_cache.make_key('eeg', model_version, features[0])
+            cached = prediction_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            # Get prediction probabilities
-            prediction_proba = random_forest_model.predict_proba(scaled_features)
+            if eeg_batcher is not None:
+                # Concurrent callers share one vectorized model call
+                prediction_proba = eeg_batcher.submit(features[0]).result(MICRO_BATCH_TIMEOUT).reshape(1, -1)
+            else:
+                # Scale the features
+                scaled_features = scaler.transform(features)
+                
+                # Get prediction probabilities
+                prediction_proba = eeg_forest.predict_proba(scaled_features)
             
             # Get confidence scores for all disorders
             confidence_scores = get_confidence_scores(prediction_proba, label_encoder)
             
             print("✅ Using actual EEG model for prediction")
-            return {
+            result = {
                 'primary_prediction': confidence_scores[0]['disorder'],
                 'confidence_scores': confidence_scores
             }
+            prediction_cache.put(cache_key, result)
+            return result
             
         except Exception as e:
             print(f"❌ Error in actual EEG prediction: {e}")
@@ -293,17 +382,28 @@ def predict_biometric_with_models(data):
                 float(data['gsr'])
             ]).reshape(1, -1)
             
+            # Serve repeated inputs from the cache
+            cache_key = prediction_cache.make_key('biometric', model_version, features[0])
+            cached = prediction_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
             # Get prediction probabilities
-            prediction_proba = combined_model.predict_proba(features)
+            if biometric_batcher is not None:
+                prediction_proba = biometric_batcher.submit(features[0]).result(MICRO_BATCH_TIMEOUT).reshape(1, -1)
+            else:
+                prediction_proba = biometric_forest.predict_proba(features)
             
             # Get confidence scores for all disorders
             confidence_scores = get_confidence_scores(prediction_proba, label_encoder)
             
             print("✅ Using actual biometric model for prediction")
-            return {
+            result = {
                 'primary_prediction': confidence_scores[0]['disorder'],
                 'confidence_scores': confidence_scores
             }
+            prediction_cache.put(cache_key, result)
+            return result
             
         except Exception as e:
             print(f"❌ Error in actual biometric prediction: {e}")
@@ -321,6 +421,141 @@ def predict_biometric_with_models(data):
             float(data['gsr'])
         )
 
+# Feature column order expected by the models (must match training order)
+EEG_FEATURE_ORDER = ['beta', 'gamma', 'delta', 'alpha', 'theta']
+BIOMETRIC_FEATURE_ORDER = ['spo2', 'gsr']
+MAX_BATCH_ROWS = 10000
+
+def build_feature_matrix(rows, feature_order):
+    """
+    Build an (N, n_features) float matrix from a list of rows.
+    Each row may be a dict keyed by feature name or a list in feature_order.
+    Raises ValueError naming the first invalid row.
+    """
+    n_features = len(feature_order)
+    matrix = np.empty((len(rows), n_features), dtype=np.float64)
+
+    for i, row in enumerate(rows):
+        try:
+            if isinstance(row, dict):
+                for j, field in enumerate(feature_order):
+                    if field not in row or row[field] == '':
+                        raise ValueError(f"Missing required field: {field}")
+                    matrix[i, j] = float(row[field])
+            elif isinstance(row, (list, tuple)) and len(row) == n_features:
+                matrix[i] = [float(v) for v in row]
+            else:
+                raise ValueError(f"Expected an object or a list of {n_features} values")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Row {i}: {e}")
+
+    return matrix
+
+def _limit_mock_top_k(results, top_k):
+    """Trim mock results (whose score lists are already highest first) to top_k like the model path"""
+    if top_k is not None:
+        for result in results:
+            result['confidence_scores'] = result['confidence_scores'][:top_k]
+    return results
+
+def predict_eeg_batch_with_models(features, top_k=None):
+    """
+    Predict a whole (N, 5) EEG feature matrix with one scaler.transform
+    and one predict_proba call. Returns one result dict per row,
+    keeping only the top_k confidence scores when top_k is given.
+    """
+    models_available = (
+        random_forest_model is not None and
+        scaler is not None and
+        label_encoder is not None
+    )
+
+    if models_available:
+        try:
+            scaled_features = scaler.transform(features)
+            prediction_proba = eeg_forest.predict_proba(scaled_features)
+
+            results = [
+                {
+                    'primary_prediction': confidence_scores[0]['disorder'],
+                    'confidence_scores': confidence_scores
+                }
+                for confidence_scores in get_confidence_scores_batch(prediction_proba, label_encoder, top_k)
+            ]
+
+            print(f"✅ Using actual EEG model for batch prediction ({len(features)} rows)")
+            return results
+
+        except Exception as e:
+            print(f"❌ Error in actual EEG batch prediction: {e}")
+            print("🔄 Falling back to mock prediction")
+    else:
+        print("⚠️ Using mock EEG batch prediction (models not loaded)")
+
+    # Columns follow EEG_FEATURE_ORDER: beta, gamma, delta, alpha, theta
+    return _limit_mock_top_k([
+        mock_eeg_prediction_with_confidence(*(float(v) for v in row))
+        for row in features
+    ], top_k)
+
+def predict_biometric_batch_with_models(features, top_k=None):
+    """
+    Predict a whole (N, 2) biometric feature matrix with one predict_proba call.
+    Returns one result dict per row (top_k confidence scores when given).
+    """
+    models_available = (
+        combined_model is not None and
+        label_encoder is not None
+    )
+
+    if models_available:
+        try:
+            prediction_proba = biometric_forest.predict_proba(features)
+
+            results = [
+                {
+                    'primary_prediction': confidence_scores[0]['disorder'],
+                    'confidence_scores': confidence_scores
+                }
+                for confidence_scores in get_confidence_scores_batch(prediction_proba, label_encoder, top_k)
+            ]
+
+            print(f"✅ Using actual biometric model for batch prediction ({len(features)} rows)")
+            return results
+
+        except Exception as e:
+            print(f"❌ Error in actual biometric batch prediction: {e}")
+            print("🔄 Falling back to mock prediction")
+    else:
+        print("⚠️ Using mock biometric batch prediction (models not loaded)")
+
+    # Columns follow BIOMETRIC_FEATURE_ORDER: spo2, gsr
+    return _limit_mock_top_k([
+        mock_biometric_prediction_with_confidence(float(row[0]), float(row[1]))
+        for row in features
+    ], top_k)
+
+def _eeg_proba_batch(features):
+    """Scale and score an (N, 5) EEG matrix with the currently loaded models"""
+    return eeg_forest.predict_proba(scaler.transform(features))
+
+def _biometric_proba_batch(features):
+    """Score an (N, 2) biometric matrix with the currently loaded model"""
+    return biometric_forest.predict_proba(features)
+
+# Opt-in micro-batching of concurrent single-row predictions
+# (useful under threaded/gunicorn deployments; off by default)
+MICRO_BATCH_ENABLED = os.getenv('MICRO_BATCH_ENABLED', '0').lower() in ('1', 'true', 'yes')
+MICRO_BATCH_MAX_ROWS = int(os.getenv('MICRO_BATCH_MAX_ROWS', '64'))
+MICRO_BATCH_WINDOW_MS = float(os.getenv('MICRO_BATCH_WINDOW_MS', '2'))
+MICRO_BATCH_TIMEOUT = 10.0  # seconds a caller waits for its batch
+
+eeg_batcher = None
+biometric_batcher = None
+if MICRO_BATCH_ENABLED:
+    eeg_batcher = MicroBatcher(_eeg_proba_batch, 'eeg', MICRO_BATCH_MAX_ROWS, MICRO_BATCH_WINDOW_MS)
+    biometric_batcher = MicroBatcher(_biometric_proba_batch, 'biometric', MICRO_BATCH_MAX_ROWS, MICRO_BATCH_WINDOW_MS)
+
 def mock_eeg_prediction_with_confidence(beta, gamma, delta, alpha, theta):
     """Mock EEG prediction with confidence scores when models fail to load"""
     total = beta + gamma + delta + alpha + theta
@@ -540,83 +775,83 @@ def mock_biometric_prediction_with_confidence(spo2, gsr):
         'confidence_scores': confidence_scores
     }
 
+# Candidate locations of the CSV written by cortex_test.py (probed once, then cached)
+_EEG_CSV_BASE_DIR = os.path.dirname(__file__)
+EEG_CSV_CANDIDATE_PATHS = [
+    os.path.join(_EEG_CSV_BASE_DIR, '..', 'EEG', 'eeg_live_data.csv'),
+    os.path.join(_EEG_CSV_BASE_DIR, '../EEG/eeg_live_data.csv'),
+    os.path.join(os.path.dirname(_EEG_CSV_BASE_DIR), 'EEG', 'eeg_live_data.csv'),
+    'eeg_live_data.csv',  # same directory
+]
+eeg_csv_reader = EEGCsvTailReader(EEG_CSV_CANDIDATE_PATHS)
+
 def read_latest_eeg_from_csv():
     """
     Read the latest EEG data from eeg_live_data.csv file.
     Calculates averages for each band (delta, theta, alpha, beta, gamma) across all channels.
+    Only rows appended since the previous call are parsed (see eeg_csv_reader.py).
     Returns dictionary with band averages or None if file not found or empty.
     """
-    # Try multiple possible paths for the CSV file
-    base_dir = os.path.dirname(__file__)
-    possible_paths = [
-        os.path.join(base_dir, '..', 'EEG', 'eeg_live_data.csv'),
-        os.path.join(base_dir, '../EEG/eeg_live_data.csv'),
-        os.path.join(os.path.dirname(base_dir), 'EEG', 'eeg_live_data.csv'),
-        'eeg_live_data.csv',  # same directory
-    ]
-    
-    csv_path = None
-    for path in possible_paths:
-        abs_path = os.path.abspath(path)
-        if os.path.exists(abs_path):
-            csv_path = abs_path
-            break
-    
-    if not csv_path:
-        logger.warning("EEG CSV file not found. Checked paths: " + str(possible_paths))
-        return None
-    
     try:
-        # Read CSV and calculate averages
-        band_values = defaultdict(list)  # band -> list of values
-        
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                band = row.get('Band', '').lower().strip()
-                value_str = row.get('Value', '').strip()
-                
-                # Skip header row or invalid rows
-                if not band or not value_str or band == 'band':
-                    continue
-                
-                try:
-                    value = float(value_str)
-                    band_values[band].append(value)
-                except (ValueError, TypeError):
-                    continue
-        
-        # Calculate averages for each band
-        if not band_values:
-            logger.warning(f"EEG CSV file {csv_path} is empty or has no valid data")
+        if not eeg_csv_reader.update():
+            logger.warning("EEG CSV file not found. Checked paths: " + str(EEG_CSV_CANDIDATE_PATHS))
             return None
         
-        averages = {}
-        for band in ['delta', 'theta', 'alpha', 'beta', 'gamma']:
-            if band in band_values and len(band_values[band]) > 0:
-                avg = np.mean(band_values[band])
-                averages[band] = round(float(avg), 4)
-            else:
-                logger.warning(f"No data found for band: {band}")
+        averages = eeg_csv_reader.averages()
+        counts = eeg_csv_reader.band_counts()
         
         if not averages:
+            logger.warning(f"EEG CSV file {eeg_csv_reader.path} is empty or has no valid data")
             return None
         
+        for band in ['delta', 'theta', 'alpha', 'beta', 'gamma']:
+            if band not in averages:
+                logger.warning(f"No data found for band: {band}")
+        
         logger.info(f"Read EEG averages from CSV: {averages}")
-        logger.info(f"Total values processed - Delta: {len(band_values.get('delta', []))}, "
-                   f"Theta: {len(band_values.get('theta', []))}, "
-                   f"Alpha: {len(band_values.get('alpha', []))}, "
-                   f"Beta: {len(band_values.get('beta', []))}, "
-                   f"Gamma: {len(band_values.get('gamma', []))}")
+        logger.info(f"Total values processed - Delta: {counts.get('delta', 0)}, "
+                   f"Theta: {counts.get('theta', 0)}, "
+                   f"Alpha: {counts.get('alpha', 0)}, "
+                   f"Beta: {counts.get('beta', 0)}, "
+                   f"Gamma: {counts.get('gamma', 0)}")
         
         return averages
         
     except Exception as e:
-        logger.error(f"Error reading EEG CSV file {csv_path}: {e}")
-        import traceback
+        logger.error(f"Error reading EEG CSV file {eeg_csv_reader.path}: {e}")
         logger.error(traceback.format_exc())
         return None
 
+# Binary ring buffer written by cortex_test.py (preferred over the CSV export)
+EEG_RING_PATH = os.getenv(
+    'EEG_RING_FILE',
+    os.path.join(os.path.dirname(_EEG_CSV_BASE_DIR), 'EEG', 'eeg_live_ring.bin')
+)
+eeg_ring_reader = BandPowerRingReader(EEG_RING_PATH)
+
+def read_latest_eeg_from_ring(seconds=None):
+    """
+    Band averages across channels from the memory-mapped ring written by cortex_test.py.
+    Uses every frame in the ring, or only the last `seconds` if given.
+    Returns (averages dict, frames used, latest timestamp) or None if the ring is missing or empty.
+    """
+    ring = eeg_ring_reader.get()
+    if ring is None:
+        return None
+    
+    means, frames_used, latest_timestamp = ring.band_means(seconds=seconds)
+    if means is None or frames_used == 0:
+        return None
+    
+    averages = {
+        band: round(float(means[i]), 4)
+        for i, band in enumerate(BAND_ORDER[:ring.n_bands])
+        if not np.isnan(means[i])
+    }
+    if not averages:
+        return None
+    return averages, frames_used, latest_timestamp
+
 def run_cortex_script_and_parse(script_name='cortex._atest.py'):
     """
     Try to run the cortex script (located next to this file) and parse JSON output.
@@ -711,6 +946,11 @@ def predict_combined():
                 logger.error(f"Missing required field: {field}")
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
+        # Only valid readings reach the ring buffer and live subscribers (one topic per device)
+        device_id = arduino_device_id(data)
+        biometric_store.ingest(device_id, data)
+        stream_hub.publish(biometric_topic(device_id), latest_arduino_data)
+        
         # Log the values being processed
         logger.info(f"Processing SpO2: {data['spo2']}, GSR: {data['gsr']}")
         
@@ -728,6 +968,116 @@ def predict_combined():
         logger.error(f"Traceback: {traceback.format_exc()}")
         return jsonify({"error": str(e)}), 500
 
+def _get_batch_rows(data):
+    """Extract the list of rows from a batch request body"""
+    rows = data.get('rows') if isinstance(data, dict) else data
+    if not isinstance(rows, list) or len(rows) == 0:
+        raise ValueError("Request must contain a non-empty 'rows' list")
+    if len(rows) > MAX_BATCH_ROWS:
+        raise ValueError(f"Too many rows: {len(rows)} (max {MAX_BATCH_ROWS})")
+    return rows
+
+def _get_top_k(data):
+    """Optional top_k from a request body; None means all classes"""
+    top_k = data.get('top_k') if isinstance(data, dict) else None
+    if top_k is None:
+        return None
+    if not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1:
+        raise ValueError("top_k must be a positive integer")
+    return top_k
+
+@app.route('/predict_eeg_batch', methods=['POST'])
+def predict_eeg_batch():
+    """
+    Batch EEG prediction endpoint.
+    Accepts {"rows": [...]} where each row is an object with beta, gamma, delta,
+    alpha, theta or a list in that order, plus an optional top_k.
+    All rows are scored in one model call.
+    """
+    try:
+        data = request.get_json()
+        try:
+            rows = _get_batch_rows(data)
+            features = build_feature_matrix(rows, EEG_FEATURE_ORDER)
+            top_k = _get_top_k(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        logger.info(f"Received EEG batch: {len(rows)} rows")
+        results = predict_eeg_batch_with_models(features, top_k)
+
+        return jsonify({
+            "count": len(results),
+            "results": results
+        })
+
+    except Exception as e:
+        logger.error(f"EEG batch prediction error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/predict_biometric_batch', methods=['POST'])
+def predict_biometric_batch():
+    """
+    Batch biometric prediction endpoint.
+    Accepts {"rows": [...]} where each row is an object with spo2, gsr
+    or a list in that order, plus an optional top_k.
+    All rows are scored in one model call.
+    """
+    try:
+        data = request.get_json()
+        try:
+            rows = _get_batch_rows(data)
+            features = build_feature_matrix(rows, BIOMETRIC_FEATURE_ORDER)
+            top_k = _get_top_k(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        logger.info(f"Received biometric batch: {len(rows)} rows")
+        results = predict_biometric_batch_with_models(features, top_k)
+
+        return jsonify({
+            "count": len(results),
+            "results": results
+        })
+
+    except Exception as e:
+        logger.error(f"Biometric batch prediction error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/prediction_cache/stats', methods=['GET'])
+def prediction_cache_stats():
+    """Hit/miss/eviction counters of the prediction cache"""
+    return jsonify({
+        "success": True,
+        "model_version": model_version,
+        "cache": prediction_cache.stats()
+    })
+
+@app.route('/api/doctor_cache/stats', methods=['GET'])
+def doctor_cache_stats():
+    """Hit rate and Firestore reads saved by the doctor lookup cache"""
+    return jsonify({
+        "success": True,
+        "cache": doctor_cache.stats()
+    })
+
+@app.route('/api/firestore_cache/stats', methods=['GET'])
+def firestore_cache_stats():
+    """Hit rate and Firestore document reads saved by the patient/report list caches"""
+    return jsonify({
+        "success": True,
+        "caches": get_cache_stats()
+    })
+
+@app.route('/api/micro_batch/stats', methods=['GET'])
+def micro_batch_stats():
+    """Queue depth, batch size and wait time metrics of the micro-batchers"""
+    return jsonify({
+        "success": True,
+        "enabled": MICRO_BATCH_ENABLED,
+        "batchers": [b.stats() for b in (eeg_batcher, biometric_batcher) if b is not None]
+    })
+
 @app.route('/test', methods=['GET'])
 def test_endpoint():
     """Simple test endpoint to verify server is reachable"""
@@ -758,11 +1108,24 @@ def get_latest_arduino_data():
 @app.route('/latest_avg_eeg', methods=['GET'])
 def latest_avg_eeg():
     """
-    Returns latest EEG averages from the CSV file generated by cortex_test.py.
-    Reads eeg_live_data.csv and calculates averages for each band across all channels.
-    Falls back to mock data only if CSV file is not found or has no data.
+    Returns latest EEG averages from the data generated by cortex_test.py.
+    Reads the binary ring buffer (optionally only the last ?seconds=N), then
+    eeg_live_data.csv, and calculates averages for each band across all channels.
+    Falls back to mock data only if neither has data.
     """
-    # Try to read real EEG data from CSV file first
+    seconds = request.args.get('seconds', type=float)
+    ring_result = read_latest_eeg_from_ring(seconds)
+    if ring_result:
+        ring_data, frames_used, latest_timestamp = ring_result
+        return jsonify({
+            "status": "success",
+            "data": ring_data,
+            "source": "ring_buffer",
+            "frames": frames_used,
+            "latest_timestamp": latest_timestamp
+        })
+    
+    # Try to read real EEG data from CSV file next
     real_eeg_data = read_latest_eeg_from_csv()
     
     if real_eeg_data and len(real_eeg_data) > 0:
@@ -793,23 +1156,230 @@ def latest_avg_eeg():
         "warning": "Real EEG data not available. Make sure cortex_test.py is running and generating eeg_live_data.csv"
     })
 
+# Live band averages pushed over SSE; one producer thread serves every subscriber
+EEG_STREAM_INTERVAL = float(os.getenv('EEG_STREAM_INTERVAL', '1.0'))
+EEG_STREAM_WINDOW_SECONDS = float(os.getenv('EEG_STREAM_WINDOW_SECONDS', '5'))
+EEG_STREAM_HEARTBEAT = float(os.getenv('EEG_STREAM_HEARTBEAT', '15'))
+eeg_band_broadcaster = BandAverageBroadcaster(
+    eeg_ring_reader,
+    stream_hub,
+    interval=EEG_STREAM_INTERVAL,
+    window_seconds=EEG_STREAM_WINDOW_SECONDS
+)
+
+@app.route('/api/eeg/stream', methods=['GET'])
+def eeg_stream():
+    """
+    Server-Sent Events stream of rolling band averages from the ring buffer
+    (add ?channels=1 for per-channel averages). Resumes after Last-Event-ID
+    when the event is still in the server's short history.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    channels = request.args.get('channels', '0').lower() in ('1', 'true', 'yes')
+    events = eeg_band_broadcaster.stream(last_event_id, channels=channels, heartbeat=EEG_STREAM_HEARTBEAT,
+                                         name=f"eeg-stream:{request.remote_addr}")
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/eeg/stream/stats', methods=['GET'])
+def eeg_stream_stats():
+    """Subscribers and producer counters of /api/eeg/stream"""
+    return jsonify(eeg_band_broadcaster.stats())
+
+HUB_STREAM_QUEUE = int(os.getenv('HUB_STREAM_QUEUE', '256'))
+
+def _hub_events(topic, heartbeat, name, pool=None):
+    # Subscribed here rather than in the view: a response closed before its first chunk never
+    # runs this generator, so nothing is left subscribed (and the Cortex producer can stop)
+    subscription = stream_hub.subscribe(topic, maxsize=HUB_STREAM_QUEUE, name=name)
+    try:
+        if pool is not None:
+            # Started after subscribing so a concurrent release sees this subscriber
+            try:
+                pool.start_producer()
+            except Exception as e:
+                logger.warning(f"[Stream Hub] Cortex producer not started: {e}")
+        yield "retry: 3000\n\n"
+        while True:
+            frame = subscription.get(heartbeat)
+            if frame is None:
+                yield ": heartbeat\n\n"
+                continue
+            event = 'end' if frame.is_end else 'frame'
+            payload = {'topic': frame.topic, 'seq': frame.seq, 'timestamp': frame.timestamp, 'data': frame.data}
+            yield f"event: {event}\ndata: {json_codec.dumps(payload)}\n\n"
+    finally:
+        subscription.close()
+        if pool is not None:
+            try:
+                pool.release_producer()
+            except Exception as e:
+                logger.warning(f"[Stream Hub] Cortex producer not released: {e}")
+
+@app.route('/api/hub/stream', methods=['GET'])
+def hub_stream():
+    """
+    Server-Sent Events of raw live frames from the stream hub, e.g.
+    ?topic=biometric/* (Arduino readings) or ?topic=eeg/*/pow (Cortex pow frames).
+    EEG topics keep the shared Cortex session streaming until their last subscriber leaves.
+    """
+    topic = request.args.get('topic', 'biometric/*')
+    pool = None
+    if topic.startswith('eeg/'):
+        try:
+            from eeg_realtime.realtime_eeg_collector import get_session_pool
+            pool = get_session_pool()
+        except ImportError:
+            return _eeg_module_unavailable()
+    return Response(
+        stream_with_context(_hub_events(topic, EEG_STREAM_HEARTBEAT, f"hub-stream:{request.remote_addr}", pool)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/hub/stats', methods=['GET'])
+def hub_stats():
+    """Topics, and per-subscriber queue depth, lag and drop counts of the stream hub"""
+    return jsonify(stream_hub.stats())
+
 @app.route('/latest_avg_biometric', methods=['GET'])
 def latest_avg_biometric():
     """
-    Returns latest biometric averages. Tries cortex script first, then fallback mock.
+    Returns latest biometric averages: means over the last ?seconds=N (default
+    BIOMETRIC_AVG_WINDOW_SECONDS) of the samples posted to /predict_combined by
+    ?device_id= (default: the most recently active device). Tries the cortex
+    script next, then falls back to mock values.
     """
+    device_id = request.args.get('device_id')
+    seconds = request.args.get('seconds', BIOMETRIC_AVG_WINDOW_SECONDS, type=float)
+    ring = biometric_store.get(device_id)
+    if ring is not None and len(ring) > 0:
+        summary = ring.window_means(seconds)
+        means = summary['means']
+        if summary['samples'] > 0 and means['spo2'] is not None and means['gsr'] is not None:
+            return jsonify({
+                "status": "success",
+                "data": {"spo2": means['spo2'], "gsr": means['gsr'], "hr_mean": means['hr']},
+                "source": "ring_buffer",
+                "device_id": device_id or biometric_store.latest_device(),
+                "samples": summary['samples'],
+                "window_seconds": seconds,
+                "latest_timestamp": summary['latest_timestamp'],
+                "age_seconds": round(time.time() - summary['latest_timestamp'], 1)
+            })
+
     parsed = run_cortex_script_and_parse()
     if parsed and 'biometric' in parsed:
-        return jsonify({"status": "success", "data": parsed['biometric']})
+        return jsonify({"status": "success", "data": parsed['biometric'], "source": "cortex_script"})
     # fallback mock
     mock_bio = {"spo2": 98.2, "gsr": 0.2862, "hr_mean": 72}
-    return jsonify({"status": "success", "data": mock_bio})
+    return jsonify({
+        "status": "success",
+        "data": mock_bio,
+        "source": "mock",
+        "warning": "No biometric samples received yet. Make sure the Arduino is posting to /predict_combined"
+    })
+
+@app.route('/api/biometric/window', methods=['GET'])
+def biometric_window():
+    """Raw biometric samples of the last ?seconds=N (default 60) for ?device_id= (default: latest device)"""
+    try:
+        device_id = request.args.get('device_id')
+        seconds = request.args.get('seconds', BIOMETRIC_AVG_WINDOW_SECONDS, type=float)
+        if seconds is None or seconds <= 0:
+            return jsonify({"success": False, "error": "seconds must be a positive number"}), 400
+        ring = biometric_store.get(device_id)
+        if ring is None or len(ring) == 0:
+            return jsonify({
+                "success": False,
+                "error": "No biometric samples for this device" if device_id else "No biometric samples yet",
+                "devices": biometric_store.devices()
+            }), 404
+        samples = ring.window(seconds)
+        summary = ring.window_means(seconds)
+        return jsonify({
+            "success": True,
+            "device_id": device_id or biometric_store.latest_device(),
+            "window_seconds": seconds,
+            "count": len(samples),
+            "means": summary['means'],
+            "samples": samples
+        })
+    except Exception as e:
+        logger.error(f"Biometric window error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/biometric/ingest_batch', methods=['POST'])
+def biometric_ingest_batch():
+    """
+    Bulk ingest of buffered Arduino readings (JSON array, NDJSON or binary records;
+    see biometric_batch.py). All readings are appended to the device's ring in one
+    write; with ?predict=1 (or "predict": true) one prediction is made on the batch means.
+    """
+    try:
+        received_at = time.time()
+        try:
+            batch = decode_batch(request.get_data(), request.content_type, received_at, MAX_BATCH_ROWS)
+            options = batch.options
+            top_k = _get_top_k(options)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        device_id = str(request.args.get('device_id') or options.get('device_id')
+                        or request.remote_addr or 'unknown')
+        biometric_store.ingest_batch(device_id, batch.timestamps, batch.values)
+
+        # Live subscribers get the newest reading once per batch
+        global latest_arduino_data
+        latest_arduino_data = dict(batch.latest(), device_id=device_id)
+        stream_hub.publish(biometric_topic(device_id), latest_arduino_data)
+
+        counts = (~np.isnan(batch.values)).sum(axis=0)
+        means = np.where(counts > 0, np.nansum(batch.values, axis=0) / np.maximum(counts, 1), np.nan)
+        response = {
+            "success": True,
+            "device_id": device_id,
+            "count": len(batch),
+            "first_timestamp": float(batch.timestamps[0]),
+            "last_timestamp": float(batch.timestamps[-1]),
+            "means": {field: (None if np.isnan(v) else round(float(v), 4)) for field, v in zip(FIELDS, means)}
+        }
+
+        predict = request.args.get('predict', str(options.get('predict', ''))).lower() in ('1', 'true', 'yes')
+        if predict:
+            spo2, gsr = response['means']['spo2'], response['means']['gsr']
+            if spo2 is None or gsr is None:
+                return jsonify(dict(response, success=False,
+                                    error="Batch has no spo2/gsr values to predict on")), 400
+            response['prediction'] = predict_biometric_batch_with_models(np.array([[spo2, gsr]]), top_k)[0]
+
+        logger.info(f"Ingested biometric batch: {len(batch)} readings from {device_id}")
+        return jsonify(response)
+
+    except Exception as e:
+        logger.error(f"Biometric batch ingest error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
 
 # Authentication decorator
 def require_auth(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Try to get doctor_id from session first
+        # A signed bearer token is checked locally (no session store, no Firestore read)
+        token = bearer_token(request.headers.get('Authorization'))
+        claims = doctor_tokens.verify(token) if token else None
+        if claims is not None:
+            if session.get('doctor_id') != claims['sub']:
+                session['doctor_id'] = claims['sub']
+            return f(*args, **kwargs)
+        if token:
+            # Expired (or foreign) token: the client still sends its other credentials, so fall
+            # through to them rather than failing every call until the doctor logs in again
+            logger.info("Bearer token rejected (invalid or expired); trying session / doctor_id")
+
+        # Then the session cookie
         doctor_id = session.get('doctor_id')
         
         # If not in session, try to get from request headers
@@ -817,7 +1387,7 @@ def require_auth(f):
             doctor_id_header = request.headers.get('X-Doctor-Id')
             if doctor_id_header:
                 # Verify doctor exists
-                doctor = get_doctor_by_id(str(doctor_id_header))
+                doctor = doctor_cache.get(str(doctor_id_header))
                 if doctor:
                     # Set in session for future requests
                     session['doctor_id'] = str(doctor_id_header)
@@ -828,7 +1398,7 @@ def require_auth(f):
             doctor_id_query = request.args.get('doctor_id')
             if doctor_id_query:
                 # Verify doctor exists
-                doctor = get_doctor_by_id(str(doctor_id_query))
+                doctor = doctor_cache.get(str(doctor_id_query))
                 if doctor:
                     # Set in session for future requests
                     session['doctor_id'] = str(doctor_id_query)
@@ -841,7 +1411,7 @@ def require_auth(f):
                 doctor_id_from_body = data.get('doctor_id')
                 if doctor_id_from_body:
                     # Verify doctor exists
-                    doctor = get_doctor_by_id(str(doctor_id_from_body))
+                    doctor = doctor_cache.get(str(doctor_id_from_body))
                     if doctor:
                         # Set in session for future requests
                         session['doctor_id'] = str(doctor_id_from_body)
@@ -874,6 +1444,7 @@ def doctor_register():
         
         if success:
             # Auto-login after registration
+            doctor_cache.put(doctor)
             session['doctor_id'] = doctor['id']
             session['doctor_email'] = doctor['email']
             session['doctor_name'] = doctor['name']
@@ -881,7 +1452,8 @@ def doctor_register():
             return jsonify({
                 "success": True,
                 "message": message,
-                "doctor": doctor
+                "doctor": doctor,
+                **doctor_tokens.issue(doctor)
             }), 201
         else:
             return jsonify({"error": message}), 400
@@ -904,6 +1476,7 @@ def doctor_login():
         success, message, doctor = verify_doctor(email, password)
         
         if success:
+            doctor_cache.put(doctor)
             session['doctor_id'] = doctor['id']
             session['doctor_email'] = doctor['email']
             session['doctor_name'] = doctor['name']
@@ -911,7 +1484,8 @@ def doctor_login():
             return jsonify({
                 "success": True,
                 "message": message,
-                "doctor": doctor
+                "doctor": doctor,
+                **doctor_tokens.issue(doctor)
             })
         else:
             return jsonify({"error": message}), 401
@@ -923,6 +1497,7 @@ def doctor_login():
 @app.route('/api/doctor/logout', methods=['POST'])
 def doctor_logout():
     """Logout doctor"""
+    doctor_cache.invalidate(session.get('doctor_id') or request.headers.get('X-Doctor-Id'))
     session.clear()
     return jsonify({"success": True, "message": "Logged out successfully"})
 
@@ -931,7 +1506,7 @@ def doctor_logout():
 def doctor_me():
     """Get current doctor info"""
     doctor_id = session.get('doctor_id')
-    doctor = get_doctor_by_id(doctor_id)
+    doctor = doctor_cache.get(doctor_id)
     
     if doctor:
         return jsonify({"success": True, "doctor": doctor})
@@ -955,53 +1530,81 @@ def list_all_doctors():
 # ==================== REAL-TIME EEG COLLECTION (NEW) ====================
 # This endpoint provides automatic EEG collection without manual intervention
 # To rollback: Delete ml_model/eeg_realtime/ folder and this endpoint will be skipped
+# Collections run as background jobs so a 5-120 s test does not hold a Flask worker
+EEG_COLLECT_WORKERS = int(os.getenv('EEG_COLLECT_WORKERS', '4'))
+EEG_COLLECT_MAX_PENDING = int(os.getenv('EEG_COLLECT_MAX_PENDING', '16'))
+EEG_COLLECT_PER_HEADSET = int(os.getenv('EEG_COLLECT_PER_HEADSET', '1'))
+eeg_collection_jobs = None
+_eeg_collection_jobs_lock = threading.Lock()
+
+def get_eeg_collection_jobs():
+    """Job manager for real-time collections; raises ImportError if eeg_realtime is not available"""
+    global eeg_collection_jobs
+    with _eeg_collection_jobs_lock:
+        if eeg_collection_jobs is None:
+            from eeg_realtime.realtime_eeg_collector import collect_eeg_data
+            from eeg_realtime.collection_jobs import CollectionJobManager
+            eeg_collection_jobs = CollectionJobManager(
+                collect_eeg_data,
+                max_workers=EEG_COLLECT_WORKERS,
+                max_pending=EEG_COLLECT_MAX_PENDING,
+                per_headset_limit=EEG_COLLECT_PER_HEADSET
+            )
+        return eeg_collection_jobs
+
+def _eeg_module_unavailable():
+    # Module not found - fallback to old method
+    logger.info("[EEG Realtime] Module not found, falling back to old method")
+    return jsonify({
+        "success": False,
+        "error": "Real-time EEG collection module not available",
+        "fallback_available": True,
+        "message": "Please use the old method (run cortex_test.py separately)"
+    }), 503
+
 @app.route('/api/eeg/collect_realtime', methods=['POST'])
 def collect_realtime_eeg():
     """
-    Automatically collect EEG data from connected device.
-    No manual intervention required - connects, collects, filters, and returns averages.
+    Start an automatic EEG collection from the connected device.
+    Returns a job id immediately (202); poll /api/eeg/jobs/<job_id> for progress and the averages.
     """
     try:
         # Try to import the new real-time collector
         try:
-            from eeg_realtime.realtime_eeg_collector import collect_eeg_data, COLLECTION_DURATION
+            from eeg_realtime.realtime_eeg_collector import COLLECTION_DURATION
+            from eeg_realtime.collection_jobs import JobRejected
+            jobs = get_eeg_collection_jobs()
         except ImportError:
-            # Module not found - fallback to old method
-            logger.info("[EEG Realtime] Module not found, falling back to old method")
-            return jsonify({
-                "success": False,
-                "error": "Real-time EEG collection module not available",
-                "fallback_available": True,
-                "message": "Please use the old method (run cortex_test.py separately)"
-            }), 503
+            return _eeg_module_unavailable()
         
         # Get duration from request (optional, defaults to 30 seconds)
-        data = request.get_json() or {}
+        data = request.get_json(silent=True) or {}
         duration = data.get('duration', COLLECTION_DURATION)
         
         if not isinstance(duration, int) or duration < 5 or duration > 120:
             duration = COLLECTION_DURATION
         
-        logger.info(f"[EEG Realtime] Starting collection for {duration} seconds...")
-        
-        # Collect EEG data automatically
-        success, eeg_data, message = collect_eeg_data(duration=duration)
-        
-        if success and eeg_data:
-            logger.info(f"[EEG Realtime] Collection successful: {eeg_data}")
-            return jsonify({
-                "success": True,
-                "data": eeg_data,
-                "message": message,
-                "source": "realtime_collection"
-            })
-        else:
-            logger.warning(f"[EEG Realtime] Collection failed: {message}")
+        try:
+            # Every collection leases the shared pool's single headset, so they all queue behind
+            # one per-headset slot (a client-chosen key would let callers bypass the limit)
+            job = jobs.submit(duration)
+        except JobRejected as e:
+            logger.warning(f"[EEG Realtime] Collection rejected: {e}")
             return jsonify({
                 "success": False,
-                "error": message,
+                "error": str(e),
+                "reason": e.reason,
                 "fallback_available": True
-            }), 400
+            }), 429
+        
+        logger.info(f"[EEG Realtime] Collection job {job.id} queued for {duration} seconds")
+        return jsonify({
+            "success": True,
+            "job_id": job.id,
+            "status": job.status,
+            "duration": duration,
+            "status_url": f"/api/eeg/jobs/{job.id}"
+        }), 202
             
     except Exception as e:
         logger.error(f"[EEG Realtime] Error in endpoint: {e}")
@@ -1012,7 +1615,152 @@ def collect_realtime_eeg():
             "fallback_available": True
         }), 500
 
+@app.route('/api/eeg/jobs/<job_id>', methods=['GET'])
+def get_eeg_collection_job(job_id):
+    """Status, progress (samples so far) and, once finished, the averages of a collection job"""
+    try:
+        try:
+            jobs = get_eeg_collection_jobs()
+        except ImportError:
+            return _eeg_module_unavailable()
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({"success": False, "error": "Job not found"}), 404
+        result = job.to_dict()
+        result["success"] = True
+        result["source"] = "realtime_collection"
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"[EEG Realtime] Job status error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/eeg/jobs/<job_id>', methods=['DELETE'])
+def cancel_eeg_collection_job(job_id):
+    """Cancel a queued or running collection job"""
+    try:
+        try:
+            jobs = get_eeg_collection_jobs()
+        except ImportError:
+            return _eeg_module_unavailable()
+        job = jobs.cancel(job_id)
+        if job is None:
+            return jsonify({"success": False, "error": "Job not found"}), 404
+        logger.info(f"[EEG Realtime] Cancellation requested for job {job_id} (status {job.status})")
+        return jsonify({"success": True, "job_id": job.id, "status": job.status})
+    except Exception as e:
+        logger.error(f"[EEG Realtime] Job cancel error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/eeg/jobs', methods=['GET'])
+def eeg_collection_jobs_stats():
+    """Executor and per-headset load of the collection job subsystem"""
+    try:
+        try:
+            jobs = get_eeg_collection_jobs()
+        except ImportError:
+            return _eeg_module_unavailable()
+        return jsonify(jobs.stats())
+    except Exception as e:
+        logger.error(f"[EEG Realtime] Job stats error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/eeg/session_pool', methods=['GET'])
+def eeg_session_pool_health():
+    """State of the shared Cortex connection/session used by /api/eeg/collect_realtime"""
+    try:
+        try:
+            from eeg_realtime.realtime_eeg_collector import session_pool_stats
+        except ImportError:
+            return jsonify({"available": False, "error": "Real-time EEG collection module not available"}), 503
+        stats = session_pool_stats()
+        return jsonify({"available": True, "pool": stats})
+    except Exception as e:
+        logger.error(f"[EEG Realtime] Session pool health error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# Continuous sliding-window inference over the live pow stream (one model call per hop)
+EEG_INFER_WINDOW_SECONDS = float(os.getenv('EEG_INFER_WINDOW_SECONDS', '10'))
+EEG_INFER_HOP_SECONDS = float(os.getenv('EEG_INFER_HOP_SECONDS', '2'))
+EEG_INFER_CONNECT_TIMEOUT = 30  # seconds to bring the Cortex session up when starting
+eeg_streaming_predictor = None
+_eeg_streaming_predictor_lock = threading.Lock()
+
+def get_eeg_streaming_predictor():
+    global eeg_streaming_predictor
+    with _eeg_streaming_predictor_lock:
+        if eeg_streaming_predictor is None:
+            from eeg_realtime.streaming_inference import StreamingPredictor
+            eeg_streaming_predictor = StreamingPredictor(
+                stream_hub,
+                predict_eeg_with_models,
+                window_seconds=EEG_INFER_WINDOW_SECONDS,
+                hop_seconds=EEG_INFER_HOP_SECONDS
+            )
+        return eeg_streaming_predictor
+
+@app.route('/api/eeg/live_inference', methods=['POST'])
+def start_live_inference():
+    """
+    Start predicting continuously from the live pow stream. Results are published every hop
+    to the stream hub (/api/hub/stream?topic=eeg_predictions) and kept for GET polling.
+    """
+    try:
+        try:
+            from eeg_realtime.realtime_eeg_collector import get_session_pool
+            from eeg_realtime.cortex_client import CortexError
+            predictor = get_eeg_streaming_predictor()
+        except ImportError:
+            return _eeg_module_unavailable()
+        pool = get_session_pool()
+        try:
+            pool.run(pool.ensure_ready(), timeout=EEG_INFER_CONNECT_TIMEOUT)
+        except CortexError as e:
+            logger.error(f"[Streaming Inference] Cortex session not available: {e}")
+            return jsonify({"success": False, "error": f"Cortex session not available: {e.error}"}), 503
+        predictor.start(pool.subscribed.get('pow'))
+        pool.start_producer()
+        logger.info(f"[Streaming Inference] Running: window {EEG_INFER_WINDOW_SECONDS}s, hop {EEG_INFER_HOP_SECONDS}s")
+        return jsonify({"success": True, "stats": predictor.stats(), "stream_url": "/api/hub/stream?topic=eeg_predictions"})
+    except Exception as e:
+        logger.error(f"[Streaming Inference] Start error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/eeg/live_inference', methods=['GET'])
+def live_inference_results():
+    """Prediction time series (?since=<seq> for only newer entries) and predictor state"""
+    try:
+        try:
+            predictor = get_eeg_streaming_predictor()
+        except ImportError:
+            return _eeg_module_unavailable()
+        since = request.args.get('since', 0, type=int)
+        return jsonify({"success": True, "stats": predictor.stats(), "predictions": predictor.series(since)})
+    except Exception as e:
+        logger.error(f"[Streaming Inference] Results error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/eeg/live_inference', methods=['DELETE'])
+def stop_live_inference():
+    try:
+        try:
+            predictor = get_eeg_streaming_predictor()
+        except ImportError:
+            return _eeg_module_unavailable()
+        predictor.stop()
+        from eeg_realtime.realtime_eeg_collector import get_session_pool
+        get_session_pool().release_producer()
+        return jsonify({"success": True, "stats": predictor.stats()})
+    except Exception as e:
+        logger.error(f"[Streaming Inference] Stop error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 # Patient management endpoints
+def _get_page_args():
+    """(limit, page_token) when the request asks for a page (?limit= / ?page_token=), else None"""
+    if 'limit' not in request.args and 'page_token' not in request.args:
+        return None
+    return parse_page_size(request.args.get('limit')), request.args.get('page_token') or None
+
 @app.route('/api/patients', methods=['POST'])
 @require_auth
 def create_patient_endpoint():
@@ -1031,7 +1779,7 @@ def create_patient_endpoint():
         if not doctor_id:
             doctor_id = data.get('doctor_id')
             if doctor_id:
-                doctor = get_doctor_by_id(str(doctor_id))
+                doctor = doctor_cache.get(str(doctor_id))
                 if doctor:
                     session['doctor_id'] = str(doctor_id)
                     doctor_id = str(doctor_id)
@@ -1060,7 +1808,10 @@ def create_patient_endpoint():
 @app.route('/api/patients', methods=['GET'])
 @require_auth
 def list_patients():
-    """Get all patients for the logged-in doctor"""
+    """
+    Get all patients for the logged-in doctor, newest first.
+    With ?limit=N (and ?page_token= from the previous response) returns one page plus next_page_token.
+    """
     try:
         # Get doctor_id from session (set by require_auth decorator)
         doctor_id = session.get('doctor_id')
@@ -1074,7 +1825,7 @@ def list_patients():
             doctor_id = request.args.get('doctor_id')
             logger.info(f"🔍 [BACKEND DEBUG] Got doctor_id from query: {doctor_id}")
             if doctor_id:
-                doctor = get_doctor_by_id(str(doctor_id))
+                doctor = doctor_cache.get(str(doctor_id))
                 if doctor:
                     session['doctor_id'] = str(doctor_id)
                     doctor_id = str(doctor_id)
@@ -1090,7 +1841,14 @@ def list_patients():
         doctor_id = str(doctor_id)
         logger.info(f"🔍 [BACKEND DEBUG] Fetching patients for doctor_id: {doctor_id} (type: {type(doctor_id)})")
         
-        patients = get_all_patients(doctor_id)
+        try:
+            page_args = _get_page_args()
+            if page_args is not None:
+                patients, next_page_token = get_patients_page(doctor_id, *page_args)
+            else:
+                patients, next_page_token = get_all_patients(doctor_id), None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         logger.info(f"✅ [BACKEND DEBUG] Retrieved {len(patients)} patients from database")
         logger.info(f"🔍 [BACKEND DEBUG] Patients data: {patients}")
@@ -1104,6 +1862,7 @@ def list_patients():
         return jsonify({
             "success": True,
             "patients": patients,
+            "next_page_token": next_page_token,
             "doctor_id": doctor_id,  # Return doctor_id for verification
             "debug": {
                 "doctor_id": doctor_id,
@@ -1126,7 +1885,7 @@ def patient_endpoint(patient_id):
         if not doctor_id:
             doctor_id = request.args.get('doctor_id') or request.get_json().get('doctor_id') if request.is_json else None
             if doctor_id:
-                doctor = get_doctor_by_id(str(doctor_id))
+                doctor = doctor_cache.get(str(doctor_id))
                 if doctor:
                     session['doctor_id'] = str(doctor_id)
                     doctor_id = str(doctor_id)
@@ -1164,7 +1923,10 @@ def patient_endpoint(patient_id):
 @app.route('/api/patients/<patient_id>/reports', methods=['GET'])
 @require_auth
 def get_patient_reports_endpoint(patient_id):
-    """Get all reports for a patient"""
+    """
+    Get all reports for a patient, newest first (paged with ?limit= and ?page_token=).
+    ?view=summary returns only the list-view fields; /api/reports/<id> fetches a full report.
+    """
     try:
         # Get doctor_id from session (set by require_auth decorator)
         doctor_id = session.get('doctor_id')
@@ -1173,7 +1935,7 @@ def get_patient_reports_endpoint(patient_id):
         if not doctor_id:
             doctor_id = request.args.get('doctor_id')
             if doctor_id:
-                doctor = get_doctor_by_id(str(doctor_id))
+                doctor = doctor_cache.get(str(doctor_id))
                 if doctor:
                     session['doctor_id'] = str(doctor_id)
                     doctor_id = str(doctor_id)
@@ -1181,12 +1943,27 @@ def get_patient_reports_endpoint(patient_id):
         if not doctor_id:
             return jsonify({"error": "Authentication required. Please login again."}), 401
         
-        reports = get_patient_reports(patient_id, str(doctor_id))
+        try:
+            view = request.args.get('view', 'full')
+            if view not in ('full', 'summary'):
+                raise ValueError("view must be 'full' or 'summary'")
+            summary = view == 'summary'
+            page_args = _get_page_args()
+            if page_args is not None:
+                reports, next_page_token = get_patient_reports_page(
+                    patient_id, str(doctor_id), *page_args, summary=summary
+                )
+            else:
+                reports, next_page_token = get_patient_reports(patient_id, str(doctor_id), summary=summary), None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         return jsonify({
             "success": True,
             "patient_id": patient_id,
-            "reports": reports
+            "reports": reports,
+            "view": view,
+            "next_page_token": next_page_token
         })
     except Exception as e:
         logger.error(f"Get patient reports error: {e}")
@@ -1198,7 +1975,8 @@ def get_report_endpoint(report_id):
     """Get a specific report by ID"""
     try:
         doctor_id = session.get('doctor_id')
-        report = get_report_by_id(int(report_id), doctor_id)
+        # Firestore report ids are strings
+        report = get_report_by_id(report_id, str(doctor_id))
         
         if report:
             return jsonify({
@@ -1226,7 +2004,7 @@ def predict_combined_full():
             doctor_id = data.get('doctor_id') or request.headers.get('X-Doctor-Id')
             if doctor_id:
                 # Verify doctor exists and set in session
-                doctor = get_doctor_by_id(str(doctor_id))
+                doctor = doctor_cache.get(str(doctor_id))
                 if doctor:
                     session['doctor_id'] = str(doctor_id)
                     doctor_id = str(doctor_id)
@@ -1311,6 +2089,22 @@ def health_check():
             "arduino_data": "/latest_arduino_data",
             "eeg": "/predict_eeg",
             "biometric": "/predict_combined",
+            "eeg_batch": "/predict_eeg_batch",
+            "biometric_batch": "/predict_biometric_batch",
+            "prediction_cache": "/api/prediction_cache/stats",
+            "doctor_cache": "/api/doctor_cache/stats",
+            "firestore_cache": "/api/firestore_cache/stats",
+            "micro_batch": "/api/micro_batch/stats",
+            "eeg_stream": "/api/eeg/stream",
+            "hub_stream": "/api/hub/stream?topic=biometric/*",
+            "hub_stats": "/api/hub/stats",
+            "biometric_average": "/latest_avg_biometric?seconds=60",
+            "biometric_window": "/api/biometric/window?seconds=60",
+            "biometric_ingest_batch": "/api/biometric/ingest_batch",
+            "eeg_session_pool": "/api/eeg/session_pool",
+            "eeg_collect_realtime": "/api/eeg/collect_realtime",
+            "eeg_collection_jobs": "/api/eeg/jobs/<job_id>",
+            "eeg_live_inference": "/api/eeg/live_inference",
             "doctor_register": "/api/doctor/register",
             "doctor_login": "/api/doctor/login",
             "doctor_logout": "/api/doctor/logout",
@@ -1322,6 +2116,7 @@ def health_check():
             "label_encoder": label_encoder is not None,
             "combined_model": combined_model is not None
         },
+        "inference_engine": active_inference_engine,
         "connection_info": {
             "arduino_should_connect_to": f"http://{local_ip}:5000/predict_combined"
         }
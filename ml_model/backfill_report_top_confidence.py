@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+One-off Firestore migration: store combined_top_confidence on test reports saved
+before the field existed. The report list view (?view=summary) no longer reads
+combined_confidence_scores, so run this once per project before deploying it.
+Safe to re-run. Run from the ml_model directory:  python backfill_report_top_confidence.py
+"""
+import sys
+
+from firebase_database import backfill_report_top_confidence
+
+
+def main():
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    backfill_report_top_confidence(page_size)
+
+
+if __name__ == '__main__':
+    main()
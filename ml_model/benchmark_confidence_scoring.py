@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark and regression check: ConfidenceScorer vs the original per-class
+loop with list.sort. Every row must come back identical (order, rounded value,
+icon and note), including rows whose confidences sit on .x5 rounding ties.
+Run from the ml_model directory:  python benchmark_confidence_scoring.py [rows]
+"""
+import sys
+import time
+import numpy as np
+
+from confidence_scoring import ConfidenceScorer
+
+CLASSES = np.array([f'Disorder {i}' for i in range(10)])
+
+
+class LabelEncoder:
+    classes_ = CLASSES
+
+
+def status_icon(confidence):
+    if confidence > 50:
+        return "high"
+    elif confidence > 20:
+        return "medium"
+    elif confidence > 5:
+        return "low"
+    return "minimal"
+
+
+def disorder_note(disorder, confidence):
+    return f"{disorder}: {status_icon(confidence)}"
+
+
+def baseline_scores(prediction_proba, label_encoder):
+    """The original get_confidence_scores"""
+    confidence_scores = []
+    for i, disorder in enumerate(label_encoder.classes_):
+        confidence = float(prediction_proba[0][i] * 100)
+        confidence_scores.append({
+            'disorder': str(disorder),
+            'confidence': round(confidence, 1),
+            'status': status_icon(confidence),
+            'note': disorder_note(disorder, confidence)
+        })
+    confidence_scores.sort(key=lambda x: x['confidence'], reverse=True)
+    return confidence_scores
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = np.random.default_rng(7)
+    n_classes = len(CLASSES)
+    # Continuous rows, plus rows on a 1/2000 grid whose confidences land on .x5 ties
+    continuous = rng.dirichlet(np.ones(n_classes) * 0.3, size=n_rows)
+    grid = rng.integers(0, 200, size=(n_rows, n_classes)) / 2000
+    proba = np.vstack([continuous, grid, [[0.0004, 0.0005, 0.9991] + [0.0] * (n_classes - 3)]])
+
+    scorer = ConfidenceScorer(LabelEncoder(), status_icon, disorder_note)
+
+    start = time.perf_counter()
+    expected = [baseline_scores(proba[i:i + 1], LabelEncoder) for i in range(len(proba))]
+    baseline_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    actual = scorer.score_batch(proba)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    mismatches = sum(1 for a, e in zip(actual, expected) if a != e)
+    print(f"{len(proba)} rows x {n_classes} classes")
+    print(f"baseline loop: {baseline_ms:8.1f} ms")
+    print(f"score_batch:   {batch_ms:8.1f} ms  ({baseline_ms / batch_ms:.1f}x)")
+    print(f"rows differing from the baseline: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: sklearn predict_proba vs the flattened forest evaluator.
+Times single-row predictions (the /predict_eeg path) and reports p50/p99 latency.
+Run from the ml_model directory:  python benchmark_forest_engine.py [iterations]
+"""
+import pickle
+import sys
+import time
+import warnings
+import numpy as np
+
+from forest_engine import FlatForest
+
+warnings.filterwarnings('ignore')
+
+MODELS = [
+    ('random_forest_model.pkl', 'EEG (scaled, 5 features)'),
+    ('combined_anxiety_model.pkl', 'Biometric (2 features)'),
+]
+
+
+def time_calls(fn, rows):
+    """Return per-call latencies in microseconds"""
+    latencies = np.empty(len(rows))
+    for i, row in enumerate(rows):
+        start = time.perf_counter()
+        fn(row)
+        latencies[i] = (time.perf_counter() - start) * 1e6
+    return latencies
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = np.random.default_rng(42)
+
+    for filename, label in MODELS:
+        with open(filename, 'rb') as f:
+            model = pickle.load(f)
+
+        start = time.perf_counter()
+        flat = FlatForest(model)
+        export_ms = (time.perf_counter() - start) * 1000
+
+        X = rng.normal(size=(iterations, model.n_features_in_))
+        rows = [X[i:i + 1] for i in range(iterations)]
+
+        # Warm up both paths
+        for row in rows[:20]:
+            model.predict_proba(row)
+            flat.predict_proba(row)
+
+        identical = np.array_equal(model.predict_proba(X), flat.predict_proba(X))
+
+        sk = time_calls(model.predict_proba, rows)
+        fl = time_calls(flat.predict_proba, rows)
+
+        print("=" * 60)
+        print(f"{label}: {len(model.estimators_)} trees, {flat.node_count} nodes, max depth {flat.max_depth}")
+        print(f"Export time: {export_ms:.1f} ms, bit-identical on {iterations} rows: {identical}")
+        print(f"{'engine':10s} {'p50 (us)':>10s} {'p99 (us)':>10s} {'mean (us)':>10s}")
+        for name, lat in (('sklearn', sk), ('flat', fl)):
+            print(f"{name:10s} {np.percentile(lat, 50):10.1f} {np.percentile(lat, 99):10.1f} {lat.mean():10.1f}")
+        print(f"Speedup (p50): {np.percentile(sk, 50) / np.percentile(fl, 50):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JSON backends of eeg_realtime.json_codec on Cortex frames.
+Parses and serialises recorded stream messages (the payload_json column of a
+CSV written by EEG/real_time_eeg.py) or, without a recording, synthetic
+pow/eeg notifications of the same shape, plus a report-sized API response
+with NumPy values.
+Run from the ml_model directory:  python benchmark_json_codec.py [recording.csv] [repeat]
+"""
+import csv
+import json
+import sys
+import time
+import numpy as np
+
+from eeg_realtime import json_codec
+
+N_CHANNELS = 5
+POW_BANDS = ['theta', 'alpha', 'betaL', 'betaH', 'gamma']
+
+
+def recorded_messages(path: str):
+    """Rebuild stream notifications from a real_time_eeg.py CSV recording"""
+    messages = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            payload = row.get('payload_json')
+            if not payload:
+                continue
+            stream_time = float(row['stream_time']) if row.get('stream_time') else None
+            messages.append({'sid': 'recorded', 'time': stream_time, row['stream']: json.loads(payload)})
+    return messages
+
+
+def synthetic_messages(n_frames: int, rng):
+    """pow notifications at 8 Hz and eeg notifications at 128 Hz, as Cortex sends them"""
+    messages = []
+    t = 1_700_000_000.0
+    for i in range(n_frames):
+        t += 1 / 128
+        eeg = [i % 128, 0] + rng.normal(4200, 30, size=N_CHANNELS).round(6).tolist() + [0, 0, []]
+        messages.append({'sid': 'sess-1', 'time': round(t, 4), 'eeg': eeg})
+        if i % 16 == 0:
+            powr = rng.lognormal(0, 0.5, size=N_CHANNELS * len(POW_BANDS)).round(6).tolist()
+            messages.append({'sid': 'sess-1', 'time': round(t, 4), 'pow': powr})
+    return messages
+
+
+def report_response(rng):
+    """A patient report as the API returns it, with NumPy values left unconverted"""
+    eeg = rng.lognormal(0, 0.5, size=(240, 5))
+    return {
+        'success': True,
+        'report': {
+            'report_id': 42,
+            'report_data': {
+                'eeg_data': {band: np.float32(v) for band, v in zip(['delta', 'theta', 'alpha', 'beta', 'gamma'], eeg[-1])},
+                'eeg_history': eeg,
+                'biometric_history': rng.normal(97, 1, size=(600, 2)),
+                'confidence_scores': [
+                    {'disorder': f'Disorder {i}', 'confidence': np.float64(v), 'rank': np.int64(i)}
+                    for i, v in enumerate(rng.uniform(0, 100, size=6))
+                ],
+                'notes': 'x' * 2000
+            }
+        }
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    args = sys.argv[1:]
+    repeat = int(args.pop()) if len(args) > 1 else 5
+    rng = np.random.default_rng(7)
+    if args:
+        messages = recorded_messages(args[0])
+        source = args[0]
+    else:
+        messages = synthetic_messages(4096, rng)
+        source = 'synthetic'
+    if not messages:
+        print(f"No stream messages in {source}")
+        return
+    raw = [json.dumps(m) for m in messages]
+    report = report_response(rng)
+    total_bytes = sum(len(r) for r in raw)
+
+    print(f"{len(messages)} Cortex messages ({source}, {total_bytes / len(raw):.0f} bytes avg), best of {repeat}")
+    print(f"{'backend':8s} {'parse us/msg':>13s} {'dump us/msg':>12s} {'report ms':>10s} {'report KB':>10s}")
+    for name, (loads, dumps) in json_codec.BACKENDS.items():
+        parse = timed(lambda: [loads(r) for r in raw], repeat) / len(raw)
+        dump = timed(lambda: [dumps(m) for m in messages], repeat) / len(messages)
+        report_time = timed(lambda: dumps(report), repeat)
+        size = len(dumps(report)) / 1024
+        print(f"{name:8s} {parse * 1e6:13.2f} {dump * 1e6:12.2f} {report_time * 1e3:10.2f} {size:10.1f}")
+    print(f"active backend: {json_codec.BACKEND}")
+
+
+if __name__ == '__main__':
+    main()
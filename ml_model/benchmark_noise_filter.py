@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: EEG collector noise filters on synthetic pow frames with artifacts.
+Compares the old two-pass 3-sigma filter over stored lists, the streaming
+'sigma' mode (running mean/std) and the streaming 'robust' mode (P-square
+median/MAD): CPU time per frame and distance of the band averages from the
+artifact-free mean.
+Run from the ml_model directory:  python benchmark_noise_filter.py [frames] [artifact_rate]
+"""
+import sys
+import time
+import numpy as np
+
+from eeg_realtime.running_stats import make_band_stats, FILTER_MODES
+
+N_CHANNELS = 5
+BAND_NAMES = ['delta', 'theta', 'alpha', 'beta', 'gamma']
+THRESHOLD = 3.0
+
+
+def synthetic_frames(n_frames: int, artifact_rate: float, rng):
+    """Log-normal band powers plus sparse large spikes (movement/blink artifacts)"""
+    base = np.array([12.0, 6.0, 8.0, 4.0, 1.5])
+    clean = rng.lognormal(mean=np.log(base), sigma=0.35, size=(n_frames, N_CHANNELS, len(BAND_NAMES)))
+    spikes = rng.random(clean.shape) < artifact_rate
+    noisy = np.where(spikes, clean * rng.uniform(8, 40, size=clean.shape), clean)
+    return clean, noisy
+
+
+def two_pass_averages(frames: np.ndarray) -> np.ndarray:
+    """The collector before streaming stats: per-cell lists, then filter_noise and a global mean"""
+    lists = {(c, b): [] for c in range(N_CHANNELS) for b in range(len(BAND_NAMES))}
+    for frame in frames:
+        for idx, val in enumerate(frame.ravel()):
+            lists[(idx // len(BAND_NAMES), idx % len(BAND_NAMES))].append(float(val))
+
+    averages = []
+    for b in range(len(BAND_NAMES)):
+        totals = []
+        for c in range(N_CHANNELS):
+            values = lists[(c, b)]
+            arr = np.array(values)
+            mean, std = np.mean(arr), np.std(arr)
+            filtered = [v for v in values if abs(v - mean) <= THRESHOLD * std] if std else values
+            if len(filtered) < len(values) * 0.5:
+                filtered = values
+            totals.extend(filtered)
+        averages.append(np.mean(totals))
+    return np.array(averages)
+
+
+def streaming_averages(mode: str, frames: np.ndarray) -> np.ndarray:
+    stats = make_band_stats(mode, N_CHANNELS, len(BAND_NAMES), THRESHOLD)
+    for frame in frames:
+        stats.update(frame)
+    return stats.band_averages()
+
+
+def main():
+    n_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 2400  # 5 minutes of pow at 8 Hz
+    artifact_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.03
+    rng = np.random.default_rng(7)
+    clean, noisy = synthetic_frames(n_frames, artifact_rate, rng)
+    target = clean.mean(axis=(0, 1))
+
+    methods = [('two-pass', two_pass_averages)]
+    methods += [(mode, lambda frames, mode=mode: streaming_averages(mode, frames)) for mode in FILTER_MODES]
+
+    print(f"{n_frames} frames x {N_CHANNELS} channels x {len(BAND_NAMES)} bands, artifact rate {artifact_rate:.1%}")
+    print(f"{'method':10s} {'us/frame':>9s} {'max rel err':>12s}  " + " ".join(f"{b:>7s}" for b in BAND_NAMES))
+    print(f"{'clean':10s} {'':>9s} {'':>12s}  " + " ".join(f"{v:7.3f}" for v in target))
+    print(f"{'no filter':10s} {'':>9s} {np.max(np.abs(noisy.mean(axis=(0, 1)) / target - 1)):12.2%}  " +
+          " ".join(f"{v:7.3f}" for v in noisy.mean(axis=(0, 1))))
+    for name, fn in methods:
+        start = time.perf_counter()
+        averages = fn(noisy)
+        elapsed = time.perf_counter() - start
+        rel_err = np.max(np.abs(averages / target - 1))
+        print(f"{name:10s} {elapsed / n_frames * 1e6:9.1f} {rel_err:12.2%}  " + " ".join(f"{v:7.3f}" for v in averages))
+
+
+if __name__ == '__main__':
+    main()
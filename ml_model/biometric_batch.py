@@ -0,0 +1,135 @@
+"""
+Decoding of batched Arduino readings for /api/biometric/ingest_batch
+The ESP32 buffers readings and posts them together instead of one HTTP
+request per reading. Three body formats are accepted:
+
+- JSON: an array of reading objects, or {"readings": [...], "device_id", "predict", "top_k"}
+- NDJSON (application/x-ndjson): one reading object per line
+- Binary (application/octet-stream): little-endian 16-byte records
+  <uint32 millis, float32 spo2, float32 gsr, float32 hr>, NaN for a missing value
+
+A reading carries either "timestamp" (Unix seconds) or "millis" (device
+uptime, as returned by millis() on the ESP32, which has no wall clock).
+Uptime readings are anchored so that the newest one lands at the time the
+request was received; readings with neither get the receive time.
+"""
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from biometric_ring import FIELDS, field_value
+from eeg_realtime import json_codec
+
+BINARY_RECORD = struct.Struct('<Ifff')
+BINARY_DTYPE = np.dtype([('millis', '<u4'), ('spo2', '<f4'), ('gsr', '<f4'), ('hr', '<f4')])
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonlines')
+BINARY_TYPES = ('application/octet-stream',)
+
+
+class Batch:
+    """Decoded readings: ascending timestamps (n,) and values (n, 3) in FIELDS order"""
+
+    def __init__(self, timestamps: np.ndarray, values: np.ndarray, options: Optional[Dict] = None):
+        self.timestamps = timestamps
+        self.values = values
+        self.options = options or {}  # device_id / predict / top_k from a JSON envelope
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def latest(self) -> Dict:
+        """Newest reading as a /predict_combined style payload"""
+        values = self.values[-1].tolist()
+        reading = {field: value for field, value in zip(FIELDS, values) if value == value}
+        reading['timestamp'] = float(self.timestamps[-1])
+        return reading
+
+
+def _anchor(timestamps: np.ndarray, millis: np.ndarray, received_at: float) -> np.ndarray:
+    """Fill timestamps of readings that only carry device uptime (NaN timestamp, finite millis)"""
+    relative = np.isnan(timestamps) & ~np.isnan(millis)
+    if relative.any():
+        newest = np.nanmax(millis[relative])
+        timestamps[relative] = received_at - (newest - millis[relative]) / 1000.0
+    timestamps[np.isnan(timestamps)] = received_at
+    return timestamps
+
+
+def _sorted(timestamps: np.ndarray, values: np.ndarray, options: Optional[Dict] = None) -> Batch:
+    order = np.argsort(timestamps, kind='stable')
+    return Batch(timestamps[order], values[order], options)
+
+
+def _number(value, name: str, row: int) -> float:
+    if value is None or value == '':
+        return float('nan')
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Row {row}: invalid {name}")
+
+
+def decode_readings(readings: List, received_at: float, max_rows: int, options: Optional[Dict] = None) -> Batch:
+    if not isinstance(readings, list) or len(readings) == 0:
+        raise ValueError("Request must contain a non-empty list of readings")
+    if len(readings) > max_rows:
+        raise ValueError(f"Too many readings: {len(readings)} (max {max_rows})")
+
+    n = len(readings)
+    timestamps = np.full(n, np.nan)
+    millis = np.full(n, np.nan)
+    values = np.empty((n, len(FIELDS)))
+    for i, reading in enumerate(readings):
+        if not isinstance(reading, dict):
+            raise ValueError(f"Row {i}: expected an object")
+        timestamps[i] = _number(reading.get('timestamp', reading.get('t')), 'timestamp', i)
+        millis[i] = _number(reading.get('millis'), 'millis', i)
+        for j, field in enumerate(FIELDS):
+            values[i, j] = field_value(reading, field)
+        if np.isnan(values[i, 0]) and np.isnan(values[i, 1]):
+            raise ValueError(f"Row {i}: missing spo2 and gsr")
+    return _sorted(_anchor(timestamps, millis, received_at), values, options)
+
+
+def decode_json(body: bytes, received_at: float, max_rows: int) -> Batch:
+    data = json_codec.loads(body)
+    if isinstance(data, dict):
+        options = {key: data[key] for key in ('device_id', 'predict', 'top_k') if key in data}
+        return decode_readings(data.get('readings'), received_at, max_rows, options)
+    return decode_readings(data, received_at, max_rows)
+
+
+def decode_ndjson(body: bytes, received_at: float, max_rows: int) -> Batch:
+    readings = [json_codec.loads(line) for line in body.splitlines() if line.strip()]
+    return decode_readings(readings, received_at, max_rows)
+
+
+def decode_binary(body: bytes, received_at: float, max_rows: int) -> Batch:
+    if len(body) == 0 or len(body) % BINARY_RECORD.size:
+        raise ValueError(f"Binary body must be a non-empty sequence of {BINARY_RECORD.size}-byte records")
+    n = len(body) // BINARY_RECORD.size
+    if n > max_rows:
+        raise ValueError(f"Too many readings: {n} (max {max_rows})")
+    records = np.frombuffer(body, dtype=BINARY_DTYPE)
+    values = np.column_stack([records[field].astype(np.float64) for field in FIELDS])
+    millis = records['millis'].astype(np.float64)
+    return _sorted(_anchor(np.full(n, np.nan), millis, received_at), values)
+
+
+def decode_batch(body: bytes, content_type: Optional[str], received_at: float, max_rows: int) -> Batch:
+    """Decode a request body by its Content-Type (JSON unless NDJSON or binary); raises ValueError"""
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    try:
+        if mimetype in BINARY_TYPES:
+            return decode_binary(body, received_at, max_rows)
+        if mimetype in NDJSON_TYPES:
+            return decode_ndjson(body, received_at, max_rows)
+        return decode_json(body, received_at, max_rows)
+    except json_codec.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+
+
+def encode_binary(records: List[Tuple[int, float, float, float]]) -> bytes:
+    """Pack (millis, spo2, gsr, hr) tuples into the binary body format (for tests and tools)"""
+    return b''.join(BINARY_RECORD.pack(*record) for record in records)
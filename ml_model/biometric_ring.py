@@ -0,0 +1,198 @@
+"""
+Per-device ring buffers of Arduino biometric samples
+Each device gets a fixed-capacity float64 array of (timestamp, spo2, gsr, hr)
+records plus running (cumulative) sums and value counts per field, written
+in place on ingest: no per-sample allocation and no unbounded growth. A
+windowed mean is the difference of two cumulative sums, found with one
+binary search over the timestamps, however many samples the window holds.
+Missing fields (the Arduino firmware does not send heart rate) are NaN and
+excluded from the means.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+FIELDS = ('spo2', 'gsr', 'hr')
+# Payload keys accepted for each field
+FIELD_KEYS = {
+    'spo2': ('spo2',),
+    'gsr': ('gsr',),
+    'hr': ('hr', 'heart_rate', 'bpm', 'hr_mean'),
+}
+DEFAULT_CAPACITY = 3600  # samples per device
+DEFAULT_MAX_DEVICES = 64  # least recently updated devices are forgotten beyond this
+
+# Columns of the record array
+_T = 0
+_VALUES = slice(1, 4)
+_CSUM = slice(4, 7)  # cumulative sums up to and including the record
+_CCOUNT = slice(7, 10)  # cumulative count of non-missing values
+_N_COLS = 10
+
+
+def field_value(data: Dict, field: str) -> float:
+    for key in FIELD_KEYS[field]:
+        value = data.get(key)
+        if value is None or value == '':
+            continue
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float('nan')
+    return float('nan')
+
+
+class BiometricRing:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._records = np.zeros((capacity, _N_COLS))
+        self._lock = threading.Lock()
+        self.write_index = 0  # samples ever written
+        # Running totals as Python floats so ingest does not create NumPy scalars
+        self._sums = [0.0, 0.0, 0.0]
+        self._counts = [0.0, 0.0, 0.0]
+        self.last_update = None
+
+    def append(self, timestamp: float, spo2: float, gsr: float, hr: float) -> None:
+        with self._lock:
+            row = self.write_index % self.capacity
+            records = self._records
+            sums = self._sums
+            counts = self._counts
+            records[row, _T] = timestamp
+            for i, value in enumerate((spo2, gsr, hr)):
+                records[row, 1 + i] = value
+                if value == value:  # not NaN
+                    sums[i] += value
+                    counts[i] += 1.0
+                records[row, 4 + i] = sums[i]
+                records[row, 7 + i] = counts[i]
+            self.write_index += 1
+            self.last_update = timestamp
+
+    def extend(self, timestamps: np.ndarray, values: np.ndarray) -> None:
+        """Append n samples at once: ascending timestamps (n,) and values (n, 3) in FIELDS order"""
+        n = len(timestamps)
+        if n == 0:
+            return
+        present = ~np.isnan(values)
+        with self._lock:
+            # Timestamps must not go backwards across batches, or the window search breaks
+            if self.last_update is not None:
+                timestamps = np.maximum(timestamps, self.last_update)
+            csum = np.cumsum(np.where(present, values, 0.0), axis=0) + self._sums
+            ccount = np.cumsum(present, axis=0) + self._counts
+            keep = slice(max(0, n - self.capacity), n)  # a batch larger than the ring keeps its newest samples
+            rows = np.arange(self.write_index + keep.start, self.write_index + n) % self.capacity
+            records = self._records
+            records[rows, _T] = timestamps[keep]
+            records[rows, _VALUES] = values[keep]
+            records[rows, _CSUM] = csum[keep]
+            records[rows, _CCOUNT] = ccount[keep]
+            self._sums = csum[-1].tolist()
+            self._counts = ccount[-1].tolist()
+            self.write_index += n
+            self.last_update = float(timestamps[-1])
+
+    def __len__(self) -> int:
+        return min(self.write_index, self.capacity)
+
+    def _start_index(self, seconds: Optional[float]) -> int:
+        """Absolute index of the oldest stored sample within `seconds` of the newest one"""
+        end = self.write_index
+        oldest = end - len(self)
+        if seconds is None:
+            return oldest
+        cutoff = self._records[(end - 1) % self.capacity, _T] - seconds
+        # Stored timestamps are ascending in write order: search the (up to two) contiguous runs
+        first = oldest % self.capacity
+        if first + len(self) <= self.capacity:
+            return oldest + int(np.searchsorted(self._records[first:first + len(self), _T], cutoff, side='left'))
+        head = self._records[first:, _T]
+        if head[-1] >= cutoff:
+            return oldest + int(np.searchsorted(head, cutoff, side='left'))
+        tail = self._records[:end % self.capacity, _T]
+        return oldest + len(head) + int(np.searchsorted(tail, cutoff, side='left'))
+
+    def window_means(self, seconds: Optional[float] = None) -> Dict:
+        """Means of each field over the last `seconds` (all stored samples if None)"""
+        with self._lock:
+            if self.write_index == 0:
+                return {'samples': 0, 'means': {field: None for field in FIELDS}, 'latest_timestamp': None}
+            end = self.write_index
+            start = self._start_index(seconds)
+            last = self._records[(end - 1) % self.capacity]
+            first = self._records[start % self.capacity]
+            # Cumulative values include the record itself, so add the first record back
+            sums = last[_CSUM] - first[_CSUM] + np.nan_to_num(first[_VALUES])
+            counts = last[_CCOUNT] - first[_CCOUNT] + ~np.isnan(first[_VALUES])
+            latest = float(last[_T])
+        means = {
+            field: (round(float(sums[i] / counts[i]), 4) if counts[i] > 0 else None)
+            for i, field in enumerate(FIELDS)
+        }
+        return {'samples': end - start, 'means': means, 'latest_timestamp': latest}
+
+    def window(self, seconds: Optional[float] = None) -> List[Dict]:
+        """Raw samples of the last `seconds`, oldest first"""
+        with self._lock:
+            if self.write_index == 0:
+                return []
+            start = self._start_index(seconds)
+            rows = np.take(self._records, np.arange(start, self.write_index) % self.capacity, axis=0)
+        return [
+            {'timestamp': t, **{field: (None if v != v else v) for field, v in zip(FIELDS, values)}}
+            for t, *values in rows[:, :4].tolist()
+        ]
+
+
+class BiometricStore:
+    """Ring per device id, created on the device's first sample"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, max_devices: int = DEFAULT_MAX_DEVICES):
+        self.capacity = capacity
+        self.max_devices = max_devices
+        self._rings: "OrderedDict[str, BiometricRing]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ring(self, device_id: str) -> BiometricRing:
+        with self._lock:
+            ring = self._rings.get(device_id)
+            if ring is None:
+                ring = BiometricRing(self.capacity)
+                self._rings[device_id] = ring
+                while len(self._rings) > self.max_devices:
+                    self._rings.popitem(last=False)
+            else:
+                self._rings.move_to_end(device_id)
+            return ring
+
+    def ingest(self, device_id: str, data: Dict, timestamp: Optional[float] = None) -> None:
+        """Append one Arduino payload ({'spo2', 'gsr', optional 'hr'}) to the device's ring"""
+        self.ring(device_id).append(
+            time.time() if timestamp is None else timestamp,
+            field_value(data, 'spo2'), field_value(data, 'gsr'), field_value(data, 'hr')
+        )
+
+    def ingest_batch(self, device_id: str, timestamps: np.ndarray, values: np.ndarray) -> None:
+        """Append a decoded batch (see biometric_batch.Batch) to the device's ring in one write"""
+        self.ring(device_id).extend(timestamps, values)
+
+    def get(self, device_id: Optional[str] = None) -> Optional[BiometricRing]:
+        """The device's ring, or the most recently updated one when device_id is None"""
+        with self._lock:
+            if device_id is not None:
+                return self._rings.get(device_id)
+            return next(reversed(self._rings.values()), None)
+
+    def latest_device(self) -> Optional[str]:
+        with self._lock:
+            return next(reversed(self._rings), None)
+
+    def devices(self) -> Dict[str, Dict]:
+        with self._lock:
+            rings = list(self._rings.items())
+        return {device: {'samples': len(ring), 'last_update': ring.last_update} for device, ring in rings}
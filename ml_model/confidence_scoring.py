@@ -0,0 +1,92 @@
+"""
+Array-native confidence scoring
+Turns predict_proba output into the confidence_scores list used by the API.
+Status icons and notes are looked up from tables built once per class and
+threshold bucket, so per-prediction work is a NumPy sort plus top-k dicts.
+"""
+import numpy as np
+from typing import Callable, Dict, List, Optional
+
+# Bucket edges in percent; a confidence c falls in bucket i when
+# BUCKET_EDGES[i-1] < c <= BUCKET_EDGES[i] (same strict ">" checks as get_status_icon)
+BUCKET_EDGES = np.array([5.0, 20.0, 50.0])
+
+# One confidence value inside each bucket, used to evaluate the note/icon functions
+BUCKET_REPRESENTATIVES = (0.0, 10.0, 30.0, 75.0)
+
+
+def round_confidence(confidence: np.ndarray) -> np.ndarray:
+    """
+    Round to one decimal exactly like Python's round(x, 1). np.round scales by 10 and
+    rounds half to even, which disagrees near .x5 ties; only those cells are redone.
+    """
+    rounded = np.round(confidence, 1)
+    scaled = confidence * 10
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(x, 1) for x in confidence[near_tie].tolist()]
+    return rounded
+
+
+class ConfidenceScorer:
+    """Precomputed icon/note tables for one label encoder's classes"""
+
+    def __init__(self, label_encoder, status_fn: Callable[[float], str],
+                 note_fn: Callable[[str, float], str]):
+        self.label_encoder = label_encoder
+        self.classes = [str(c) for c in label_encoder.classes_]
+        self.n_classes = len(self.classes)
+        self.status_table = [status_fn(rep) for rep in BUCKET_REPRESENTATIVES]
+        # note_table[class_idx][bucket]
+        self.note_table = [
+            [note_fn(disorder, rep) for rep in BUCKET_REPRESENTATIVES]
+            for disorder in self.classes
+        ]
+
+    def _check_shape(self, proba: np.ndarray) -> np.ndarray:
+        proba = np.asarray(proba, dtype=np.float64)
+        if proba.ndim == 1:
+            proba = proba.reshape(1, -1)
+        if proba.shape[1] != self.n_classes:
+            raise ValueError(
+                f"Probability array has {proba.shape[1]} classes, "
+                f"label encoder has {self.n_classes}"
+            )
+        return proba
+
+    def score_batch(self, prediction_proba, top_k: Optional[int] = None) -> List[List[Dict]]:
+        """
+        Score an (N, n_classes) probability matrix.
+        Returns one confidence_scores list per row, highest confidence first.
+        """
+        proba = self._check_shape(prediction_proba)
+        confidence = proba * 100
+        # One rounding for both the sort key and the displayed value
+        rounded = round_confidence(confidence)
+        buckets = np.digitize(confidence, BUCKET_EDGES, right=True)
+
+        # Stable sort on the rounded value keeps label order for ties,
+        # matching list.sort(key=confidence, reverse=True)
+        order = np.argsort(-rounded, axis=1, kind='stable')
+        if top_k is not None:
+            order = order[:, :top_k]
+
+        results = []
+        for row_idx in range(proba.shape[0]):
+            row_rounded = rounded[row_idx]
+            row_buckets = buckets[row_idx]
+            scores = []
+            for class_idx in order[row_idx].tolist():
+                bucket = row_buckets[class_idx]
+                scores.append({
+                    'disorder': self.classes[class_idx],
+                    'confidence': float(row_rounded[class_idx]),
+                    'status': self.status_table[bucket],
+                    'note': self.note_table[class_idx][bucket]
+                })
+            results.append(scores)
+        return results
+
+    def score(self, prediction_proba, top_k: Optional[int] = None) -> List[Dict]:
+        """Score a single (1, n_classes) probability row"""
+        return self.score_batch(prediction_proba, top_k)[0]
@@ -6,6 +6,8 @@ from datetime import datetime
 from typing import Optional, Dict, List, Tuple
 import os
 
+from pagination import decode_page_token, split_page
+
 DATABASE_PATH = 'anxiety_clinic.db'
 
 def get_db_connection():
@@ -65,6 +67,16 @@ def init_database():
         )
     ''')
     
+    # Keyset pagination indexes (newest first, id as tie-breaker)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_patients_doctor_created
+        ON patients (doctor_id, created_at DESC, id DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reports_patient_date
+        ON test_reports (patient_id, doctor_id, test_date DESC, id DESC)
+    ''')
+    
     conn.commit()
     conn.close()
     print("✅ Database initialized successfully")
@@ -241,6 +253,17 @@ def get_patient_by_id(patient_id: str, doctor_id: int) -> Optional[Dict]:
         }
     return None
 
+def _patient_from_row(row) -> Dict:
+    return {
+        'id': row[0],
+        'patient_id': row[1],
+        'doctor_id': row[2],
+        'name': row[3],
+        'age': row[4],
+        'gender': row[5],
+        'created_at': row[6]
+    }
+
 def get_all_patients(doctor_id: int) -> List[Dict]:
     """Get all patients for a doctor"""
     conn = get_db_connection()
@@ -252,21 +275,40 @@ def get_all_patients(doctor_id: int) -> List[Dict]:
         ORDER BY created_at DESC
     ''', (doctor_id,))
     
-    patients = []
-    for row in cursor.fetchall():
-        patients.append({
-            'id': row[0],
-            'patient_id': row[1],
-            'doctor_id': row[2],
-            'name': row[3],
-            'age': row[4],
-            'gender': row[5],
-            'created_at': row[6]
-        })
+    patients = [_patient_from_row(row) for row in cursor.fetchall()]
     
     conn.close()
     return patients
 
+def get_patients_page(doctor_id: int, limit: int, page_token: str = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of a doctor's patients, newest first, and the token of the next page
+    (None on the last page). Raises ValueError for an invalid page_token.
+    """
+    after = decode_page_token(page_token) if page_token else None
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    if after is None:
+        cursor.execute('''
+            SELECT id, patient_id, doctor_id, name, age, gender, created_at FROM patients
+            WHERE doctor_id = ?
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        ''', (doctor_id, limit + 1))
+    else:
+        cursor.execute('''
+            SELECT id, patient_id, doctor_id, name, age, gender, created_at FROM patients
+            WHERE doctor_id = ? AND (created_at < ? OR (created_at = ? AND id < ?))
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        ''', (doctor_id, after[0], after[0], after[1], limit + 1))
+    
+    patients = [_patient_from_row(row) for row in cursor.fetchall()]
+    
+    conn.close()
+    return split_page(patients, limit, 'created_at')
+
 def save_test_report(patient_id: str, doctor_id: int, eeg_data: Dict, biometric_data: Dict,
                     eeg_prediction: Dict, biometric_prediction: Dict, combined_prediction: Dict) -> Tuple[bool, str, Optional[Dict]]:
     """Save a test report"""
@@ -311,36 +353,106 @@ def save_test_report(patient_id: str, doctor_id: int, eeg_data: Dict, biometric_
         conn.close()
         return False, f"Error saving report: {str(e)}", None
 
-def get_patient_reports(patient_id: str, doctor_id: int) -> List[Dict]:
-    """Get all reports for a patient"""
+REPORT_COLUMNS = '''
+    id, patient_id, test_date, eeg_prediction, biometric_prediction,
+    combined_prediction, combined_confidence_scores, conflict_analysis, report_data
+'''
+# List-view subset: the nested values are extracted by SQLite, so the large JSON
+# columns are neither returned nor parsed in Python
+REPORT_SUMMARY_COLUMNS = '''
+    id, patient_id, test_date, combined_prediction,
+    json_extract(combined_confidence_scores, '$[0].confidence'),
+    json_extract(eeg_prediction, '$.primary_prediction'),
+    json_extract(biometric_prediction, '$.primary_prediction'),
+    json_extract(conflict_analysis, '$.has_conflict'),
+    json_extract(conflict_analysis, '$.severity'),
+    json_extract(report_data, '$.primary_prediction')
+'''
+
+def _report_from_row(row) -> Dict:
+    return {
+        'id': row[0],
+        'patient_id': row[1],
+        'test_date': row[2],
+        'eeg_prediction': json.loads(row[3]) if row[3] else None,
+        'biometric_prediction': json.loads(row[4]) if row[4] else None,
+        'combined_prediction': row[5],
+        'combined_confidence_scores': json.loads(row[6]) if row[6] else [],
+        'conflict_analysis': json.loads(row[7]) if row[7] else {},
+        'report_data': json.loads(row[8]) if row[8] else {}
+    }
+
+def _report_summary_from_row(row) -> Dict:
+    """Same shape as _report_from_row, holding only the list-view fields"""
+    conflict = {}
+    if row[7] is not None:
+        conflict['has_conflict'] = bool(row[7])
+    if row[8] is not None:
+        conflict['severity'] = row[8]
+    return {
+        'id': row[0],
+        'patient_id': row[1],
+        'test_date': row[2],
+        'combined_prediction': row[3],
+        'combined_top_confidence': row[4],
+        'eeg_prediction': {'primary_prediction': row[5]} if row[5] is not None else None,
+        'biometric_prediction': {'primary_prediction': row[6]} if row[6] is not None else None,
+        'conflict_analysis': conflict,
+        'report_data': {'primary_prediction': row[9]} if row[9] is not None else {}
+    }
+
+def get_patient_reports(patient_id: str, doctor_id: int, summary: bool = False) -> List[Dict]:
+    """Get all reports for a patient (list-view fields only with summary=True)"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT id, patient_id, test_date, eeg_prediction, biometric_prediction,
-               combined_prediction, combined_confidence_scores, conflict_analysis, report_data
+    cursor.execute(f'''
+        SELECT {REPORT_SUMMARY_COLUMNS if summary else REPORT_COLUMNS}
         FROM test_reports
         WHERE patient_id = ? AND doctor_id = ?
         ORDER BY test_date DESC
     ''', (patient_id, doctor_id))
     
-    reports = []
-    for row in cursor.fetchall():
-        reports.append({
-            'id': row[0],
-            'patient_id': row[1],
-            'test_date': row[2],
-            'eeg_prediction': json.loads(row[3]) if row[3] else None,
-            'biometric_prediction': json.loads(row[4]) if row[4] else None,
-            'combined_prediction': row[5],
-            'combined_confidence_scores': json.loads(row[6]) if row[6] else [],
-            'conflict_analysis': json.loads(row[7]) if row[7] else {},
-            'report_data': json.loads(row[8]) if row[8] else {}
-        })
+    from_row = _report_summary_from_row if summary else _report_from_row
+    reports = [from_row(row) for row in cursor.fetchall()]
     
     conn.close()
     return reports
 
+def get_patient_reports_page(patient_id: str, doctor_id: int, limit: int, page_token: str = None,
+                             summary: bool = False) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of a patient's reports (list-view fields only with summary=True), newest first,
+    and the token of the next page (None on the last page). Raises ValueError for an invalid page_token.
+    """
+    after = decode_page_token(page_token) if page_token else None
+    columns = REPORT_SUMMARY_COLUMNS if summary else REPORT_COLUMNS
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    if after is None:
+        cursor.execute(f'''
+            SELECT {columns}
+            FROM test_reports
+            WHERE patient_id = ? AND doctor_id = ?
+            ORDER BY test_date DESC, id DESC
+            LIMIT ?
+        ''', (patient_id, doctor_id, limit + 1))
+    else:
+        cursor.execute(f'''
+            SELECT {columns}
+            FROM test_reports
+            WHERE patient_id = ? AND doctor_id = ? AND (test_date < ? OR (test_date = ? AND id < ?))
+            ORDER BY test_date DESC, id DESC
+            LIMIT ?
+        ''', (patient_id, doctor_id, after[0], after[0], after[1], limit + 1))
+    
+    from_row = _report_summary_from_row if summary else _report_from_row
+    reports = [from_row(row) for row in cursor.fetchall()]
+    
+    conn.close()
+    return split_page(reports, limit, 'test_date')
+
 def get_report_by_id(report_id: int, doctor_id: int) -> Optional[Dict]:
     """Get a specific report by ID"""
     conn = get_db_connection()
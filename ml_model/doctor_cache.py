@@ -0,0 +1,128 @@
+"""
+TTL cache of doctor records for require_auth and the patient endpoints
+Without a session cookie (the cross-origin frontend often loses it) every
+API call identifies the doctor by X-Doctor-Id / doctor_id, which used to be a
+Firestore document read per request. Records are kept for `ttl` seconds,
+filled on login/register and dropped on logout; unknown ids are remembered
+for `negative_ttl` seconds so a client retrying with a bad id does not turn
+into a burst of reads. Lookup errors are never cached.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 300.0  # seconds a doctor record is served from memory
+DEFAULT_NEGATIVE_TTL = 10.0  # seconds an unknown id is remembered
+
+_MISSING = object()
+
+
+class DoctorCache:
+    """Thread-safe bounded LRU of doctor id -> record (or None for unknown ids) with expiry"""
+
+    def __init__(self, loader: Callable[[str], Optional[Dict]], maxsize: int = DEFAULT_MAXSIZE,
+                 ttl: float = DEFAULT_TTL, negative_ttl: float = DEFAULT_NEGATIVE_TTL):
+        self.loader = loader
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # doctor id -> (expires_at, record or None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.load_errors = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def _lookup(self, doctor_id: str):
+        with self._lock:
+            entry = self._entries.get(doctor_id)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            expires_at, record = entry
+            if expires_at <= time.monotonic():
+                del self._entries[doctor_id]
+                self.expirations += 1
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(doctor_id)
+            if record is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return record
+
+    def _store(self, doctor_id: str, record: Optional[Dict]) -> None:
+        if not self.enabled:
+            return
+        ttl = self.ttl if record is not None else self.negative_ttl
+        with self._lock:
+            self._entries[doctor_id] = (time.monotonic() + ttl, record)
+            self._entries.move_to_end(doctor_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, doctor_id) -> Optional[Dict]:
+        """Doctor record (a copy) or None if unknown; loads it on a miss"""
+        if not doctor_id:
+            return None
+        doctor_id = str(doctor_id)
+        record = self._lookup(doctor_id) if self.enabled else _MISSING
+        if record is _MISSING:
+            try:
+                record = self.loader(doctor_id)
+            except Exception as e:
+                # Do not remember failures: the next request tries Firestore again
+                self.load_errors += 1
+                logger.error(f"Error getting doctor {doctor_id}: {e}")
+                return None
+            self._store(doctor_id, record)
+        return dict(record) if record is not None else None
+
+    def put(self, doctor: Dict) -> None:
+        """Remember a record just read or written elsewhere (login, registration)"""
+        if doctor and doctor.get('id'):
+            self._store(str(doctor['id']), dict(doctor))
+
+    def invalidate(self, doctor_id=None) -> None:
+        """Forget one doctor (after a change or logout), or everyone when doctor_id is None"""
+        with self._lock:
+            if doctor_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(doctor_id), None)
+            self.invalidations += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            saved = self.hits + self.negative_hits
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'negative_ttl': self.negative_ttl,
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'load_errors': self.load_errors,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(saved / lookups, 4) if lookups else 0.0,
+                'firestore_reads_saved': saved
+            }
@@ -0,0 +1,78 @@
+"""
+Stateless signed doctor tokens
+A token is "<payload>.<signature>": the payload is base64url JSON
+{"sub": doctor id, "name": doctor name, "exp": Unix expiry} and the
+signature is HMAC-SHA256 of the payload under the app secret key. Any worker
+or node sharing the secret verifies a token locally in a few microseconds,
+with no session store and no database read. Tokens cannot be revoked
+before they expire, so keep the lifetime short enough for that to be acceptable.
+"""
+import base64
+import hashlib
+import hmac
+import time
+from typing import Dict, Optional, Union
+
+from eeg_realtime import json_codec
+
+DEFAULT_TTL = 12 * 3600  # seconds a token stays valid
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class DoctorTokenSigner:
+    def __init__(self, secret_key: Union[str, bytes], ttl: float = DEFAULT_TTL):
+        if not secret_key:
+            raise ValueError("A secret key is required to sign doctor tokens")
+        if isinstance(secret_key, str):
+            secret_key = secret_key.encode('utf-8')
+        self.ttl = ttl
+        # Keyed once; copy() per token skips re-deriving the HMAC pads
+        self._mac = hmac.new(secret_key, digestmod=hashlib.sha256)
+
+    def _sign(self, payload: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(payload)
+        return mac.digest()
+
+    def issue(self, doctor: Dict, now: Optional[float] = None) -> Dict:
+        """Token for a doctor record ({'id', 'name', ...}) plus its expiry"""
+        expires_at = int((time.time() if now is None else now) + self.ttl)
+        claims = {'sub': str(doctor['id']), 'name': doctor.get('name'), 'exp': expires_at}
+        payload = _b64encode(json_codec.dumps(claims).encode('utf-8')).encode('ascii')
+        token = payload.decode('ascii') + '.' + _b64encode(self._sign(payload))
+        return {'token': token, 'token_type': 'Bearer', 'expires_at': expires_at}
+
+    def verify(self, token: str, now: Optional[float] = None) -> Optional[Dict]:
+        """Claims ({'sub', 'name', 'exp'}) of a genuine, unexpired token, else None"""
+        if not token or token.count('.') != 1:
+            return None
+        payload, signature = token.split('.')
+        try:
+            expected = self._sign(payload.encode('ascii'))
+            if not hmac.compare_digest(expected, _b64decode(signature)):
+                return None
+            claims = json_codec.loads(_b64decode(payload))
+        except (ValueError, UnicodeError):  # bad base64/JSON (binascii.Error subclasses ValueError)
+            return None
+        if not isinstance(claims, dict) or not claims.get('sub') or not isinstance(claims.get('exp'), int):
+            return None
+        if claims['exp'] <= (time.time() if now is None else now):
+            return None
+        return claims
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """Token of an 'Authorization: Bearer <token>' header value"""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(' ')
+    if scheme.lower() != 'bearer':
+        return None
+    return token.strip() or None
@@ -0,0 +1,139 @@
+"""
+Incremental reader for the live EEG CSV written by cortex_test.py
+Keeps per-file state (resolved path, inode, byte offset, running per-band sums
+and counts) so each call parses only the rows appended since the last call.
+State resets when the file is truncated, rotated or replaced.
+"""
+import csv
+import io
+import os
+import threading
+from typing import Dict, List, Optional
+
+BAND_NAMES = ['delta', 'theta', 'alpha', 'beta', 'gamma']
+
+# Bytes from the start of the file remembered to detect a truncate-and-rewrite
+# (cortex_test.py reopens the CSV with "w" each session; the first data row's
+# timestamp makes this prefix unique per session)
+HEAD_BYTES = 256
+
+
+class EEGCsvTailReader:
+    """Running per-band averages over an append-only Timestamp,SID,Channel,Band,Value CSV"""
+
+    def __init__(self, candidate_paths: List[str]):
+        self.candidate_paths = candidate_paths
+        self._lock = threading.Lock()
+        self.path = None
+        self._reset_state()
+
+    def _reset_state(self):
+        self.file_id = None  # (st_dev, st_ino)
+        self.offset = 0
+        self.head = b''
+        self.band_col = None
+        self.value_col = None
+        self.sums = {}
+        self.counts = {}
+
+    def _resolve_path(self) -> Optional[str]:
+        for path in self.candidate_paths:
+            abs_path = os.path.abspath(path)
+            if os.path.exists(abs_path):
+                return abs_path
+        return None
+
+    def _stat(self) -> Optional[os.stat_result]:
+        """Stat the cached path, re-probing the candidates if it has gone away"""
+        if self.path:
+            try:
+                return os.stat(self.path)
+            except OSError:
+                self.path = None
+                self._reset_state()
+        self.path = self._resolve_path()
+        if not self.path:
+            return None
+        try:
+            return os.stat(self.path)
+        except OSError:
+            self.path = None
+            return None
+
+    def _parse_lines(self, text: str):
+        for row in csv.reader(io.StringIO(text)):
+            if not row:
+                continue
+            if self.band_col is None:
+                # First line of the file is the header
+                header = [h.strip().lower() for h in row]
+                if 'band' in header and 'value' in header:
+                    self.band_col = header.index('band')
+                    self.value_col = header.index('value')
+                    continue
+                # No header: fall back to the cortex_test.py column layout
+                self.band_col, self.value_col = 3, 4
+
+            if len(row) <= max(self.band_col, self.value_col):
+                continue
+            band = row[self.band_col].lower().strip()
+            value_str = row[self.value_col].strip()
+            if not band or not value_str or band == 'band':
+                continue
+            try:
+                value = float(value_str)
+            except (ValueError, TypeError):
+                continue
+            self.sums[band] = self.sums.get(band, 0.0) + value
+            self.counts[band] = self.counts.get(band, 0) + 1
+
+    def update(self) -> bool:
+        """
+        Consume rows appended since the last call.
+        Returns False if no CSV file could be found.
+        """
+        with self._lock:
+            st = self._stat()
+            if st is None:
+                return False
+
+            file_id = (st.st_dev, st.st_ino)
+            if file_id != self.file_id or st.st_size < self.offset:
+                # New file, rotated or truncated: start over
+                self._reset_state()
+                self.file_id = file_id
+
+            with open(self.path, 'rb') as f:
+                if self.head:
+                    if f.read(len(self.head)) != self.head:
+                        # Same inode but rewritten from scratch
+                        self._reset_state()
+                        self.file_id = file_id
+                if st.st_size == self.offset:
+                    return True
+                if len(self.head) < HEAD_BYTES:
+                    f.seek(0)
+                    self.head = f.read(min(HEAD_BYTES, st.st_size))
+                f.seek(self.offset)
+                chunk = f.read(st.st_size - self.offset)
+
+            # Only consume complete lines; a partially written row is read next time
+            last_newline = chunk.rfind(b'\n')
+            if last_newline == -1:
+                return True
+            self.offset += last_newline + 1
+            self._parse_lines(chunk[:last_newline + 1].decode('utf-8', errors='replace'))
+            return True
+
+    def averages(self) -> Dict[str, float]:
+        """Mean value per band over every row read so far"""
+        with self._lock:
+            return {
+                band: round(self.sums[band] / self.counts[band], 4)
+                for band in BAND_NAMES
+                if self.counts.get(band)
+            }
+
+    def band_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
@@ -0,0 +1,223 @@
+"""
+Memory-mapped ring buffer for live band-power frames
+Shared binary store between the capture script (single writer) and the Flask
+server (readers). Each record is float64 (timestamp, channel-major
+n_channels x n_bands values). A fixed header holds the geometry and the
+monotonic write index, so disk and memory use are capped at
+capacity * record_size and readers never parse text.
+"""
+import os
+import numpy as np
+from typing import Optional, Tuple
+
+MAGIC = b'EEGRING1'
+VERSION = 1
+HEADER_SIZE = 64
+DEFAULT_CAPACITY = 4096  # pow frames (~8 minutes at 8 Hz)
+# Band order inside each channel, as delivered in Cortex pow frames
+BAND_ORDER = ['delta', 'theta', 'alpha', 'beta', 'gamma']
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('n_channels', '<u4'),
+    ('n_bands', '<u4'),
+    ('capacity', '<u4'),
+    ('record_size', '<u4'),
+    ('reserved', '<u4'),
+    ('write_index', '<u8'),  # total records ever written in this session
+])
+
+# Readers retry when the writer lapped the window they were reading
+_MAX_READ_RETRIES = 3
+
+
+class BandPowerRing:
+    """Fixed-size (capacity, 1 + n_channels * n_bands) float64 ring backed by a memory-mapped file"""
+
+    def __init__(self, path: str, mm: np.memmap, writable: bool):
+        self.path = path
+        self._mm = mm
+        self.writable = writable
+        self.header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=mm, offset=0)
+        if self.header['magic'][0] != MAGIC or self.header['version'][0] != VERSION:
+            raise ValueError(f"{path} is not a band-power ring file")
+        self.n_channels = int(self.header['n_channels'][0])
+        self.n_bands = int(self.header['n_bands'][0])
+        self.capacity = int(self.header['capacity'][0])
+        self.record_size = int(self.header['record_size'][0])
+        if mm.shape[0] < HEADER_SIZE + self.capacity * self.record_size * 8:
+            raise ValueError(f"{path} is truncated")
+        self.records = np.ndarray(
+            (self.capacity, self.record_size), dtype=np.float64, buffer=mm, offset=HEADER_SIZE
+        )
+        st = os.stat(path)
+        self.file_id = (st.st_dev, st.st_ino)
+
+    @classmethod
+    def create(cls, path: str, capacity: int = DEFAULT_CAPACITY,
+               n_channels: int = 5, n_bands: int = 5) -> 'BandPowerRing':
+        """Create (or reset) a ring file for a new capture session"""
+        record_size = 1 + n_channels * n_bands
+        size = HEADER_SIZE + capacity * record_size * 8
+
+        # Build the new file aside and swap it in, so readers still mapping
+        # the old file never see it shrink underneath them
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.truncate(size)
+        mm = np.memmap(tmp_path, dtype=np.uint8, mode='r+', shape=(size,))
+        header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=mm, offset=0)
+        header['magic'] = MAGIC
+        header['version'] = VERSION
+        header['n_channels'] = n_channels
+        header['n_bands'] = n_bands
+        header['capacity'] = capacity
+        header['record_size'] = record_size
+        header['write_index'] = 0
+        mm.flush()
+        del header, mm
+
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Windows refuses to replace a file another process has mapped;
+            # reuse it in place if the geometry matches
+            os.remove(tmp_path)
+            ring = cls(path, np.memmap(path, dtype=np.uint8, mode='r+'), writable=True)
+            if (ring.capacity, ring.n_channels, ring.n_bands) != (capacity, n_channels, n_bands):
+                raise
+            ring.header['write_index'] = 0
+            return ring
+        return cls(path, np.memmap(path, dtype=np.uint8, mode='r+'), writable=True)
+
+    @classmethod
+    def open(cls, path: str) -> 'BandPowerRing':
+        """Open an existing ring file read-only"""
+        mm = np.memmap(path, dtype=np.uint8, mode='r')
+        if mm.shape[0] < HEADER_SIZE:
+            raise ValueError(f"{path} is too small to be a band-power ring file")
+        return cls(path, mm, writable=False)
+
+    @property
+    def write_index(self) -> int:
+        return int(self.header['write_index'][0])
+
+    def __len__(self) -> int:
+        return min(self.write_index, self.capacity)
+
+    def write(self, timestamp: float, frame) -> None:
+        """Append one frame of n_channels * n_bands values (channel-major)"""
+        index = self.write_index
+        slot = self.records[index % self.capacity]
+        slot[0] = timestamp
+        values = np.asarray(frame, dtype=np.float64).ravel()
+        n = min(values.shape[0], self.record_size - 1)
+        slot[1:1 + n] = values[:n]
+        if n < self.record_size - 1:
+            slot[1 + n:] = np.nan
+        # Publish the record only after it is fully written
+        self.header['write_index'] = index + 1
+
+    def flush(self) -> None:
+        self._mm.flush()
+
+    def window(self, n: Optional[int] = None) -> Tuple[int, Tuple[np.ndarray, ...]]:
+        """
+        Views (no copy) over the newest n records in write order, at most capacity - 1:
+        the oldest slot of a full ring is the one the writer fills next.
+        Returns (write_index at read time, tuple of 1 or 2 record views).
+        """
+        end = self.write_index
+        available = min(end, self.capacity - 1)
+        n = available if n is None else max(0, min(int(n), available))
+        if n == 0:
+            return end, ()
+        start_slot = (end - n) % self.capacity
+        end_slot = start_slot + n
+        if end_slot <= self.capacity:
+            return end, (self.records[start_slot:end_slot],)
+        return end, (self.records[start_slot:], self.records[:end_slot - self.capacity])
+
+    def window_sums(self, n: Optional[int] = None, seconds: Optional[float] = None):
+        """
+        Per (channel, band) nansum and value count over the newest n records, or
+        over the records within `seconds` of the newest timestamp.
+        Returns (total, count, records used, newest timestamp), or None if empty or torn.
+        """
+        for _ in range(_MAX_READ_RETRIES):
+            end, views = self.window(n)
+            if not views:
+                return None
+
+            oldest_read = end - sum(len(v) for v in views)
+            latest = float(views[-1][-1, 0])
+            if seconds is not None:
+                cutoff = latest - seconds
+                views = tuple(v[np.searchsorted(v[:, 0], cutoff):] for v in views)
+
+            total = np.zeros((self.n_channels, self.n_bands))
+            count = np.zeros((self.n_channels, self.n_bands))
+            used = 0
+            for v in views:
+                if len(v) == 0:
+                    continue
+                values = v[:, 1:].reshape(len(v), self.n_channels, self.n_bands)
+                total += np.nansum(values, axis=0)
+                count += np.count_nonzero(~np.isnan(values), axis=0)
+                used += len(v)
+
+            # The writer fills record w in slot w % capacity before publishing w + 1, so the
+            # oldest record read is intact only while write_index - oldest_read < capacity
+            if self.write_index - oldest_read < self.capacity:
+                return total, count, used, latest
+        return None
+
+    def band_means(self, n: Optional[int] = None,
+                   seconds: Optional[float] = None) -> Tuple[Optional[np.ndarray], int, Optional[float]]:
+        """
+        Mean per band across channels over the newest n records, or over the
+        records within `seconds` of the newest timestamp.
+        Returns (means of shape (n_bands,) or None, records used, newest timestamp).
+        """
+        sums = self.window_sums(n, seconds)
+        if sums is None:
+            return None, 0, None
+        total, count, used, latest = sums
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return total.sum(axis=0) / count.sum(axis=0), used, latest
+
+    def channel_means(self, n: Optional[int] = None,
+                      seconds: Optional[float] = None) -> Tuple[Optional[np.ndarray], int, Optional[float]]:
+        """Like band_means, but per channel: means of shape (n_channels, n_bands), NaN where empty"""
+        sums = self.window_sums(n, seconds)
+        if sums is None:
+            return None, 0, None
+        total, count, used, latest = sums
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return total / count, used, latest
+
+    def close(self) -> None:
+        if self.writable:
+            self.flush()
+
+
+class BandPowerRingReader:
+    """Reopens the ring file when the capture script recreates it"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.ring = None
+
+    def get(self) -> Optional[BandPowerRing]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self.ring = None
+            return None
+        if self.ring is None or self.ring.file_id != (st.st_dev, st.st_ino):
+            try:
+                self.ring = BandPowerRing.open(self.path)
+            except (OSError, ValueError):
+                self.ring = None
+        return self.ring
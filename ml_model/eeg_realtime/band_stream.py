@@ -0,0 +1,177 @@
+"""
+Live band-average broadcaster for /api/eeg/stream (Server-Sent Events)
+One producer thread reads the band-power ring every `interval` seconds,
+computes rolling per-band and per-channel averages over the last
+`window_seconds`, renders each snapshot to SSE text once and publishes it to
+the stream hub. Each SSE client is a hub subscription with its own bounded
+queue, so the ring is read the same number of times however many dashboards
+are connected and a slow client only drops its own events. The hub retains
+a short history so reconnecting clients can resume from Last-Event-ID.
+"""
+import threading
+import time
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+
+from . import json_codec
+from .band_power_ring import BandPowerRingReader, BAND_ORDER
+from .pow_decoder import DEFAULT_CHANNELS
+from .stream_hub import StreamHub, EEG_AVERAGES_TOPIC
+
+DEFAULT_INTERVAL = 1.0  # seconds between snapshots
+DEFAULT_WINDOW_SECONDS = 5.0  # rolling window of the averages
+DEFAULT_HEARTBEAT = 15.0  # seconds of silence before a keep-alive comment
+DEFAULT_HISTORY = 120  # events kept for Last-Event-ID resume
+DEFAULT_CLIENT_QUEUE = 32  # events buffered per client before the oldest are dropped
+RETRY_MS = 3000  # reconnect delay suggested to EventSource clients
+
+EVENT_AVERAGES = 'averages'
+STATUS_LIVE = 'live'
+STATUS_NO_DATA = 'no_data'
+
+
+def format_event(event: str, data: Dict) -> str:
+    """SSE event without its id line (the id comes from the hub sequence number)"""
+    return f"event: {event}\ndata: {json_codec.dumps(data)}\n\n"
+
+
+class BandAverageBroadcaster:
+    def __init__(self, reader: BandPowerRingReader, hub: StreamHub, topic: str = EEG_AVERAGES_TOPIC,
+                 interval: float = DEFAULT_INTERVAL, window_seconds: float = DEFAULT_WINDOW_SECONDS,
+                 history: int = DEFAULT_HISTORY, client_queue: int = DEFAULT_CLIENT_QUEUE,
+                 channel_names: Sequence[str] = DEFAULT_CHANNELS):
+        self.reader = reader
+        self.hub = hub
+        self.topic = topic
+        self.interval = interval
+        self.window_seconds = window_seconds
+        self.client_queue = client_queue
+        self.channel_names = list(channel_names)
+        hub.retain(topic, history)
+
+        # Event ids are "<boot>-<seq>" so ids from before a server restart are never mistaken for new ones
+        self._boot = str(int(time.time()))
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._last_key = None
+
+        self.ticks = 0
+        self.published = 0
+        self.errors = 0
+
+    # ---------- producer ----------
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="eeg-band-stream", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            if self.hub.subscriber_count(self.topic) == 0:
+                # Idle while nobody is listening; snapshot afresh when someone returns
+                self._last_key = None
+            else:
+                try:
+                    self._tick()
+                except Exception:
+                    self.errors += 1
+            time.sleep(self.interval)
+
+    def _tick(self) -> None:
+        self.ticks += 1
+        ring = self.reader.get()
+        if ring is None:
+            key = None
+        else:
+            key = (ring.file_id, ring.write_index)
+        if key == self._last_key and self.hub.last_seq(self.topic):
+            return  # nothing new since the last snapshot
+        self._last_key = key
+
+        snapshot, channels = self._snapshot(ring)
+        band_text = format_event(EVENT_AVERAGES, snapshot)
+        channel_text = band_text
+        if channels is not None:
+            channel_text = format_event(EVENT_AVERAGES, dict(snapshot, channels=channels))
+        self.hub.publish(self.topic, (band_text, channel_text))
+        self.published += 1
+
+    def _snapshot(self, ring):
+        """(band-level payload, per-channel averages or None) for the current window"""
+        sums = ring.window_sums(seconds=self.window_seconds) if ring is not None else None
+        if sums is None:
+            return {'status': STATUS_NO_DATA, 'data': None}, None
+        total, count, frames, latest = sums
+
+        bands = BAND_ORDER[:ring.n_bands]
+        names = [self.channel_names[i] if i < len(self.channel_names) else f"Ch{i}"
+                 for i in range(ring.n_channels)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            band_means = total.sum(axis=0) / count.sum(axis=0)
+            channel_means = total / count
+        snapshot = {
+            'status': STATUS_LIVE,
+            'data': {band: round(float(v), 4) for band, v in zip(bands, band_means) if not np.isnan(v)},
+            'frames': frames,
+            'frame_rate': round(frames / self.window_seconds, 2),
+            'window_seconds': self.window_seconds,
+            'latest_timestamp': latest,
+            'age_seconds': round(max(0.0, time.time() - latest), 2)
+        }
+        channels = {
+            ch: {band: round(float(v), 4) for band, v in zip(bands, row) if not np.isnan(v)}
+            for ch, row in zip(names, channel_means)
+        }
+        return snapshot, channels
+
+    # ---------- subscribers ----------
+
+    def _resume_seq(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Hub sequence number to resume after, or None to start from the latest event"""
+        if not last_event_id:
+            return None
+        boot, _, seq = last_event_id.partition('-')
+        if boot != self._boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        history = self.hub.history(self.topic)
+        if not history or seq > history[-1].seq or seq < history[0].seq - 1:
+            return None  # unknown or too old: the history no longer covers the gap
+        return seq
+
+    def stream(self, last_event_id: Optional[str] = None, channels: bool = False,
+               heartbeat: float = DEFAULT_HEARTBEAT, name: Optional[str] = None) -> Iterator[str]:
+        """SSE text for one subscriber: resumed/latest event, then every new event, with heartbeats"""
+        self._ensure_started()
+        resume_after = self._resume_seq(last_event_id)
+        if resume_after is None:
+            resume_after = max(0, self.hub.last_seq(self.topic) - 1)
+        subscription = self.hub.subscribe(self.topic, maxsize=self.client_queue, name=name,
+                                          resume_after=resume_after)
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            while True:
+                frame = subscription.get(heartbeat)
+                if frame is None:
+                    yield ": heartbeat\n\n"
+                    continue
+                band_text, channel_text = frame.data
+                yield f"id: {self._boot}-{frame.seq}\n" + (channel_text if channels else band_text)
+        finally:
+            subscription.close()
+
+    def stats(self) -> Dict:
+        last_seq = self.hub.last_seq(self.topic)
+        return {
+            'subscribers': self.hub.subscriber_count(self.topic),
+            'interval': self.interval,
+            'window_seconds': self.window_seconds,
+            'ticks': self.ticks,
+            'events_published': self.published,
+            'last_event_id': f"{self._boot}-{last_seq}" if last_seq else None,
+            'history': len(self.hub.history(self.topic)),
+            'errors': self.errors
+        }
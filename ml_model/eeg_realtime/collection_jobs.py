@@ -0,0 +1,212 @@
+"""
+Background EEG collection jobs
+/api/eeg/collect_realtime submits a job and returns its id immediately; the
+collection runs on a bounded thread pool and clients poll the job for status,
+progress (samples so far) and the final averages. Jobs can be cancelled. At
+most per_headset_limit jobs run per headset at a time; later ones stay queued
+behind them, and at most max_pending jobs are queued or running overall.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_PENDING = 16  # queued + running jobs across all headsets
+DEFAULT_PER_HEADSET_LIMIT = 1
+DEFAULT_MAX_FINISHED_JOBS = 200  # finished jobs kept for polling, oldest evicted first
+SLOT_POLL_SECONDS = 0.2  # how often a queued job waiting for its headset checks for cancellation
+# Cortex pow frames arrive at ~8 Hz; used to estimate progress
+EXPECTED_SAMPLES_PER_SECOND = 8
+
+
+class JobRejected(Exception):
+    """The job cannot be accepted right now (queue full)"""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class CollectionJob:
+    def __init__(self, job_id: str, duration: int, headset: str):
+        self.id = job_id
+        self.duration = duration
+        self.headset = headset
+        self.status = STATUS_QUEUED
+        self.samples = 0
+        self.result = None
+        self.message = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def to_dict(self) -> Dict:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        progress = None
+        if self.status == STATUS_SUCCEEDED:
+            progress = 1.0
+        elif elapsed is not None and self.duration:
+            progress = round(min(elapsed / self.duration, 0.99), 3)
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'headset': self.headset,
+            'duration': self.duration,
+            'samples': self.samples,
+            'expected_samples': self.duration * EXPECTED_SAMPLES_PER_SECOND,
+            'progress': progress,
+            'elapsed_seconds': round(elapsed, 2) if elapsed is not None else None,
+            'data': self.result,
+            'message': self.message,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class CollectionJobManager:
+    """
+    Runs collect_fn(duration, progress=callback, cancel_event=event) -> (success, data, message)
+    on a bounded executor and tracks each run as a CollectionJob.
+    """
+
+    def __init__(self, collect_fn: Callable, max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_pending: int = DEFAULT_MAX_PENDING, per_headset_limit: int = DEFAULT_PER_HEADSET_LIMIT,
+                 max_finished_jobs: int = DEFAULT_MAX_FINISHED_JOBS):
+        self.collect_fn = collect_fn
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.per_headset_limit = per_headset_limit
+        self.max_finished_jobs = max_finished_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="eeg-collect")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, CollectionJob]" = OrderedDict()
+        self._headset_slots: Dict[str, threading.Semaphore] = {}
+
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = {STATUS_SUCCEEDED: 0, STATUS_FAILED: 0, STATUS_CANCELLED: 0}
+
+    def _active(self, headset: Optional[str] = None):
+        return [job for job in self._jobs.values()
+                if job.status in ACTIVE_STATUSES and (headset is None or job.headset == headset)]
+
+    def _evict_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status not in ACTIVE_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def _slot(self, headset: str) -> threading.Semaphore:
+        with self._lock:
+            slot = self._headset_slots.get(headset)
+            if slot is None:
+                slot = self._headset_slots[headset] = threading.Semaphore(self.per_headset_limit)
+            return slot
+
+    def submit(self, duration: int, headset: str = 'default') -> CollectionJob:
+        """Queue a collection; it starts once its headset has a free slot and a worker picks it up"""
+        with self._lock:
+            if len(self._active()) >= self.max_pending:
+                self.rejected += 1
+                raise JobRejected("Too many collection jobs queued, try again shortly", 'queue_full')
+            job = CollectionJob(uuid.uuid4().hex, duration, headset)
+            self._jobs[job.id] = job
+            self.submitted += 1
+            self._evict_finished()
+            job.future = self._executor.submit(self._run, job)
+        return job
+
+    def _finish(self, job: CollectionJob, status: str, data=None, message: str = None) -> None:
+        with self._lock:
+            job.status = status
+            job.result = data
+            job.message = message
+            job.finished_at = time.time()
+            self.completed[status] += 1
+
+    def _run(self, job: CollectionJob) -> None:
+        slot = self._slot(job.headset)
+        # Stay queued until the headset's running job(s) finish; cancel() finishes the job meanwhile
+        while not slot.acquire(timeout=SLOT_POLL_SECONDS):
+            if job.cancel_event.is_set():
+                return
+        try:
+            self._collect(job)
+        finally:
+            slot.release()
+
+    def _collect(self, job: CollectionJob) -> None:
+        with self._lock:
+            if job.cancel_event.is_set():
+                return
+            job.status = STATUS_RUNNING
+            job.started_at = time.time()
+
+        def progress(samples: int):
+            job.samples = samples
+
+        try:
+            success, data, message = self.collect_fn(job.duration, progress=progress, cancel_event=job.cancel_event)
+        except Exception as e:
+            self._finish(job, STATUS_FAILED, message=f"Collection error: {str(e)}")
+            return
+
+        if job.cancel_event.is_set():
+            self._finish(job, STATUS_CANCELLED, message="Collection cancelled")
+        elif success and data:
+            self._finish(job, STATUS_SUCCEEDED, data, message)
+        else:
+            self._finish(job, STATUS_FAILED, message=message)
+
+    def get(self, job_id: str) -> Optional[CollectionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[CollectionJob]:
+        """Cancel a queued or running job; returns None if the job is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status not in ACTIVE_STATUSES:
+                return job
+            job.cancel_event.set()
+            queued = job.status == STATUS_QUEUED
+        if queued:
+            # Never started: _run returns as soon as it sees the event (or the executor drops it)
+            job.future.cancel()
+            self._finish(job, STATUS_CANCELLED, message="Collection cancelled before it started")
+        return job
+
+    def stats(self) -> Dict:
+        with self._lock:
+            active = self._active()
+            busy = {}
+            for job in active:
+                busy[job.headset] = busy.get(job.headset, 0) + 1
+            return {
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'per_headset_limit': self.per_headset_limit,
+                'queued': sum(1 for job in active if job.status == STATUS_QUEUED),
+                'running': sum(1 for job in active if job.status == STATUS_RUNNING),
+                'active_by_headset': busy,
+                'jobs_tracked': len(self._jobs),
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': dict(self.completed)
+            }
@@ -0,0 +1,256 @@
+"""
+Asyncio Cortex JSON-RPC client
+One websocket connection per client. Calls are sent concurrently and matched
+to their responses by id through futures; stream notifications (pow, eeg, ...)
+are routed to per-stream asyncio queues. Replaces the blocking
+send/recv handshake helpers that were copied between the capture scripts.
+"""
+import asyncio
+import itertools
+import logging
+import ssl
+from typing import Dict, List, Optional
+
+import websockets
+
+from . import json_codec
+
+logger = logging.getLogger(__name__)
+
+CORTEX_URL = "wss://localhost:6868"
+REQUEST_TIMEOUT = 10.0  # seconds per JSON-RPC call
+STREAM_QUEUE_SIZE = 1024  # notifications buffered per stream (oldest dropped when full)
+
+# Keys Cortex uses for stream notifications
+STREAM_KEYS = ("eeg", "pow", "met", "mot", "dev", "eq", "com", "fac", "sys")
+
+
+def put_dropping_oldest(queue: asyncio.Queue, item) -> bool:
+    """Put without blocking; returns False if an old item had to be dropped to make room"""
+    dropped = False
+    if queue.full():
+        queue.get_nowait()
+        dropped = True
+    queue.put_nowait(item)
+    return not dropped
+
+
+class CortexError(Exception):
+    """A JSON-RPC error response or an unusable handshake result"""
+
+    def __init__(self, method: str, error):
+        self.method = method
+        self.error = error
+        if isinstance(error, dict):
+            self.code = error.get("code")
+            message = error.get("message", error)
+        else:
+            self.code = None
+            message = error
+        super().__init__(f"{method} failed: {message}")
+
+
+class CortexSession:
+    """Result of a completed handshake"""
+
+    def __init__(self, token: str, headset_id: str, session_id: str,
+                 streams: List[str], cols: Dict[str, list]):
+        self.token = token
+        self.headset_id = headset_id
+        self.session_id = session_id
+        self.streams = streams
+        self.cols = cols  # stream name -> column header from the subscribe result
+
+
+class CortexClient:
+    """Multiplexing JSON-RPC client for the Emotiv Cortex service"""
+
+    def __init__(self, client_id: str, client_secret: str, url: str = CORTEX_URL,
+                 request_timeout: float = REQUEST_TIMEOUT, stream_queue_size: int = STREAM_QUEUE_SIZE):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.url = url
+        self.request_timeout = request_timeout
+        self.stream_queue_size = stream_queue_size
+        self._ws = None
+        self._reader = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._streams: Dict[str, asyncio.Queue] = {}
+        self.dropped: Dict[str, int] = {}
+        self.closed = asyncio.Event()
+
+    # ---------- connection ----------
+
+    async def connect(self) -> 'CortexClient':
+        ssl_context = None
+        if self.url.startswith("wss://"):
+            # Cortex runs locally with a self-signed certificate
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+        self._ws = await asyncio.wait_for(
+            websockets.connect(self.url, ssl=ssl_context, max_size=None),
+            self.request_timeout
+        )
+        self.closed.clear()
+        self._reader = asyncio.create_task(self._read_loop())
+        return self
+
+    async def close(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+    async def __aenter__(self) -> 'CortexClient':
+        return await self.connect()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    @property
+    def is_open(self) -> bool:
+        return self._ws is not None and not self.closed.is_set()
+
+    # ---------- receive side ----------
+
+    async def _read_loop(self) -> None:
+        try:
+            async for raw in self._ws:
+                self._dispatch(raw)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.closed.set()
+            error = ConnectionError("Cortex connection closed")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+            # Wake stream consumers: None means the connection is gone
+            for queue in self._streams.values():
+                put_dropping_oldest(queue, None)
+
+    def _decode(self, raw):
+        return json_codec.loads(raw)
+
+    def _dispatch(self, raw) -> None:
+        try:
+            msg = self._decode(raw)
+        except ValueError:
+            return
+        if not isinstance(msg, dict):
+            return
+
+        msg_id = msg.get("id")
+        if msg_id is not None and ("result" in msg or "error" in msg):
+            future = self._pending.pop(msg_id, None)
+            if future is not None and not future.done():
+                if "error" in msg:
+                    future.set_exception(CortexError(getattr(future, "method", "request"), msg["error"]))
+                else:
+                    future.set_result(msg["result"])
+            return
+
+        for key in STREAM_KEYS:
+            if key in msg:
+                queue = self._streams.get(key)
+                if queue is not None and not put_dropping_oldest(queue, msg):
+                    self.dropped[key] = self.dropped.get(key, 0) + 1
+                return
+
+        if "warning" in msg:
+            logger.info(f"[Cortex] warning: {msg['warning']}")
+
+    def stream(self, name: str) -> asyncio.Queue:
+        """Queue receiving every notification of the named stream (None = connection closed)"""
+        queue = self._streams.get(name)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.stream_queue_size)
+            self._streams[name] = queue
+        return queue
+
+    # ---------- JSON-RPC ----------
+
+    async def call(self, method: str, params: Optional[dict] = None, timeout: Optional[float] = None):
+        """Send one request and wait for the response with the same id; returns its result"""
+        if not self.is_open:
+            raise ConnectionError("Cortex connection is not open")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        future.method = method
+        self._pending[request_id] = future
+
+        payload = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params:
+            payload["params"] = params
+        try:
+            await self._ws.send(json_codec.dumps(payload))
+            return await asyncio.wait_for(future, timeout or self.request_timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    def _credentials(self) -> dict:
+        return {"clientId": self.client_id, "clientSecret": self.client_secret}
+
+    async def authorize(self) -> str:
+        """requestAccess and authorize in flight together; returns the cortex token"""
+        access, auth = await asyncio.gather(
+            self.call("requestAccess", self._credentials()),
+            self.call("authorize", self._credentials()),
+            return_exceptions=True
+        )
+        if isinstance(access, dict) and access.get("accessGranted") is False:
+            logger.warning(f"[Cortex] access not granted yet: {access.get('message')}")
+        if isinstance(auth, BaseException):
+            raise auth
+        token = auth.get("cortexToken") if isinstance(auth, dict) else None
+        if not token:
+            raise CortexError("authorize", f"no cortexToken in {auth}")
+        return token
+
+    async def query_headsets(self) -> list:
+        return await self.call("queryHeadsets") or []
+
+    async def create_session(self, token: str, headset_id: str) -> str:
+        result = await self.call("createSession", {"cortexToken": token, "headset": headset_id, "status": "open"})
+        session_id = result.get("id") if isinstance(result, dict) else None
+        if not session_id:
+            raise CortexError("createSession", f"no session id in {result}")
+        return session_id
+
+    async def subscribe(self, token: str, session_id: str, streams: List[str]) -> Dict[str, list]:
+        """Subscribe and return the column header per stream"""
+        # Register queues first so no notification arriving right after the response is lost
+        for name in streams:
+            self.stream(name)
+        result = await self.call("subscribe", {"cortexToken": token, "session": session_id, "streams": streams})
+        cols = {}
+        for item in (result or {}).get("success", []):
+            cols[item.get("streamName")] = item.get("cols", [])
+        failures = (result or {}).get("failure", [])
+        if failures and not cols:
+            raise CortexError("subscribe", failures)
+        return cols
+
+    async def unsubscribe(self, token: str, session_id: str, streams: List[str]):
+        return await self.call("unsubscribe", {"cortexToken": token, "session": session_id, "streams": streams})
+
+    async def close_session(self, token: str, session_id: str):
+        return await self.call("updateSession", {"cortexToken": token, "session": session_id, "status": "close"})
+
+    async def handshake(self, streams: List[str], headset_id: Optional[str] = None) -> CortexSession:
+        """
+        Authorize, pick a headset, open a session and subscribe, in three round trips:
+        (requestAccess + authorize + queryHeadsets) -> createSession -> subscribe.
+        """
+        token, headsets = await asyncio.gather(self.authorize(), self.query_headsets())
+        if headset_id is None:
+            if not headsets:
+                raise CortexError("queryHeadsets", "No EEG headset found. Please connect the headset.")
+            headset_id = headsets[0]["id"]
+
+        session_id = await self.create_session(token, headset_id)
+        cols = await self.subscribe(token, session_id, streams)
+        return CortexSession(token, headset_id, session_id, streams, cols)
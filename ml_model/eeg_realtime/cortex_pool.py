@@ -0,0 +1,355 @@
+"""
+Persistent Cortex session pool
+Keeps one Cortex connection, cortex token and headset session alive on a
+background event loop, so collection requests lease the live pow stream
+instead of repeating the connect/authorize/createSession/subscribe handshake.
+Reconnects (and re-authorizes or re-subscribes only when needed) on failure.
+Frames are published once to the stream hub; leases are hub subscriptions.
+"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from .cortex_client import CortexClient, CortexError, CORTEX_URL
+from .stream_hub import StreamHub, Subscription, eeg_topic
+
+logger = logging.getLogger(__name__)
+
+# Re-authorize after this long even if Cortex has not rejected the token yet
+TOKEN_TTL = 6 * 3600  # seconds
+LEASE_QUEUE_SIZE = 1024  # frames buffered per lease (oldest dropped when full)
+PRODUCER_CHECK_INTERVAL = 2.0  # seconds between session checks while the pool keeps streaming
+# Cortex error codes meaning the token is no longer usable (invalid / expired)
+TOKEN_ERROR_CODES = (-32014, -32015)
+# A subscribed stream silent for this long is treated as a dead session and re-created
+STALE_STREAM_SECONDS = 5.0
+
+
+class StreamLease:
+    """A collector's view of the shared stream: a hub subscription (an end frame means connection lost)"""
+
+    def __init__(self, stream: str, subscription: Subscription, headset_id: str, session_id: str, cols: list):
+        self.stream = stream
+        self.subscription = subscription
+        self.headset_id = headset_id
+        self.session_id = session_id
+        self.cols = cols
+
+    @property
+    def dropped(self) -> int:
+        return self.subscription.dropped
+
+
+class CortexSessionPool:
+    """
+    One long-lived Cortex connection/session shared by every collection request.
+    Its streams are published to a StreamHub as "eeg/<headset>/<stream>".
+    """
+
+    def __init__(self, client_id: str, client_secret: str, url: str = CORTEX_URL,
+                 streams: List[str] = ("pow",), token_ttl: float = TOKEN_TTL,
+                 lease_queue_size: int = LEASE_QUEUE_SIZE, hub: Optional[StreamHub] = None):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.url = url
+        self.streams = list(streams)
+        self.token_ttl = token_ttl
+        self.lease_queue_size = lease_queue_size
+        self.hub = hub if hub is not None else StreamHub()
+
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._ready_lock = None  # asyncio.Lock, created on the pool loop
+
+        self.client: Optional[CortexClient] = None
+        self.token = None
+        self.token_issued_at = None
+        self.headset_id = None
+        self.session_id = None
+        self.subscribed: Dict[str, list] = {}  # stream -> cols
+        self.subscribed_at = None
+        self.last_frame_at = None
+        self._pumps: Dict[str, asyncio.Task] = {}
+        self._producer: Optional[asyncio.Task] = None
+        self._leases: Dict[str, set] = {name: set() for name in self.streams}
+
+        self.connects = 0
+        self.authorizations = 0
+        self.sessions_created = 0
+        self.subscriptions = 0
+        self.leases_granted = 0
+        self.frames_received = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_ready_ms = None
+
+    # ---------- event loop thread ----------
+
+    def start(self) -> 'CortexSessionPool':
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="cortex-session-pool", daemon=True)
+                self._thread.start()
+        return self
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the pool loop from a synchronous (Flask) thread and wait for its result"""
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        if self._loop is None:
+            return
+        try:
+            self.run(self._close(), timeout)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+
+    # ---------- connection / session state ----------
+
+    @property
+    def token_valid(self) -> bool:
+        return self.token is not None and time.time() - self.token_issued_at < self.token_ttl
+
+    def _record_failure(self, error: BaseException) -> None:
+        self.failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+
+    def _drop_session(self) -> None:
+        self.session_id = None
+        self.subscribed = {}
+        self.subscribed_at = None
+
+    def _stream_stale(self) -> bool:
+        """Subscribed but no frames lately: the headset session stopped without the connection closing"""
+        if not self.subscribed or self.subscribed_at is None:
+            return False
+        now = time.monotonic()
+        last = max(self.subscribed_at, self.last_frame_at or 0.0)
+        return now - last > STALE_STREAM_SECONDS
+
+    async def _close(self) -> None:
+        if self.client is not None:
+            if self.client.is_open and self.session_id:
+                try:
+                    await self.client.close_session(self.token, self.session_id)
+                except Exception:
+                    pass
+            await self.client.close()
+        self._drop_session()
+
+    async def _connect(self) -> None:
+        if self.client is not None:
+            await self.client.close()
+        self.client = CortexClient(self.client_id, self.client_secret, url=self.url)
+        await self.client.connect()
+        self.connects += 1
+        # A new connection has no subscriptions; the session itself may still be open in Cortex
+        # but is re-created below since it is bound to the old connection's subscriptions
+        self._drop_session()
+        for name in self.streams:
+            self._pumps[name] = asyncio.create_task(self._pump(self.client, name))
+        logger.info(f"[Cortex Pool] Connected to {self.url}")
+
+    async def _authorize(self) -> None:
+        self.token = await self.client.authorize()
+        self.token_issued_at = time.time()
+        self.authorizations += 1
+        logger.info("[Cortex Pool] Authorized (token cached)")
+
+    async def _open_session(self) -> None:
+        if self.headset_id is None:
+            headsets = await self.client.query_headsets()
+            if not headsets:
+                raise CortexError("queryHeadsets", "No EEG headset found. Please connect the headset.")
+            self.headset_id = headsets[0]["id"]
+        self.session_id = await self.client.create_session(self.token, self.headset_id)
+        self.sessions_created += 1
+        logger.info(f"[Cortex Pool] Session {self.session_id} opened on headset {self.headset_id}")
+
+    async def _prepare(self) -> None:
+        """Bring connection, token, session and subscription up, doing only the missing steps"""
+        if self.client is None or not self.client.is_open:
+            await self._connect()
+
+        if not self.token_valid:
+            if self.headset_id is None:
+                # First handshake: authorize and find the headset in one round trip
+                self.token, headsets = await asyncio.gather(self.client.authorize(), self.client.query_headsets())
+                self.token_issued_at = time.time()
+                self.authorizations += 1
+                if not headsets:
+                    raise CortexError("queryHeadsets", "No EEG headset found. Please connect the headset.")
+                self.headset_id = headsets[0]["id"]
+            else:
+                await self._authorize()
+
+        if self.session_id is not None and self._stream_stale():
+            logger.warning(f"[Cortex Pool] No frames on session {self.session_id} for "
+                           f"{STALE_STREAM_SECONDS}s; re-creating it")
+            # Close it in Cortex too, or every stale cycle leaves an orphaned session behind
+            try:
+                await self.client.close_session(self.token, self.session_id)
+            except Exception:
+                pass
+            self._drop_session()
+            self.headset_id = None
+
+        if self.session_id is None:
+            await self._open_session()
+
+        missing = [name for name in self.streams if name not in self.subscribed]
+        if missing:
+            cols = await self.client.subscribe(self.token, self.session_id, missing)
+            self.subscribed.update(cols)
+            self.subscribed_at = time.monotonic()
+            self.subscriptions += 1
+            logger.info(f"[Cortex Pool] Subscribed to {missing}")
+
+    async def ensure_ready(self) -> None:
+        """Make the shared session usable, recovering from expired tokens and lost sessions/connections"""
+        if self._ready_lock is None:
+            self._ready_lock = asyncio.Lock()
+        async with self._ready_lock:
+            started = time.perf_counter()
+            try:
+                await self._prepare()
+            except CortexError as e:
+                self._record_failure(e)
+                if e.code in TOKEN_ERROR_CODES:
+                    self.token = None
+                elif e.method in ("createSession", "subscribe"):
+                    # Headset may have been swapped or disconnected: look it up again
+                    self._drop_session()
+                    self.headset_id = None
+                else:
+                    raise
+                logger.warning(f"[Cortex Pool] {e}; retrying once")
+                await self._prepare()
+            except (OSError, ConnectionError) as e:
+                # Connection dropped mid-handshake: reconnect once
+                self._record_failure(e)
+                logger.warning(f"[Cortex Pool] {e}; reconnecting")
+                await self._connect()
+                await self._prepare()
+            self.last_ready_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    # ---------- stream fan-out ----------
+
+    async def _pump(self, client: CortexClient, name: str) -> None:
+        """Publish one stream of the connection to the hub"""
+        source = client.stream(name)
+        while True:
+            msg = await source.get()
+            topic = eeg_topic(self.headset_id, name)
+            if msg is None:
+                # Connection gone: tell subscribers (leases re-lease on a new connection)
+                if client is self.client:
+                    self._drop_session()
+                self.hub.end(topic)
+                return
+            self.frames_received += 1
+            self.last_frame_at = time.monotonic()
+            self.hub.publish(topic, msg)
+
+    @asynccontextmanager
+    async def lease(self, stream: str = "pow"):
+        """Share the live stream for the duration of a collection"""
+        if stream not in self._leases:
+            raise ValueError(f"Stream {stream!r} is not managed by this pool (streams: {self.streams})")
+        await self.ensure_ready()
+        self.leases_granted += 1
+        subscription = self.hub.subscribe(eeg_topic("*", stream), maxsize=self.lease_queue_size,
+                                          name=f"lease-{self.leases_granted}")
+        lease = StreamLease(stream, subscription, self.headset_id, self.session_id, self.subscribed.get(stream, []))
+        self._leases[stream].add(lease)
+        try:
+            yield lease
+        finally:
+            self._leases[stream].discard(lease)
+            subscription.close()
+            await self._release_producer()
+
+    # ---------- continuous producer ----------
+
+    async def _keep_streaming(self) -> None:
+        while True:
+            try:
+                await self.ensure_ready()
+            except Exception as e:
+                repeated = self.last_error == f"{type(e).__name__}: {e}"
+                self._record_failure(e)
+                if not repeated:
+                    logger.warning(f"[Cortex Pool] Producer could not (re)open the session: {e}")
+            await asyncio.sleep(PRODUCER_CHECK_INTERVAL)
+
+    async def _start_producer(self) -> None:
+        if self._producer is None or self._producer.done():
+            self._producer = asyncio.create_task(self._keep_streaming())
+
+    def start_producer(self) -> None:
+        """
+        Keep the session subscribed and publishing to the hub between collections
+        (for live subscribers such as /api/hub/stream); idempotent. Subscribe to the
+        hub first: release_producer() stops it once no eeg/ subscriber is left.
+        """
+        self.run(self._start_producer(), timeout=5)
+
+    async def _stop_producer(self) -> None:
+        if self._producer is not None and not self._producer.done():
+            self._producer.cancel()
+            logger.info("[Cortex Pool] Producer stopped")
+        self._producer = None
+
+    def stop_producer(self) -> None:
+        """Stop keeping the session streaming (the session itself stays open for leases); idempotent"""
+        if self._producer is not None:
+            self.run(self._stop_producer(), timeout=5)
+
+    async def _release_producer(self) -> None:
+        # Runs on the pool loop, so it cannot interleave with a _start_producer
+        if self.hub.subscriber_count(eeg_topic("*", "*")) == 0:
+            await self._stop_producer()
+
+    def release_producer(self) -> None:
+        """Stop the producer if no hub subscriber of an eeg/ topic is left (call after closing one)"""
+        if self._producer is not None:
+            self.run(self._release_producer(), timeout=5)
+
+    # ---------- health ----------
+
+    def stats(self) -> Dict:
+        token_age = time.time() - self.token_issued_at if self.token_issued_at else None
+        return {
+            'started': self._thread is not None and self._thread.is_alive(),
+            'url': self.url,
+            'connected': self.client is not None and self.client.is_open,
+            'token_cached': self.token is not None,
+            'token_age_seconds': round(token_age, 1) if token_age is not None else None,
+            'token_expires_in_seconds': round(self.token_ttl - token_age, 1) if self.token_valid else None,
+            'headset_id': self.headset_id,
+            'session_id': self.session_id,
+            'subscribed_streams': sorted(self.subscribed),
+            'active_leases': {name: len(leases) for name, leases in self._leases.items()},
+            'producer_running': self._producer is not None and not self._producer.done(),
+            'leases_granted': self.leases_granted,
+            'frames_received': self.frames_received,
+            'connects': self.connects,
+            'authorizations': self.authorizations,
+            'sessions_created': self.sessions_created,
+            'subscriptions': self.subscriptions,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'last_ready_ms': self.last_ready_ms
+        }
@@ -0,0 +1,111 @@
+"""
+Group-commit frame writer for capture scripts
+The recv loop only enqueues frames; a background thread writes them and makes
+them durable in groups (fsync every sync_interval_ms or sync_every_frames,
+whichever comes first), so the websocket loop never waits on the disk.
+"""
+import queue
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Background writer fed by a bounded queue.
+    write_fn(item) persists one frame; sync_fn() flushes/fsyncs everything written so far.
+    When the queue is full, submit() blocks (backpressure) rather than dropping frames.
+    """
+
+    def __init__(self, write_fn: Callable[[object], None], sync_fn: Optional[Callable[[], None]] = None,
+                 sync_interval_ms: float = 500, sync_every_frames: int = 50, max_queue: int = 1024):
+        self.write_fn = write_fn
+        self.sync_fn = sync_fn
+        self.sync_interval = max(0.0, sync_interval_ms) / 1000.0
+        self.sync_every_frames = max(1, int(sync_every_frames))
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+
+        self.frames_received = 0
+        self.frames_written = 0
+        self.syncs = 0
+        self.write_errors = 0
+        self.queue_high_water = 0
+        self.last_error = None
+
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> None:
+        self._queue.put(item)
+        depth = self._queue.qsize()
+        with self._lock:
+            self.frames_received += 1
+            if depth > self.queue_high_water:
+                self.queue_high_water = depth
+
+    def _sync(self) -> None:
+        if self.sync_fn is None:
+            return
+        try:
+            self.sync_fn()
+            with self._lock:
+                self.syncs += 1
+        except Exception as e:
+            with self._lock:
+                self.write_errors += 1
+                self.last_error = str(e)
+
+    def _run(self) -> None:
+        unsynced = 0
+        group_start = 0.0  # when the oldest unsynced frame was written
+        while True:
+            timeout = None
+            if unsynced:
+                timeout = max(0.0, self.sync_interval - (time.monotonic() - group_start))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                if unsynced:
+                    self._sync()
+                return
+
+            if item is not None:
+                try:
+                    self.write_fn(item)
+                    if not unsynced:
+                        group_start = time.monotonic()
+                    unsynced += 1
+                    with self._lock:
+                        self.frames_written += 1
+                except Exception as e:
+                    with self._lock:
+                        self.write_errors += 1
+                        self.last_error = str(e)
+
+            if unsynced and (unsynced >= self.sync_every_frames or
+                             time.monotonic() - group_start >= self.sync_interval):
+                self._sync()
+                unsynced = 0
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write everything still queued, fsync once more and stop the thread"""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'frames_received': self.frames_received,
+                'frames_written': self.frames_written,
+                'queue_depth': self._queue.qsize(),
+                'queue_high_water': self.queue_high_water,
+                'syncs': self.syncs,
+                'write_errors': self.write_errors,
+                'last_error': self.last_error
+            }
@@ -0,0 +1,87 @@
+"""
+JSON codec for Cortex frames and API responses
+Uses orjson when it is installed and the standard library json module
+otherwise; both paths accept NumPy scalars and arrays, so callers do not need
+to float()/tolist() values before serialising. EEG_JSON_BACKEND=json forces
+the standard library (e.g. to compare behaviour).
+"""
+import json
+import os
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+BACKEND_ORJSON = 'orjson'
+BACKEND_STDLIB = 'json'
+
+JSONDecodeError = json.JSONDecodeError  # orjson.JSONDecodeError subclasses it
+
+
+def to_builtin(obj):
+    """`default` hook: NumPy values -> Python numbers/lists; TypeError for anything else"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def chain_default(default: Optional[Callable]) -> Callable:
+    """to_builtin first, then the caller's default hook for anything else"""
+    if default is None:
+        return to_builtin
+
+    def hook(obj):
+        try:
+            return to_builtin(obj)
+        except TypeError:
+            return default(obj)
+    return hook
+
+
+# ---------- standard library ----------
+
+def _stdlib_loads(data):
+    return json.loads(data)
+
+
+def _stdlib_dumps(obj, default: Optional[Callable] = None, sort_keys: bool = False) -> str:
+    return json.dumps(obj, default=chain_default(default), sort_keys=sort_keys, separators=(',', ':'))
+
+
+# ---------- orjson ----------
+
+def _orjson_loads(data):
+    return orjson.loads(data)
+
+
+def _orjson_dumps(obj, default: Optional[Callable] = None, sort_keys: bool = False) -> str:
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(obj, default=chain_default(default), option=option).decode('utf-8')
+
+
+BACKENDS = {BACKEND_STDLIB: (_stdlib_loads, _stdlib_dumps)}
+if orjson is not None:
+    BACKENDS[BACKEND_ORJSON] = (_orjson_loads, _orjson_dumps)
+
+BACKEND = os.getenv('EEG_JSON_BACKEND', BACKEND_ORJSON if orjson is not None else BACKEND_STDLIB)
+if BACKEND not in BACKENDS:
+    BACKEND = BACKEND_STDLIB
+_loads, _dumps = BACKENDS[BACKEND]
+
+
+def loads(data) -> Any:
+    """Parse a JSON document (str or bytes); raises ValueError on malformed input"""
+    return _loads(data)
+
+
+def dumps(obj, default: Optional[Callable] = None, sort_keys: bool = False) -> str:
+    """Compact JSON text for obj; `default` handles types other than JSON and NumPy values"""
+    return _dumps(obj, default, sort_keys)
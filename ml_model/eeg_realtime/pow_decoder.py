@@ -0,0 +1,159 @@
+"""
+Shared decoder for Cortex 'pow' (band power) messages
+Normalises the payload shapes seen in the wild (flat list, {"values": [[...]]},
+[{"values": [[...]]}]) and turns each frame into a (n_channels, n_bands)
+float32 array with a single reshape. Channel and band order come from the
+subscription's `cols` header ("AF3/theta", ...) when available, otherwise the
+frame is assumed to be channel-major in DEFAULT_BANDS order.
+"""
+import numpy as np
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_CHANNELS = ["AF3", "AF4", "T7", "T8", "Pz"]
+DEFAULT_BANDS = ["delta", "theta", "alpha", "beta", "gamma"]
+
+
+def pow_values(payload) -> list:
+    """Flat list of numbers for one frame of a pow payload ([] if the payload has none)"""
+    if isinstance(payload, dict) and "pow" in payload:
+        payload = payload["pow"]  # whole stream message
+    if isinstance(payload, dict):
+        values = payload.get("values", [])
+    elif isinstance(payload, list) and len(payload) > 0:
+        if isinstance(payload[0], dict):
+            values = payload[0].get("values", [])
+        elif isinstance(payload[0], (int, float)):
+            return payload
+        else:
+            values = []
+    else:
+        values = []
+    if values and isinstance(values[0], list):
+        return values[0]
+    return values
+
+
+def layout_from_cols(cols: Sequence[str]) -> Tuple[List[str], List[str], Optional[np.ndarray]]:
+    """
+    Channel and band names from a "channel/band" cols header, in order of first appearance.
+    Returns (channels, bands, order) where order gathers a flat frame into channel-major
+    layout, or None when the frame already is channel-major.
+    """
+    channels, bands, pairs = [], [], []
+    for col in cols:
+        channel, _, band = str(col).partition("/")
+        if not band:
+            raise ValueError(f"pow column '{col}' is not of the form channel/band")
+        if channel not in channels:
+            channels.append(channel)
+        if band not in bands:
+            bands.append(band)
+        pairs.append((channels.index(channel), bands.index(band)))
+
+    if len(pairs) != len(channels) * len(bands) or len(set(pairs)) != len(pairs):
+        raise ValueError("pow cols do not form a complete channel x band grid")
+    # Position of each (channel, band) cell in the incoming frame
+    order = np.empty(len(pairs), dtype=np.intp)
+    for position, (ch, band) in enumerate(pairs):
+        order[ch * len(bands) + band] = position
+    if np.array_equal(order, np.arange(len(pairs))):
+        order = None
+    return channels, bands, order
+
+
+class PowDecoder:
+    """
+    Decodes pow messages of one subscription into (n_channels, n_bands) arrays.
+    float32 by default; pass dtype=np.float64 where values are exported as text.
+    """
+
+    def __init__(self, cols: Optional[Sequence[str]] = None,
+                 channels: Sequence[str] = DEFAULT_CHANNELS, bands: Sequence[str] = DEFAULT_BANDS,
+                 dtype=np.float32):
+        self.dtype = dtype
+        self.order = None
+        if cols:
+            self.channels, self.bands, self.order = layout_from_cols(cols)
+            self.from_cols = True
+        else:
+            self.channels, self.bands = list(channels), list(bands)
+            self.from_cols = False
+        self.n_bands = len(self.bands)
+
+    def _shape(self, n_values: int) -> Optional[Tuple[int, int]]:
+        if n_values == 0 or n_values % self.n_bands != 0:
+            return None
+        if self.from_cols and n_values != len(self.channels) * self.n_bands:
+            return None
+        return n_values // self.n_bands, self.n_bands
+
+    def channel_names(self, n_channels: int) -> List[str]:
+        """Names for n decoded rows (Ch<i> for rows beyond the known channels)"""
+        return [self.channels[i] if i < len(self.channels) else f"Ch{i}" for i in range(n_channels)]
+
+    def decode(self, message) -> Optional[np.ndarray]:
+        """One pow message (or payload) -> (n_channels, n_bands) array, None if malformed"""
+        values = pow_values(message)
+        shape = self._shape(len(values))
+        if shape is None:
+            return None
+        try:
+            frame = np.asarray(values, dtype=self.dtype)
+        except (TypeError, ValueError):
+            return None
+        if self.order is not None:
+            frame = frame[self.order]
+        return frame.reshape(shape)
+
+    def decode_batch(self, messages: Iterable) -> np.ndarray:
+        """
+        Buffered pow messages -> (frames, n_channels, n_bands) array.
+        Frames that are malformed or differ in size from the first valid frame are skipped.
+        """
+        rows = []
+        shape = None
+        for message in messages:
+            values = pow_values(message)
+            frame_shape = self._shape(len(values))
+            if frame_shape is None:
+                continue
+            if shape is None:
+                shape = frame_shape
+            elif frame_shape != shape:
+                continue
+            rows.append(values)
+        if not rows:
+            return np.empty((0, len(self.channels), self.n_bands), dtype=self.dtype)
+        try:
+            frames = np.asarray(rows, dtype=self.dtype)
+        except (TypeError, ValueError):
+            # A non-numeric value somewhere: fall back to decoding frame by frame
+            decoded = [self.decode(values) for values in rows]
+            decoded = [frame for frame in decoded if frame is not None]
+            if not decoded:
+                return np.empty((0,) + shape, dtype=self.dtype)
+            return np.stack(decoded)
+        if self.order is not None:
+            frames = frames[:, self.order]
+        return frames.reshape((len(rows),) + shape)
+
+    def project(self, frames: np.ndarray, channels: Sequence[str]) -> np.ndarray:
+        """
+        Rows of `frames` (..., n_channels, n_bands) for the requested channels, NaN where
+        a channel is missing. Matched by name with a cols header, by position otherwise, so
+        on a headset without e.g. Pz (14-channel EPOC) that row is NaN with a header and the
+        headset's 5th channel without one. Callers skip NaN rows (nansum/count, NaN-aware stats).
+        """
+        n_rows = frames.shape[-2]
+        if self.from_cols:
+            index = [self.channels.index(ch) if ch in self.channels else -1 for ch in channels]
+        else:
+            index = [i if i < n_rows else -1 for i in range(len(channels))]
+        index = np.asarray(index, dtype=np.intp)
+        if (index >= 0).all():
+            if np.array_equal(index, np.arange(n_rows)):
+                return frames
+            return frames[..., index, :]
+        out = np.full(frames.shape[:-2] + (len(channels), frames.shape[-1]), np.nan, dtype=frames.dtype)
+        out[..., index >= 0, :] = frames[..., index[index >= 0], :]
+        return out
@@ -4,15 +4,24 @@ Automatically connects to EEG device, collects readings, filters noise, and comp
 No manual intervention required - just call collect_eeg_data().
 """
 
-import websocket
-import json
+import asyncio
+import concurrent.futures
+import os
+import threading
 import time
-import ssl
 import traceback
 import numpy as np
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, Optional, Tuple
 import logging
 
+import websockets
+
+from .cortex_client import CortexError
+from .cortex_pool import CortexSessionPool
+from .pow_decoder import PowDecoder
+from .stream_hub import get_hub
+from .running_stats import RunningBandStats, make_band_stats, FILTER_MODES, FILTER_SIGMA
+
 logger = logging.getLogger(__name__)
 
 # Cortex API credentials (same as cortex_test.py)
@@ -26,259 +35,204 @@ BAND_NAMES = ["delta", "theta", "alpha", "beta", "gamma"]
 COLLECTION_DURATION = 30  # seconds
 MIN_SAMPLES_REQUIRED = 50  # minimum readings for valid data
 NOISE_THRESHOLD_MULTIPLIER = 3.0  # for outlier detection (3 standard deviations)
+# 'sigma' (running mean/std, ~27 us/frame) or 'robust' (streaming median/MAD, ~476 us/frame,
+# opt-in for artifact-heavy recordings)
+NOISE_FILTER_MODE = os.getenv('EEG_NOISE_FILTER', FILTER_SIGMA)
+MAX_RECONNECTS = 2  # re-leases allowed when the Cortex connection drops mid-collection
+COLLECTION_TIMEOUT_MARGIN = 30  # seconds allowed on top of the duration for (re)connecting
+CANCEL_POLL_INTERVAL = 0.5  # seconds between cancellation checks while no frames arrive
+COLLECTION_CANCELLED_MESSAGE = "Collection cancelled"
 
+if NOISE_FILTER_MODE not in FILTER_MODES:
+    logger.warning(f"Unknown EEG_NOISE_FILTER '{NOISE_FILTER_MODE}', using '{FILTER_SIGMA}'")
+    NOISE_FILTER_MODE = FILTER_SIGMA
 
-def send_ws_message(ws, msg: dict, timeout: float = 10.0) -> dict:
-    """Send WebSocket message and wait for response"""
-    ws.send(json.dumps(msg))
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            raw = ws.recv()
-            if not raw:
-                continue
-            try:
-                data = json.loads(raw)
-                return data
-            except ValueError:
-                continue
-        except websocket.WebSocketTimeoutException:
-            continue
-    raise TimeoutError("No response received from Cortex")
+# Shared Cortex connection/session reused across collections (see cortex_pool.py)
+_session_pool = None
+_session_pool_lock = threading.Lock()
 
 
-def filter_noise(values: list, threshold_multiplier: float = NOISE_THRESHOLD_MULTIPLIER) -> list:
+def compute_averages(stats: RunningBandStats) -> Dict[str, float]:
     """
-    Remove outliers using statistical filtering (values beyond threshold_multiplier * std_dev)
+    Compute average band powers across all channels after noise filtering
+    (outliers were rejected online from the running moments as frames arrived)
     """
-    if len(values) < 3:
-        return values
-    
-    values_array = np.array(values)
-    mean = np.mean(values_array)
-    std_dev = np.std(values_array)
-    
-    if std_dev == 0:
-        return values
-    
-    threshold = threshold_multiplier * std_dev
-    filtered = [v for v in values if abs(v - mean) <= threshold]
-    
-    # If too many outliers removed, return original (might be valid variation)
-    if len(filtered) < len(values) * 0.5:
-        logger.warning(f"Too many outliers detected ({len(values) - len(filtered)}/{len(values)}), keeping original data")
-        return values
-    
-    return filtered
+    _, _, too_many = stats.filtered_means()
+    for ch_idx, band_idx in zip(*np.nonzero(too_many)):
+        logger.warning(f"Too many outliers detected ({int(stats.rejected()[ch_idx, band_idx])}/"
+                       f"{int(stats.count[ch_idx, band_idx])}) for {SELECTED_CHANNELS[ch_idx]} "
+                       f"{BAND_NAMES[band_idx]}, keeping original data")
 
+    band_averages = stats.band_averages()
+    return {band: float(band_averages[i]) for i, band in enumerate(BAND_NAMES)}
 
-def compute_averages(accumulated_data: Dict[str, Dict[str, list]]) -> Dict[str, float]:
-    """
-    Compute average band powers across all channels after noise filtering
-    """
-    band_totals = {band: [] for band in BAND_NAMES}
-    
-    # Collect all values for each band across all channels
-    for channel in SELECTED_CHANNELS:
-        if channel in accumulated_data:
-            for band in BAND_NAMES:
-                if band in accumulated_data[channel]:
-                    values = accumulated_data[channel][band]
-                    if values:
-                        # Filter noise
-                        filtered_values = filter_noise(values)
-                        band_totals[band].extend(filtered_values)
-    
-    # Compute overall averages for each band
-    averages = {}
-    for band in BAND_NAMES:
-        if band_totals[band]:
-            averages[band] = float(np.mean(band_totals[band]))
-        else:
-            averages[band] = 0.0
-    
-    return averages
+
+def _new_stats() -> RunningBandStats:
+    return make_band_stats(NOISE_FILTER_MODE, len(SELECTED_CHANNELS), len(BAND_NAMES), NOISE_THRESHOLD_MULTIPLIER)
+
+
+def _lease_decoder(lease) -> PowDecoder:
+    """Decoder for the leased stream, laid out from the subscription's cols when they are usable"""
+    try:
+        return PowDecoder(lease.cols or None, channels=SELECTED_CHANNELS, bands=BAND_NAMES)
+    except ValueError as e:
+        logger.warning(f"[EEG Realtime] Ignoring pow cols header ({e}); assuming channel-major frames")
+        return PowDecoder(channels=SELECTED_CHANNELS, bands=BAND_NAMES)
+
+
+def get_session_pool() -> CortexSessionPool:
+    """Process-wide Cortex session pool, created on first use"""
+    global _session_pool
+    with _session_pool_lock:
+        if _session_pool is None:
+            _session_pool = CortexSessionPool(APP_CLIENT_ID, APP_CLIENT_SECRET, streams=["pow"], hub=get_hub())
+        return _session_pool
+
+
+def session_pool_stats() -> Dict:
+    """Pool state for the health endpoint (does not start the pool)"""
+    if _session_pool is None:
+        return {'started': False}
+    return _session_pool.stats()
+
+
+async def _collect_from_lease(lease, deadline: float, stats: RunningBandStats,
+                              on_sample: Optional[Callable[[int], None]] = None,
+                              cancel_event: Optional[threading.Event] = None) -> Tuple[int, bool]:
+    """Consume leased pow frames until the deadline or cancellation. Returns (samples, connection_lost)"""
+    decoder = _lease_decoder(lease)
+    subscription = lease.subscription
+    sample_count = 0
+    while True:
+        if cancel_event is not None and cancel_event.is_set():
+            return sample_count, False
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return sample_count, False
+        # Wake up periodically so a cancellation is noticed even without frames
+        frame = await subscription.aget(min(remaining, CANCEL_POLL_INTERVAL))
+        if frame is None:
+            continue
+
+        # Take whatever else is already buffered and decode it in one go
+        frames = [frame] + subscription.drain()
+        connection_lost = any(f.is_end for f in frames)
+        messages = [f.data for f in frames if not f.is_end]
+
+        try:
+            if messages:
+                sample_count += len(messages)
+                if on_sample is not None:
+                    on_sample(len(messages))
+                values = decoder.project(decoder.decode_batch(messages), SELECTED_CHANNELS)
+                for row in values:
+                    stats.update(row)
+        except Exception as e:
+            logger.warning(f"[EEG Realtime] Error processing samples: {e}")
+        if connection_lost:
+            return sample_count, True
 
 
-def collect_eeg_data(duration: int = COLLECTION_DURATION) -> Tuple[bool, Optional[Dict[str, float]], str]:
+async def _collect_eeg_data_async(duration: int, pool: CortexSessionPool,
+                                  progress: Optional[Callable[[int], None]] = None,
+                                  cancel_event: Optional[threading.Event] = None) -> Tuple[bool, Optional[Dict[str, float]], str]:
+    logger.info(f"[EEG Realtime] Collecting EEG data for {duration} seconds...")
+
+    stats = _new_stats()
+    deadline = time.monotonic() + duration
+    sample_count = 0
+    reconnects = 0
+
+    on_sample = None
+    if progress is not None:
+        reported = 0
+
+        def on_sample(n: int):
+            nonlocal reported
+            reported += n
+            progress(reported)
+
+    while deadline - time.monotonic() > 0:
+        # Step 1: Lease the shared pow stream (connects/authorizes/subscribes only if needed)
+        try:
+            async with pool.lease("pow") as lease:
+                logger.info(f"[EEG Realtime] Leased pow stream of session {lease.session_id} "
+                            f"on headset {lease.headset_id}")
+                # Step 2: Collect data for specified duration
+                samples, connection_lost = await _collect_from_lease(
+                    lease, deadline, stats, on_sample, cancel_event
+                )
+                sample_count += samples
+        except CortexError as e:
+            if e.method == "queryHeadsets":
+                error_msg = "No EEG headset found. Please connect the headset."
+            elif e.method == "createSession":
+                error_msg = f"Session creation failed: {e.error}"
+            elif e.method == "subscribe":
+                error_msg = f"Subscription failed: {e.error}"
+            else:
+                error_msg = f"Authorization failed: {e.error}"
+            logger.error(f"[EEG Realtime] {error_msg}")
+            return False, None, error_msg
+
+        if cancel_event is not None and cancel_event.is_set():
+            logger.info(f"[EEG Realtime] Collection cancelled after {sample_count} samples")
+            return False, None, COLLECTION_CANCELLED_MESSAGE
+        if not connection_lost:
+            break
+        reconnects += 1
+        if reconnects > MAX_RECONNECTS:
+            logger.warning("[EEG Realtime] Cortex connection lost again, giving up on this collection")
+            break
+        logger.warning("[EEG Realtime] Cortex connection closed during collection, reconnecting...")
+
+    # Step 3: Compute averages
+    logger.info(f"[EEG Realtime] Collected {sample_count} samples. Computing averages...")
+
+    if sample_count < MIN_SAMPLES_REQUIRED:
+        error_msg = f"Insufficient samples collected ({sample_count} < {MIN_SAMPLES_REQUIRED}). Please ensure headset is properly connected."
+        logger.warning(f"[EEG Realtime] {error_msg}")
+        return False, None, error_msg
+
+    averages = compute_averages(stats)
+
+    # Validate averages
+    if all(v == 0.0 for v in averages.values()):
+        error_msg = "All band averages are zero. Check headset connection."
+        logger.error(f"[EEG Realtime] {error_msg}")
+        return False, None, error_msg
+
+    logger.info(f"[EEG Realtime] Successfully collected and processed EEG data: {averages}")
+    return True, averages, f"Successfully collected {sample_count} samples"
+
+
+def collect_eeg_data(duration: int = COLLECTION_DURATION,
+                     progress: Optional[Callable[[int], None]] = None,
+                     cancel_event: Optional[threading.Event] = None) -> Tuple[bool, Optional[Dict[str, float]], str]:
     """
     Automatically collect EEG data from connected device.
     
     Args:
         duration: Collection duration in seconds (default: 30)
+        progress: Optional callback receiving the number of samples collected so far
+        cancel_event: Optional event; setting it stops the collection early
     
     Returns:
         Tuple of (success: bool, data: Dict[str, float] or None, message: str)
     """
-    ws = None
     try:
         logger.info(f"[EEG Realtime] Starting automatic EEG collection for {duration} seconds...")
-        
-        # Step 1: Connect to Cortex
-        logger.info("[EEG Realtime] Connecting to Cortex service...")
-        ws = websocket.create_connection(
-            "wss://localhost:6868",
-            sslopt={"cert_reqs": ssl.CERT_NONE},
-            timeout=10
-        )
-        ws.settimeout(10)
-        logger.info("[EEG Realtime] Connected to Cortex!")
-        
-        # Step 2: Get Cortex Info
-        msg = {"id": 1, "jsonrpc": "2.0", "method": "getCortexInfo"}
-        resp = send_ws_message(ws, msg)
-        logger.debug(f"[EEG Realtime] Cortex info: {resp}")
-        
-        # Step 3: Request Access
-        msg = {
-            "id": 2,
-            "jsonrpc": "2.0",
-            "method": "requestAccess",
-            "params": {"clientId": APP_CLIENT_ID, "clientSecret": APP_CLIENT_SECRET}
-        }
-        resp = send_ws_message(ws, msg)
-        logger.debug(f"[EEG Realtime] Access request: {resp}")
-        
-        # Step 4: Authorize
-        msg = {
-            "id": 3,
-            "jsonrpc": "2.0",
-            "method": "authorize",
-            "params": {"clientId": APP_CLIENT_ID, "clientSecret": APP_CLIENT_SECRET}
-        }
-        resp = send_ws_message(ws, msg)
-        
-        if "result" not in resp or "cortexToken" not in resp["result"]:
-            error_msg = f"Authorization failed: {resp}"
-            logger.error(f"[EEG Realtime] {error_msg}")
-            return False, None, error_msg
-        
-        cortex_token = resp["result"]["cortexToken"]
-        logger.info("[EEG Realtime] Authorized successfully")
-        
-        # Step 5: Query Headset
-        msg = {"id": 4, "jsonrpc": "2.0", "method": "queryHeadsets"}
-        resp = send_ws_message(ws, msg)
-        
-        if not resp.get("result") or len(resp["result"]) == 0:
-            error_msg = "No EEG headset found. Please connect the headset."
-            logger.error(f"[EEG Realtime] {error_msg}")
-            return False, None, error_msg
-        
-        headset_id = resp["result"][0]["id"]
-        logger.info(f"[EEG Realtime] Headset found: {headset_id}")
-        
-        # Step 6: Create Session
-        msg = {
-            "id": 5,
-            "jsonrpc": "2.0",
-            "method": "createSession",
-            "params": {"cortexToken": cortex_token, "headset": headset_id, "status": "open"}
-        }
-        resp = send_ws_message(ws, msg)
-        
-        if "result" not in resp:
-            error_msg = f"Session creation failed: {resp}"
-            logger.error(f"[EEG Realtime] {error_msg}")
-            return False, None, error_msg
-        
-        session_id = resp["result"]["id"]
-        logger.info(f"[EEG Realtime] Session created: {session_id}")
-        
-        # Step 7: Subscribe to Power Bands
-        msg = {
-            "id": 6,
-            "jsonrpc": "2.0",
-            "method": "subscribe",
-            "params": {"cortexToken": cortex_token, "session": session_id, "streams": ["pow"]}
-        }
-        resp = send_ws_message(ws, msg)
-        logger.info("[EEG Realtime] Subscribed to EEG Power Bands stream")
-        
-        # Step 8: Collect data for specified duration
-        logger.info(f"[EEG Realtime] Collecting EEG data for {duration} seconds...")
-        
-        accumulated_data = {ch: {b: [] for b in BAND_NAMES} for ch in SELECTED_CHANNELS}
-        start_time = time.time()
-        sample_count = 0
-        
-        while time.time() - start_time < duration:
-            try:
-                raw = ws.recv()
-                if not raw:
-                    continue
-                
-                try:
-                    data = json.loads(raw)
-                except ValueError:
-                    continue
-                
-                # Process power band data
-                if "pow" in data:
-                    pow_data = data["pow"]
-                    sample_count += 1
-                    
-                    # Normalize different payload formats
-                    if isinstance(pow_data, dict):
-                        values = pow_data.get("values", [])
-                    elif isinstance(pow_data, list) and len(pow_data) > 0:
-                        if isinstance(pow_data[0], dict):
-                            values = pow_data[0].get("values", [])
-                        elif all(isinstance(x, (int, float)) for x in pow_data):
-                            values = [pow_data]
-                        else:
-                            values = []
-                    else:
-                        values = []
-                    
-                    if values and len(values) > 0:
-                        frame = values[0]
-                        n_vals = len(frame)
-                        n_bands = len(BAND_NAMES)
-                        
-                        if n_vals % n_bands == 0:
-                            n_channels = n_vals // n_bands
-                            
-                            for idx, val in enumerate(frame):
-                                ch_idx = idx // n_bands
-                                band_idx = idx % n_bands
-                                
-                                if ch_idx < len(SELECTED_CHANNELS):
-                                    channel = SELECTED_CHANNELS[ch_idx]
-                                    band = BAND_NAMES[band_idx]
-                                    accumulated_data[channel][band].append(float(val))
-                
-            except websocket.WebSocketTimeoutException:
-                continue
-            except Exception as e:
-                logger.warning(f"[EEG Realtime] Error processing sample: {e}")
-                continue
-        
-        # Step 9: Compute averages
-        logger.info(f"[EEG Realtime] Collected {sample_count} samples. Computing averages...")
-        
-        if sample_count < MIN_SAMPLES_REQUIRED:
-            error_msg = f"Insufficient samples collected ({sample_count} < {MIN_SAMPLES_REQUIRED}). Please ensure headset is properly connected."
-            logger.warning(f"[EEG Realtime] {error_msg}")
-            return False, None, error_msg
-        
-        averages = compute_averages(accumulated_data)
-        
-        # Validate averages
-        if all(v == 0.0 for v in averages.values()):
-            error_msg = "All band averages are zero. Check headset connection."
-            logger.error(f"[EEG Realtime] {error_msg}")
-            return False, None, error_msg
-        
-        logger.info(f"[EEG Realtime] Successfully collected and processed EEG data: {averages}")
-        return True, averages, f"Successfully collected {sample_count} samples"
-        
-    except websocket.WebSocketException as e:
-        error_msg = f"WebSocket connection error: {str(e)}"
+        pool = get_session_pool()
+        # Generous bound over the collection itself to cover (re)connecting
+        return pool.run(_collect_eeg_data_async(duration, pool, progress, cancel_event),
+                        timeout=duration + COLLECTION_TIMEOUT_MARGIN)
+    # Checked first: on Python 3.11+ TimeoutError is an OSError
+    except (asyncio.TimeoutError, concurrent.futures.TimeoutError) as e:
+        error_msg = f"Connection timeout: {str(e) or 'no response received from Cortex'}"
         logger.error(f"[EEG Realtime] {error_msg}")
         return False, None, error_msg
-    except TimeoutError as e:
-        error_msg = f"Connection timeout: {str(e)}"
+    except (websockets.WebSocketException, OSError) as e:
+        error_msg = f"WebSocket connection error: {str(e)}"
         logger.error(f"[EEG Realtime] {error_msg}")
         return False, None, error_msg
     except Exception as e:
@@ -286,11 +240,3 @@ def collect_eeg_data(duration: int = COLLECTION_DURATION) -> Tuple[bool, Optiona
         logger.error(f"[EEG Realtime] {error_msg}")
         logger.error(traceback.format_exc())
         return False, None, error_msg
-    finally:
-        if ws:
-            try:
-                ws.close()
-                logger.info("[EEG Realtime] WebSocket connection closed")
-            except:
-                pass
-
@@ -0,0 +1,223 @@
+"""
+O(1)-memory running statistics for band-power collection
+Per (channel, band) cell: Welford mean/variance, min/max and count, held in
+fixed (n_channels, n_bands) arrays and updated one frame at a time. Outliers
+are rejected online, either from the running moments ('sigma': |x - mean| >
+k * std of the values seen so far) or from streaming P-square median/MAD
+sketches ('robust': |x - median| > k * 1.4826 * MAD), without keeping history.
+"""
+import numpy as np
+from typing import Dict, List
+
+FILTER_SIGMA = 'sigma'
+FILTER_ROBUST = 'robust'
+FILTER_MODES = (FILTER_SIGMA, FILTER_ROBUST)
+# Scales the MAD to a standard deviation for normally distributed data
+MAD_TO_STD = 1.4826
+
+# Cells need this many values before the outlier gate is applied
+# (filter_noise also kept series shorter than 3 unfiltered)
+WARMUP_SAMPLES = 3
+# If the gate rejected more than this fraction of a cell, fall back to its raw mean
+MAX_REJECTED_FRACTION = 0.5
+
+
+class RunningBandStats:
+    """Streaming per-cell statistics over frames of shape (n_channels, n_bands); NaN marks a missing value"""
+
+    def __init__(self, n_channels: int, n_bands: int, threshold_multiplier: float = 3.0,
+                 warmup: int = WARMUP_SAMPLES):
+        shape = (n_channels, n_bands)
+        self.shape = shape
+        self.threshold_multiplier = threshold_multiplier
+        self.warmup = warmup
+
+        # Every value
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+
+        # Values that passed the outlier gate
+        self.kept_count = np.zeros(shape, dtype=np.int64)
+        self.kept_mean = np.zeros(shape)
+        self.kept_m2 = np.zeros(shape)
+
+        self.frames = 0
+
+    @staticmethod
+    def _welford(mask: np.ndarray, x: np.ndarray, count: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> None:
+        """In-place Welford step for the cells selected by mask"""
+        count += mask
+        n = np.where(mask, count, 1)
+        delta = np.where(mask, x - mean, 0.0)
+        mean += delta / n
+        m2 += delta * np.where(mask, x - mean, 0.0)
+
+    def std(self) -> np.ndarray:
+        """Population standard deviation of every value (same as np.std)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(np.where(self.count > 0, self.m2 / self.count, np.nan))
+
+    def _keep(self, x: np.ndarray, present: np.ndarray) -> np.ndarray:
+        """Outlier gate against the moments of the values seen before this frame"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.m2 / np.maximum(self.count, 1))
+        gated = (self.count >= self.warmup) & (std > 0)
+        return present & (~gated | (np.abs(x - self.mean) <= self.threshold_multiplier * std))
+
+    def update(self, frame) -> None:
+        x = np.asarray(frame, dtype=np.float64).reshape(self.shape)
+        present = ~np.isnan(x)
+        x = np.where(present, x, 0.0)
+        keep = self._keep(x, present)
+
+        self._welford(present, x, self.count, self.mean, self.m2)
+        self._welford(keep, x, self.kept_count, self.kept_mean, self.kept_m2)
+        np.minimum(self.min, np.where(present, x, np.inf), out=self.min)
+        np.maximum(self.max, np.where(present, x, -np.inf), out=self.max)
+        self.frames += 1
+
+    def rejected(self) -> np.ndarray:
+        return self.count - self.kept_count
+
+    def filtered_means(self):
+        """
+        Per-cell (means, counts) after outlier rejection. Cells where more than
+        MAX_REJECTED_FRACTION of values were rejected use all values instead.
+        """
+        too_many = self.kept_count < self.count * (1.0 - MAX_REJECTED_FRACTION)
+        means = np.where(too_many, self.mean, self.kept_mean)
+        counts = np.where(too_many, self.count, self.kept_count)
+        return means, counts, too_many
+
+    def band_averages(self) -> np.ndarray:
+        """Mean per band over every kept value of every channel; 0.0 for bands with no values"""
+        means, counts, _ = self.filtered_means()
+        totals = (means * counts).sum(axis=0)
+        n = counts.sum(axis=0)
+        return np.where(n > 0, totals / np.maximum(n, 1), 0.0)
+
+    def summary(self, channel_names: List[str], band_names: List[str]) -> Dict[str, Dict[str, Dict]]:
+        """Nested {channel: {band: {count, mean, std, min, max, kept}}} for logging/debugging"""
+        std = self.std()
+        out = {}
+        for i, ch in enumerate(channel_names):
+            out[ch] = {}
+            for j, band in enumerate(band_names):
+                if self.count[i, j] == 0:
+                    continue
+                out[ch][band] = {
+                    'count': int(self.count[i, j]),
+                    'mean': float(self.mean[i, j]),
+                    'std': float(std[i, j]),
+                    'min': float(self.min[i, j]),
+                    'max': float(self.max[i, j]),
+                    'kept': int(self.kept_count[i, j])
+                }
+        return out
+
+
+class P2Quantile:
+    """
+    P-square streaming quantile estimate (Jain & Chlamtac) for every cell of an
+    array at once: five markers per cell, O(1) memory and time per value.
+    """
+
+    def __init__(self, shape, p: float = 0.5):
+        self.p = p
+        self.q = np.zeros((5,) + tuple(shape))  # marker heights
+        self.n = np.broadcast_to(np.arange(5.0).reshape((5,) + (1,) * len(shape)), self.q.shape).copy()
+        self.desired = np.broadcast_to(
+            np.array([0, 2 * p, 4 * p, 2 + 2 * p, 4]).reshape((5,) + (1,) * len(shape)), self.q.shape
+        ).copy()
+        self.dn = np.array([0, p / 2, p, (1 + p) / 2, 1]).reshape((5,) + (1,) * len(shape))
+        self.count = np.zeros(shape, dtype=np.int64)
+
+    @property
+    def ready(self) -> np.ndarray:
+        return self.count >= 5
+
+    def value(self) -> np.ndarray:
+        """Current estimate per cell (NaN until a cell has seen 5 values)"""
+        return np.where(self.ready, self.q[2], np.nan)
+
+    def update(self, x: np.ndarray, mask: np.ndarray) -> None:
+        q, n = self.q, self.n
+
+        # First five values of a cell are stored, then sorted into the initial markers
+        init = mask & (self.count < 5)
+        if init.any():
+            slot = np.minimum(self.count, 4)[None]
+            current = np.take_along_axis(q, slot, axis=0)[0]
+            np.put_along_axis(q, slot, np.where(init, x, current)[None], axis=0)
+            self.count += init
+            filled = init & (self.count == 5)
+            if filled.any():
+                q[:] = np.where(filled, np.sort(q, axis=0), q)
+
+        upd = mask & ~init
+        if not upd.any():
+            return
+
+        # Extend the extremes and find the cell k with q[k] <= x < q[k+1]
+        q[0] = np.where(upd & (x < q[0]), x, q[0])
+        q[4] = np.where(upd & (x > q[4]), x, q[4])
+        k = np.minimum((x[None] >= q[1:]).sum(axis=0), 3)
+        n += upd & (np.arange(5).reshape((5,) + (1,) * k.ndim) > k)
+        self.desired += np.where(upd, self.dn, 0.0)
+        self.count += upd
+
+        # Nudge the three middle markers towards their desired positions
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for i in (1, 2, 3):
+                d = self.desired[i] - n[i]
+                move = upd & (((d >= 1) & (n[i + 1] - n[i] > 1)) | ((d <= -1) & (n[i - 1] - n[i] < -1)))
+                if not move.any():
+                    continue
+                ds = np.sign(d)
+                parabolic = q[i] + ds / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + ds) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - ds) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                q_next = np.where(ds > 0, q[i + 1], q[i - 1])
+                n_next = np.where(ds > 0, n[i + 1], n[i - 1])
+                linear = q[i] + ds * (q_next - q[i]) / (n_next - n[i])
+                in_bounds = (q[i - 1] < parabolic) & (parabolic < q[i + 1])
+                q[i] = np.where(move, np.where(in_bounds, parabolic, linear), q[i])
+                n[i] += np.where(move, ds, 0.0)
+
+
+class RobustBandStats(RunningBandStats):
+    """
+    RunningBandStats whose outlier gate uses streaming median and MAD
+    (|x - median| > k * 1.4826 * MAD), which outliers themselves barely move.
+    """
+
+    def __init__(self, n_channels: int, n_bands: int, threshold_multiplier: float = 3.0,
+                 warmup: int = WARMUP_SAMPLES):
+        super().__init__(n_channels, n_bands, threshold_multiplier, warmup)
+        self.median = P2Quantile(self.shape, 0.5)
+        self.mad = P2Quantile(self.shape, 0.5)  # median of |x - running median|
+
+    def _keep(self, x: np.ndarray, present: np.ndarray) -> np.ndarray:
+        """Gate against the current median/MAD, then feed the frame to both sketches"""
+        median = self.median.value()
+        mad = self.mad.value()
+        with np.errstate(invalid='ignore'):
+            gated = self.mad.ready & (mad > 0) & (self.count >= self.warmup)
+            keep = present & (~gated | (np.abs(x - median) <= self.threshold_multiplier * MAD_TO_STD * mad))
+
+        self.median.update(x, present)
+        median = self.median.value()
+        self.mad.update(np.abs(x - np.where(self.median.ready, median, x)), present & self.median.ready)
+        return keep
+
+
+def make_band_stats(mode: str, n_channels: int, n_bands: int, threshold_multiplier: float = 3.0) -> RunningBandStats:
+    if mode == FILTER_SIGMA:
+        return RunningBandStats(n_channels, n_bands, threshold_multiplier)
+    if mode == FILTER_ROBUST:
+        return RobustBandStats(n_channels, n_bands, threshold_multiplier)
+    raise ValueError(f"Unknown noise filter mode '{mode}' (available: {', '.join(FILTER_MODES)})")
@@ -0,0 +1,308 @@
+"""
+In-process publish/subscribe hub for live frames
+Producers (the Cortex session pool per headset, the Arduino endpoint per
+device, the band-average broadcaster) publish each frame once to a topic such
+as "eeg/<headset>/pow" or "biometric/<device>". Every subscriber owns a
+bounded queue with a drop-oldest policy, so a slow consumer (e.g. a browser
+tab on a poor connection) only loses its own oldest frames and never blocks
+the producer or the other subscribers. Per-subscriber lag and drop counts are
+reported by stats(). Subscribers can wait from threads (get) or coroutines (aget).
+Topic names come from clients (device ids), so at most max_topics are kept:
+the least recently published topics without retained history are forgotten.
+"""
+import asyncio
+import fnmatch
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, NamedTuple, Optional
+
+DEFAULT_QUEUE_SIZE = 256  # frames buffered per subscriber
+DEFAULT_MAX_TOPICS = 256  # least recently published topics are forgotten beyond this
+
+EEG_AVERAGES_TOPIC = 'eeg_averages'
+
+
+def eeg_topic(headset_id: Optional[str], stream: str = 'pow') -> str:
+    return f"eeg/{headset_id or 'unknown'}/{stream}"
+
+
+def biometric_topic(device_id: Optional[str]) -> str:
+    return f"biometric/{device_id or 'unknown'}"
+
+
+class Frame(NamedTuple):
+    topic: str
+    seq: int  # per-topic, starting at 1
+    timestamp: float  # publish time (time.time())
+    data: Any  # None marks the end of the stream (producer disconnected)
+
+    @property
+    def is_end(self) -> bool:
+        return self.data is None
+
+
+class Subscription:
+    """One consumer's bounded view of every topic matching `pattern` (fnmatch syntax)"""
+
+    def __init__(self, hub: 'StreamHub', pattern: str, maxsize: int, name: str):
+        self.hub = hub
+        self.pattern = pattern
+        self.maxsize = maxsize
+        self.name = name
+        self.created_at = time.time()
+        self.closed = False
+
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._async_waiters: List = []  # (loop, asyncio.Event)
+
+        self.delivered = 0
+        self.dropped = 0
+        self.last_seq: Dict[str, int] = {}  # topic -> seq of the last frame handed to the consumer
+
+    def matches(self, topic: str) -> bool:
+        return fnmatch.fnmatchcase(topic, self.pattern)
+
+    def _offer(self, frame: Frame) -> None:
+        """Called by the hub on the producer's thread; never blocks"""
+        with self._lock:
+            if self.closed:
+                return
+            if len(self._queue) >= self.maxsize:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(frame)
+            self._cond.notify()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _pop_locked(self) -> Optional[Frame]:
+        if not self._queue:
+            return None
+        frame = self._queue.popleft()
+        self.delivered += 1
+        self.last_seq[frame.topic] = frame.seq
+        return frame
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        """Next frame, or None after `timeout` seconds without one (or once closed)"""
+        with self._cond:
+            if not self._queue and not self.closed:
+                self._cond.wait_for(lambda: self._queue or self.closed, timeout)
+            return self._pop_locked()
+
+    async def aget(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        """Coroutine version of get() for consumers on an event loop"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - loop.time()
+            with self._lock:
+                frame = self._pop_locked()
+                if frame is not None or self.closed or (remaining is not None and remaining <= 0):
+                    return frame
+                event = asyncio.Event()
+                self._async_waiters.append((loop, event))
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    return self._pop_locked()
+
+    def drain(self, max_items: Optional[int] = None) -> List[Frame]:
+        """Every frame already queued (up to max_items), without waiting"""
+        with self._lock:
+            n = len(self._queue) if max_items is None else min(max_items, len(self._queue))
+            return [self._pop_locked() for _ in range(n)]
+
+    def close(self) -> None:
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._queue.clear()
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+        self.hub._remove(self)
+
+    def __enter__(self) -> 'Subscription':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            queued = len(self._queue)
+            oldest = self._queue[0].timestamp if queued else None
+        lag_frames = {topic: max(0, self.hub.last_seq(topic) - seq) for topic, seq in self.last_seq.items()}
+        return {
+            'name': self.name,
+            'pattern': self.pattern,
+            'queued': queued,
+            'maxsize': self.maxsize,
+            'lag_frames': lag_frames,  # frames published but not yet taken, per topic (drops included)
+            'lag_seconds': round(time.time() - oldest, 3) if oldest is not None else 0.0,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'age_seconds': round(time.time() - self.created_at, 1)
+        }
+
+
+class _Topic:
+    def __init__(self, name: str, history: int):
+        self.name = name
+        self.seq = 0
+        self.published = 0
+        self.last_published_at = None
+        self.subscribers: List[Subscription] = []
+        self.history: deque = deque(maxlen=history) if history else None
+
+
+class StreamHub:
+    def __init__(self, default_queue_size: int = DEFAULT_QUEUE_SIZE, max_topics: int = DEFAULT_MAX_TOPICS):
+        self.default_queue_size = default_queue_size
+        self.max_topics = max_topics
+        self._lock = threading.Lock()
+        self._topics: "OrderedDict[str, _Topic]" = OrderedDict()  # least recently published first
+        self.topics_evicted = 0
+        self._subscriptions: List[Subscription] = []
+        self._names = itertools.count(1)
+
+    def _topic_locked(self, topic: str) -> _Topic:
+        entry = self._topics.get(topic)
+        if entry is None:
+            entry = _Topic(topic, 0)
+            entry.subscribers = [sub for sub in self._subscriptions if sub.matches(topic)]
+            self._topics[topic] = entry
+            if len(self._topics) > self.max_topics:
+                self._evict_locked(entry)
+        return entry
+
+    def _evict_locked(self, keep: _Topic) -> None:
+        """
+        Forget the least recently published topic, preferring one nobody subscribes to.
+        Topics with retained history (eeg_averages, eeg_predictions) are never forgotten; a
+        forgotten topic published again starts over at seq 1 with its matching subscribers.
+        """
+        candidates = [entry for entry in self._topics.values() if entry.history is None and entry is not keep]
+        victim = next((entry for entry in candidates if not entry.subscribers), None)
+        if victim is None and candidates:
+            victim = candidates[0]
+        if victim is not None:
+            del self._topics[victim.name]
+            self.topics_evicted += 1
+            # Wildcard subscribers would otherwise remember a last seq for every topic ever seen
+            for sub in victim.subscribers:
+                with sub._lock:
+                    sub.last_seq.pop(victim.name, None)
+
+    def retain(self, topic: str, history: int) -> None:
+        """Keep the last `history` frames of a topic for subscribers that resume (see subscribe)"""
+        with self._lock:
+            entry = self._topic_locked(topic)
+            entry.history = deque(entry.history or (), maxlen=history) if history else None
+
+    def publish(self, topic: str, data: Any) -> int:
+        """Hand one frame to every matching subscriber; returns its sequence number in the topic"""
+        with self._lock:
+            entry = self._topic_locked(topic)
+            self._topics.move_to_end(topic)
+            entry.seq += 1
+            entry.published += 1
+            entry.last_published_at = time.time()
+            frame = Frame(topic, entry.seq, entry.last_published_at, data)
+            if entry.history is not None:
+                entry.history.append(frame)
+            subscribers = entry.subscribers
+        for sub in subscribers:
+            sub._offer(frame)
+        return frame.seq
+
+    def end(self, topic: str) -> None:
+        """Tell the topic's subscribers that its producer went away"""
+        self.publish(topic, None)
+
+    def subscribe(self, pattern: str, maxsize: Optional[int] = None, name: Optional[str] = None,
+                  resume_after: Optional[int] = None) -> Subscription:
+        """
+        Subscribe to every topic matching `pattern` (e.g. "biometric/*", "eeg/*/pow").
+        With resume_after, frames of the (exact) topic retained after that sequence number are queued first.
+        """
+        sub = Subscription(self, pattern, maxsize or self.default_queue_size,
+                           name or f"sub-{next(self._names)}")
+        with self._lock:
+            self._subscriptions.append(sub)
+            for entry in self._topics.values():
+                if sub.matches(entry.name):
+                    # Copy on write: publishers iterate the list without holding the lock
+                    entry.subscribers = entry.subscribers + [sub]
+            entry = self._topics.get(pattern)
+            if resume_after is not None and entry is not None and entry.history:
+                for frame in entry.history:
+                    if frame.seq > resume_after:
+                        sub._offer(frame)
+        return sub
+
+    def _remove(self, sub: Subscription) -> None:
+        with self._lock:
+            if sub in self._subscriptions:
+                self._subscriptions.remove(sub)
+            for entry in self._topics.values():
+                if sub in entry.subscribers:
+                    entry.subscribers = [s for s in entry.subscribers if s is not sub]
+
+    def last_seq(self, topic: str) -> int:
+        entry = self._topics.get(topic)
+        return entry.seq if entry is not None else 0
+
+    def history(self, topic: str) -> List[Frame]:
+        with self._lock:
+            entry = self._topics.get(topic)
+            return list(entry.history) if entry is not None and entry.history else []
+
+    def subscriber_count(self, pattern: str) -> int:
+        """Subscribers receiving frames of the topic `pattern` (or of any topic it matches)"""
+        with self._lock:
+            return sum(1 for sub in self._subscriptions
+                       if sub.matches(pattern) or fnmatch.fnmatchcase(sub.pattern, pattern))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            topics = list(self._topics.values())
+            subscriptions = list(self._subscriptions)
+        return {
+            'topics': {
+                entry.name: {
+                    'published': entry.published,
+                    'last_seq': entry.seq,
+                    'last_published_at': entry.last_published_at,
+                    'subscribers': len(entry.subscribers),
+                    'retained': len(entry.history) if entry.history is not None else 0
+                }
+                for entry in topics
+            },
+            'max_topics': self.max_topics,
+            'topics_evicted': self.topics_evicted,
+            'subscribers': [sub.stats() for sub in subscriptions],
+            'dropped_total': sum(sub.dropped for sub in subscriptions)
+        }
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub() -> StreamHub:
+    """Process-wide hub shared by the Flask app, the Cortex session pool and the collector"""
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = StreamHub()
+        return _hub
@@ -0,0 +1,226 @@
+"""
+Continuous sliding-window inference over the live pow stream
+Subscribes to the Cortex pow frames on the stream hub and keeps running
+per-band sums over the last `window_seconds`: each frame is added once and
+subtracted once when it leaves the window. Every `hop_seconds` (stream time)
+the window means go through the EEG model once, and the result is published
+to the hub topic "eeg_predictions" and kept in a short time series, so a
+prediction is available seconds after the headset starts streaming instead
+of after a full 30 s collection.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .pow_decoder import PowDecoder, DEFAULT_CHANNELS, DEFAULT_BANDS
+from .stream_hub import StreamHub, eeg_topic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SECONDS = 10.0
+DEFAULT_HOP_SECONDS = 2.0
+DEFAULT_SERIES_SIZE = 300  # predictions kept for polling (10 minutes at a 2 s hop)
+PREDICTIONS_TOPIC = 'eeg_predictions'
+# A window needs this many frames before the model is called
+MIN_WINDOW_FRAMES = 4
+# Re-sum the window from its frames this often to shed floating-point drift of the running sums
+RESUM_EVERY_FRAMES = 10000
+POLL_INTERVAL = 0.5  # seconds between stop checks while no frames arrive
+
+CHANNELS = DEFAULT_CHANNELS
+BANDS = DEFAULT_BANDS
+
+
+class SlidingWindow:
+    """Running per-band sums and value counts over the frames of the last `seconds`"""
+
+    def __init__(self, seconds: float, n_bands: int):
+        self.seconds = seconds
+        self.frames: deque = deque()  # (time, sums, counts)
+        self.total = np.zeros(n_bands)
+        self.count = np.zeros(n_bands)
+        self._since_resum = 0
+
+    def add(self, t: float, frame: np.ndarray) -> None:
+        """Add one (n_channels, n_bands) frame (NaN = missing) and evict frames older than the window"""
+        present = ~np.isnan(frame)
+        sums = np.where(present, frame, 0.0).sum(axis=0)
+        counts = present.sum(axis=0)
+        self.frames.append((t, sums, counts))
+        self.total += sums
+        self.count += counts
+
+        cutoff = t - self.seconds
+        while self.frames and self.frames[0][0] <= cutoff:
+            _, old_sums, old_counts = self.frames.popleft()
+            self.total -= old_sums
+            self.count -= old_counts
+
+        self._since_resum += 1
+        if self._since_resum >= RESUM_EVERY_FRAMES:
+            self._since_resum = 0
+            self.total = np.sum([f[1] for f in self.frames], axis=0)
+            self.count = np.sum([f[2] for f in self.frames], axis=0)
+
+    def means(self) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 0, self.total / np.maximum(self.count, 1), np.nan)
+
+    def clear(self) -> None:
+        self.frames.clear()
+        self.total[:] = 0.0
+        self.count[:] = 0.0
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+
+class StreamingPredictor:
+    """
+    Runs predict_fn({band: mean}) -> {'primary_prediction', 'confidence_scores', ...}
+    once per hop over a sliding window of the live pow stream.
+    """
+
+    def __init__(self, hub: StreamHub, predict_fn: Callable[[Dict[str, float]], Dict],
+                 window_seconds: float = DEFAULT_WINDOW_SECONDS, hop_seconds: float = DEFAULT_HOP_SECONDS,
+                 series_size: int = DEFAULT_SERIES_SIZE, source: str = eeg_topic("*", "pow"),
+                 topic: str = PREDICTIONS_TOPIC):
+        if hop_seconds <= 0 or window_seconds <= 0:
+            raise ValueError("window_seconds and hop_seconds must be positive")
+        self.hub = hub
+        self.predict_fn = predict_fn
+        self.window_seconds = window_seconds
+        self.hop_seconds = hop_seconds
+        self.source = source
+        self.topic = topic
+        hub.retain(topic, series_size)
+
+        self.decoder = PowDecoder(channels=CHANNELS, bands=BANDS)
+        self.window = SlidingWindow(window_seconds, len(BANDS))
+        self._next_hop = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._subscription = None
+
+        self.started_at = None
+        self.frames = 0
+        self.predictions = 0
+        self.skipped_hops = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_predict_ms = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, cols: Optional[List[str]] = None) -> None:
+        """Start consuming (no-op if running); `cols` is the pow subscription header, when known"""
+        with self._lock:
+            if self.running:
+                return
+            try:
+                self.decoder = PowDecoder(cols or None, channels=CHANNELS, bands=BANDS)
+            except ValueError as e:
+                logger.warning(f"[Streaming Inference] Ignoring pow cols header ({e}); assuming channel-major frames")
+                self.decoder = PowDecoder(channels=CHANNELS, bands=BANDS)
+            self._stop.clear()
+            self.window.clear()
+            self._next_hop = None
+            self.started_at = time.time()
+            self._subscription = self.hub.subscribe(self.source, name="streaming-inference")
+            self._thread = threading.Thread(target=self._run, name="eeg-streaming-inference", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            thread = self._thread
+            self._stop.set()
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        subscription = self._subscription
+        try:
+            while not self._stop.is_set():
+                frame = subscription.get(POLL_INTERVAL)
+                if frame is None:
+                    continue
+                for item in [frame] + subscription.drain():
+                    if item.is_end:
+                        # Connection lost: frames after a reconnect start a new window
+                        self.window.clear()
+                        self._next_hop = None
+                        continue
+                    self._on_message(item.data, item.timestamp)
+        finally:
+            subscription.close()
+
+    def _on_message(self, message, received_at: float) -> None:
+        values = self.decoder.decode(message)
+        if values is None:
+            return
+        frame = self.decoder.project(values, CHANNELS).astype(np.float64)
+        t = message.get("time") if isinstance(message, dict) else None
+        t = float(t) if isinstance(t, (int, float)) else received_at
+
+        self.window.add(t, frame)
+        self.frames += 1
+        if self._next_hop is None:
+            self._next_hop = t + self.hop_seconds
+        if t < self._next_hop:
+            return
+        # Hop completed (skip ahead if the stream jumped over several hops)
+        missed = int((t - self._next_hop) // self.hop_seconds)
+        self._next_hop += (missed + 1) * self.hop_seconds
+        self._predict(t)
+
+    def _predict(self, t: float) -> None:
+        means = self.window.means()
+        if len(self.window) < MIN_WINDOW_FRAMES or np.isnan(means).any():
+            self.skipped_hops += 1
+            return
+        bands = {band: float(v) for band, v in zip(BANDS, means)}
+        started = time.perf_counter()
+        try:
+            result = self.predict_fn(bands)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+            logger.warning(f"[Streaming Inference] Prediction failed: {e}")
+            return
+        self.last_predict_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.predictions += 1
+        self.hub.publish(self.topic, {
+            'time': t,
+            'window_seconds': self.window_seconds,
+            'frames': len(self.window),
+            'bands': bands,
+            'primary_prediction': result.get('primary_prediction'),
+            'confidence_scores': result.get('confidence_scores', [])
+        })
+
+    def series(self, since: int = 0) -> List[Dict]:
+        """Predictions with a sequence number above `since`, oldest first"""
+        return [dict(frame.data, seq=frame.seq) for frame in self.hub.history(self.topic) if frame.seq > since]
+
+    def stats(self) -> Dict:
+        return {
+            'running': self.running,
+            'window_seconds': self.window_seconds,
+            'hop_seconds': self.hop_seconds,
+            'started_at': self.started_at,
+            'frames': self.frames,
+            'window_frames': len(self.window),
+            'predictions': self.predictions,
+            'skipped_hops': self.skipped_hops,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'last_predict_ms': self.last_predict_ms,
+            'subscription': self._subscription.stats() if self._subscription is not None else None
+        }
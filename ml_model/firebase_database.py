@@ -11,6 +11,9 @@ import hashlib
 import os
 import json
 
+from query_cache import QueryCache
+from pagination import decode_page_token, split_page
+
 # Try to load Firebase config
 try:
     from firebase_config import FIREBASE_CONFIG
@@ -21,6 +24,26 @@ except ImportError:
 _db = None
 _app = None
 
+# Read-through caches of the dashboard queries, invalidated by the writes below
+# (PATIENT_CACHE_SIZE / REPORT_CACHE_SIZE = 0 disables them)
+_patients_cache = QueryCache(
+    'patients',
+    maxsize=int(os.getenv('PATIENT_CACHE_SIZE', '512')),
+    ttl=float(os.getenv('PATIENT_CACHE_TTL', '60'))
+)
+_reports_cache = QueryCache(
+    'reports',
+    maxsize=int(os.getenv('REPORT_CACHE_SIZE', '256')),
+    ttl=float(os.getenv('REPORT_CACHE_TTL', '60'))
+)
+
+def get_cache_stats() -> Dict:
+    """Hit/miss counters and Firestore document reads saved by the query caches"""
+    return {
+        'patients': _patients_cache.stats(),
+        'reports': _reports_cache.stats()
+    }
+
 def initialize_firebase():
     """Initialize Firebase Admin SDK - Only uses explicit service account, no default credentials"""
     global _db, _app
@@ -141,21 +164,25 @@ def verify_doctor(email: str, password: str) -> Tuple[bool, str, Optional[Dict]]
     except Exception as e:
         return False, f"Error verifying doctor: {str(e)}", None
 
+def fetch_doctor_by_id(doctor_id: str) -> Optional[Dict]:
+    """Get doctor by ID; None if there is no such doctor, raises on Firestore errors"""
+    db = get_db()
+    doctor_doc = db.collection('doctors').document(doctor_id).get()
+    
+    if doctor_doc.exists:
+        data = doctor_doc.to_dict()
+        return {
+            'id': doctor_doc.id,
+            'email': data.get('email'),
+            'name': data.get('name'),
+            'license_number': data.get('license_number')
+        }
+    return None
+
 def get_doctor_by_id(doctor_id: str) -> Optional[Dict]:
     """Get doctor by ID"""
     try:
-        db = get_db()
-        doctor_doc = db.collection('doctors').document(doctor_id).get()
-        
-        if doctor_doc.exists:
-            data = doctor_doc.to_dict()
-            return {
-                'id': doctor_doc.id,
-                'email': data.get('email'),
-                'name': data.get('name'),
-                'license_number': data.get('license_number')
-            }
-        return None
+        return fetch_doctor_by_id(doctor_id)
     except Exception as e:
         print(f"Error getting doctor: {e}")
         return None
@@ -224,6 +251,7 @@ def create_patient(patient_id: str, doctor_id: str, name: str = None, age: int =
             # Update the document if there's data to update
             if update_data:
                 doc_ref.update(update_data)
+                _patients_cache.invalidate(doctor_id)
                 print(f"✅ Updated existing patient {patient_id} for doctor_id: {doctor_id} with data: {update_data}")
                 # Return updated data
                 updated_data = {**data, **update_data}
@@ -272,6 +300,7 @@ def create_patient(patient_id: str, doctor_id: str, name: str = None, age: int =
         }
         
         doc_ref = patients_ref.add(patient_data)[1]
+        _patients_cache.invalidate(doctor_id)
         
         print(f"✅ Created new patient {patient_id} for doctor_id: {doctor_id}")
         return True, "Patient created successfully", {
@@ -319,6 +348,7 @@ def update_patient(patient_id: str, doctor_id: str, name: str = None, age: int =
         
         if update_data:
             doc_ref.update(update_data)
+            _patients_cache.invalidate(doctor_id)
             print(f"✅ Updated patient {patient_id} for doctor_id: {doctor_id} with data: {update_data}")
             return True, "Patient updated successfully"
         else:
@@ -362,53 +392,90 @@ def get_patient_by_id(patient_id: str, doctor_id: str) -> Optional[Dict]:
         print(f"❌ Error getting patient {patient_id} for doctor {doctor_id}: {e}")
         return None
 
+def _patient_from_doc(doc) -> Dict:
+    data = doc.to_dict()
+    return {
+        'id': doc.id,
+        'patient_id': data.get('patient_id'),
+        'doctor_id': data.get('doctor_id'),
+        'name': data.get('name') or None,  # Ensure None instead of empty string
+        'age': data.get('age') or None,    # Ensure None instead of 0 or empty
+        'gender': data.get('gender') or None,
+        'created_at': data.get('created_at')
+    }
+
+def _load_all_patients(doctor_id: str) -> List[Dict]:
+    """Query all patients of a doctor, newest first (raises on Firestore errors)"""
+    db = get_db()
+    patients_ref = db.collection('patients')
+    
+    # Optimized query: Filter ONLY by doctor_id (most efficient query)
+    # Using limit() is not needed here as we want all patients for the doctor
+    query = patients_ref.where('doctor_id', '==', doctor_id)
+    docs = list(query.stream())  # Convert to list once for better performance
+    
+    # Security check: ensure patient belongs to this doctor
+    patients = [_patient_from_doc(doc) for doc in docs]
+    patients = [p for p in patients if str(p['doctor_id'] or '') == doctor_id]
+    
+    # Sort by created_at in descending order (newest first) - done in Python
+    if patients:
+        try:
+            patients.sort(key=lambda x: x.get('created_at') or '', reverse=True)
+        except Exception:
+            # If sorting fails, return as-is
+            pass
+    
+    print(f"✅ Retrieved {len(patients)} patients for doctor_id: {doctor_id}")
+    return patients
+
+def _load_patients_page(doctor_id: str, limit: int, cursor: Optional[Tuple]) -> List[Dict]:
+    """
+    Up to limit + 1 patients of a doctor after `cursor` (created_at, doc id), newest first.
+    Ordered and bounded by Firestore; needs the composite index
+    patients: doctor_id ASC, created_at DESC, __name__ DESC.
+    """
+    db = get_db()
+    query = (db.collection('patients')
+             .where('doctor_id', '==', doctor_id)
+             .order_by('created_at', direction=Query.DESCENDING)
+             .order_by('__name__', direction=Query.DESCENDING))  # document id tie-breaker
+    if cursor is not None:
+        query = query.start_after({'created_at': cursor[0], '__name__': cursor[1]})
+    patients = [_patient_from_doc(doc) for doc in query.limit(limit + 1).stream()]
+    print(f"✅ Retrieved page of {min(len(patients), limit)} patients for doctor_id: {doctor_id}")
+    return patients
+
 def get_all_patients(doctor_id: str) -> List[Dict]:
-    """Get all patients for a doctor - ONLY returns patients belonging to this doctor (OPTIMIZED)"""
+    """Get all patients for a doctor - ONLY returns patients belonging to this doctor (cached)"""
     try:
         # Ensure doctor_id is a string for consistent comparison
         doctor_id = str(doctor_id)
-        
-        db = get_db()
-        patients_ref = db.collection('patients')
-        
-        # Optimized query: Filter ONLY by doctor_id (most efficient query)
-        # Using limit() is not needed here as we want all patients for the doctor
-        query = patients_ref.where('doctor_id', '==', doctor_id)
-        docs = list(query.stream())  # Convert to list once for better performance
-        
-        patients = []
-        for doc in docs:
-            data = doc.to_dict()
-            
-            # Security check: ensure patient belongs to this doctor
-            patient_doctor_id = str(data.get('doctor_id', ''))
-            if patient_doctor_id == doctor_id:
-                patients.append({
-                    'id': doc.id,
-                    'patient_id': data.get('patient_id'),
-                    'doctor_id': data.get('doctor_id'),
-                    'name': data.get('name') or None,  # Ensure None instead of empty string
-                    'age': data.get('age') or None,    # Ensure None instead of 0 or empty
-                    'gender': data.get('gender') or None,
-                    'created_at': data.get('created_at')
-                })
-        
-        # Sort by created_at in descending order (newest first) - done in Python
-        if patients:
-            try:
-                patients.sort(key=lambda x: x.get('created_at') or '', reverse=True)
-            except Exception:
-                # If sorting fails, return as-is
-                pass
-        
-        print(f"✅ Retrieved {len(patients)} patients for doctor_id: {doctor_id}")
-        return patients
+        return _patients_cache.get_or_load(doctor_id, lambda: _load_all_patients(doctor_id))
     except Exception as e:
         print(f"❌ Error getting patients for doctor {doctor_id}: {e}")
         import traceback
         traceback.print_exc()
         return []
 
+def get_patients_page(doctor_id: str, limit: int, page_token: str = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of a doctor's patients, newest first, and the token of the next page
+    (None on the last page). Raises ValueError for an invalid page_token.
+    """
+    doctor_id = str(doctor_id)
+    cursor = decode_page_token(page_token) if page_token else None
+    try:
+        patients = _patients_cache.get_or_load(
+            doctor_id, lambda: _load_patients_page(doctor_id, limit, cursor), variant=(limit, page_token)
+        )
+    except Exception as e:
+        print(f"❌ Error getting patients page for doctor {doctor_id}: {e}")
+        import traceback
+        traceback.print_exc()
+        return [], None
+    return split_page(patients, limit, 'created_at')
+
 # ==================== TEST REPORT OPERATIONS ====================
 
 def save_test_report(patient_id: str, doctor_id: str, eeg_data: Dict, biometric_data: Dict,
@@ -435,11 +502,13 @@ def save_test_report(patient_id: str, doctor_id: str, eeg_data: Dict, biometric_
             'biometric_prediction': biometric_prediction,
             'combined_prediction': combined_prediction.get('primary_prediction', ''),
             'combined_confidence_scores': combined_prediction.get('confidence_scores', []),
+            'combined_top_confidence': top_confidence(combined_prediction.get('confidence_scores')),
             'conflict_analysis': combined_prediction.get('conflict_analysis', {}),
             'report_data': combined_prediction
         }
         
         doc_ref = reports_ref.add(report_data)[1]
+        _reports_cache.invalidate((doctor_id, patient_id))
         report_id = doc_ref.id
         
         print(f"✅ Saved report {report_id} for patient {patient_id} by doctor_id: {doctor_id}")
@@ -452,55 +521,188 @@ def save_test_report(patient_id: str, doctor_id: str, eeg_data: Dict, biometric_
         print(f"❌ Error saving report for patient {patient_id} by doctor {doctor_id}: {e}")
         return False, f"Error saving report: {str(e)}", None
 
-def get_patient_reports(patient_id: str, doctor_id: str) -> List[Dict]:
-    """Get all reports for a patient - ONLY returns reports belonging to this doctor (OPTIMIZED)"""
+# List-view fields of a report (Firestore field mask): date, predictions and conflict flag,
+# without the confidence score lists and the duplicated report_data blob.
+# Reports saved before combined_top_confidence need backfill_report_top_confidence() once.
+REPORT_SUMMARY_FIELDS = [
+    'patient_id', 'doctor_id', 'test_date', 'combined_prediction', 'combined_top_confidence',
+    'eeg_prediction.primary_prediction', 'biometric_prediction.primary_prediction',
+    'conflict_analysis.has_conflict', 'conflict_analysis.severity', 'report_data.primary_prediction'
+]
+
+def top_confidence(confidence_scores) -> Optional[float]:
+    """Confidence of the primary prediction (first entry of a confidence score list)"""
+    if not confidence_scores:
+        return None
+    first = confidence_scores[0]
+    return first.get('confidence') if isinstance(first, dict) else first
+
+def _report_summary_from_doc(doc) -> Dict:
+    data = doc.to_dict()
+    return {
+        'id': doc.id,
+        'patient_id': data.get('patient_id'),
+        'doctor_id': data.get('doctor_id'),
+        'test_date': data.get('test_date'),
+        'combined_prediction': data.get('combined_prediction'),
+        'combined_top_confidence': data.get('combined_top_confidence'),
+        # Nested masks keep the full report's shape, holding only the projected keys
+        'eeg_prediction': data.get('eeg_prediction'),
+        'biometric_prediction': data.get('biometric_prediction'),
+        'conflict_analysis': data.get('conflict_analysis', {}),
+        'report_data': data.get('report_data')
+    }
+
+def backfill_report_top_confidence(page_size: int = 400) -> int:
+    """
+    One-off migration: write combined_top_confidence on reports saved before it existed,
+    so the summary queries can leave combined_confidence_scores out of their field mask.
+    Safe to re-run; returns the number of reports updated.
+    """
+    db = get_db()
+    query = (db.collection('test_reports')
+             .select(['combined_top_confidence', 'combined_confidence_scores'])
+             .order_by('__name__')
+             .limit(page_size))
+    updated = 0
+    last_doc = None
+    while True:
+        page = query.start_after(last_doc) if last_doc is not None else query
+        docs = list(page.stream())
+        if not docs:
+            break
+        batch = db.batch()
+        pending = 0
+        for doc in docs:
+            data = doc.to_dict()
+            if 'combined_top_confidence' not in data:
+                # None when the report has no scores, so a re-run skips it too
+                batch.update(doc.reference, {
+                    'combined_top_confidence': top_confidence(data.get('combined_confidence_scores'))
+                })
+                pending += 1
+        if pending:
+            batch.commit()
+            updated += pending
+        last_doc = docs[-1]
+    if updated:
+        _reports_cache.clear()
+    print(f"✅ Backfilled combined_top_confidence on {updated} report(s)")
+    return updated
+
+def _report_from_doc(doc) -> Dict:
+    data = doc.to_dict()
+    return {
+        'id': doc.id,
+        'patient_id': data.get('patient_id'),
+        'doctor_id': data.get('doctor_id'),
+        'test_date': data.get('test_date'),
+        'eeg_prediction': data.get('eeg_prediction'),
+        'biometric_prediction': data.get('biometric_prediction'),
+        'combined_prediction': data.get('combined_prediction'),
+        'combined_confidence_scores': data.get('combined_confidence_scores', []),
+        'conflict_analysis': data.get('conflict_analysis', {}),
+        'report_data': data.get('report_data')
+    }
+
+def _load_patient_reports(patient_id: str, doctor_id: str, summary: bool = False) -> List[Dict]:
+    """
+    Query all reports of a patient by this doctor, newest first (raises on Firestore errors).
+    With summary=True only REPORT_SUMMARY_FIELDS are fetched and returned.
+    """
+    db = get_db()
+    reports_ref = db.collection('test_reports')
+    
+    # Optimized query: Filter by BOTH patient_id AND doctor_id
+    # Convert stream to list once for better performance
+    query = reports_ref.where('patient_id', '==', patient_id).where('doctor_id', '==', doctor_id)
+    if summary:
+        query = query.select(REPORT_SUMMARY_FIELDS)
+    docs = list(query.stream())
+    
+    from_doc = _report_summary_from_doc if summary else _report_from_doc
+    reports = []
+    for doc in docs:
+        report = from_doc(doc)
+        # Security check: ensure report belongs to this doctor
+        if str(report.pop('doctor_id') or '') == doctor_id:
+            reports.append(report)
+    
+    # Sort by test_date in descending order (newest first) - done in Python
+    if reports:
+        try:
+            reports.sort(key=lambda x: x.get('test_date') or '', reverse=True)
+        except Exception:
+            # If sorting fails, return as-is
+            pass
+    
+    print(f"✅ Retrieved {len(reports)} reports for patient {patient_id} belonging to doctor_id: {doctor_id}")
+    return reports
+
+def _load_patient_reports_page(patient_id: str, doctor_id: str, limit: int, cursor: Optional[Tuple],
+                               summary: bool = False) -> List[Dict]:
+    """
+    Up to limit + 1 reports of a patient by this doctor after `cursor` (test_date, doc id), newest first.
+    Needs the composite index test_reports: patient_id ASC, doctor_id ASC, test_date DESC, __name__ DESC.
+    """
+    db = get_db()
+    query = (db.collection('test_reports')
+             .where('patient_id', '==', patient_id)
+             .where('doctor_id', '==', doctor_id)
+             .order_by('test_date', direction=Query.DESCENDING)
+             .order_by('__name__', direction=Query.DESCENDING))  # document id tie-breaker
+    if cursor is not None:
+        query = query.start_after({'test_date': cursor[0], '__name__': cursor[1]})
+    if summary:
+        query = query.select(REPORT_SUMMARY_FIELDS)
+    from_doc = _report_summary_from_doc if summary else _report_from_doc
+    reports = [from_doc(doc) for doc in query.limit(limit + 1).stream()]
+    for report in reports:
+        report.pop('doctor_id')
+    print(f"✅ Retrieved page of {min(len(reports), limit)} reports for patient {patient_id} belonging to doctor_id: {doctor_id}")
+    return reports
+
+def get_patient_reports(patient_id: str, doctor_id: str, summary: bool = False) -> List[Dict]:
+    """
+    Get all reports for a patient - ONLY returns reports belonging to this doctor (cached).
+    summary=True returns list-view fields only (see REPORT_SUMMARY_FIELDS); get_report_by_id has the rest.
+    """
     try:
         # Ensure both IDs are strings for consistent comparison
         patient_id = str(patient_id)
         doctor_id = str(doctor_id)
-        
-        db = get_db()
-        reports_ref = db.collection('test_reports')
-        
-        # Optimized query: Filter by BOTH patient_id AND doctor_id
-        # Convert stream to list once for better performance
-        query = reports_ref.where('patient_id', '==', patient_id).where('doctor_id', '==', doctor_id)
-        docs = list(query.stream())
-        
-        reports = []
-        for doc in docs:
-            data = doc.to_dict()
-            # Security check: ensure report belongs to this doctor
-            report_doctor_id = str(data.get('doctor_id', ''))
-            if report_doctor_id == doctor_id:
-                reports.append({
-                    'id': doc.id,
-                    'patient_id': data.get('patient_id'),
-                    'test_date': data.get('test_date'),
-                    'eeg_prediction': data.get('eeg_prediction'),
-                    'biometric_prediction': data.get('biometric_prediction'),
-                    'combined_prediction': data.get('combined_prediction'),
-                    'combined_confidence_scores': data.get('combined_confidence_scores', []),
-                    'conflict_analysis': data.get('conflict_analysis', {}),
-                    'report_data': data.get('report_data')
-                })
-        
-        # Sort by test_date in descending order (newest first) - done in Python
-        if reports:
-            try:
-                reports.sort(key=lambda x: x.get('test_date') or '', reverse=True)
-            except Exception:
-                # If sorting fails, return as-is
-                pass
-        
-        print(f"✅ Retrieved {len(reports)} reports for patient {patient_id} belonging to doctor_id: {doctor_id}")
-        return reports
+        return _reports_cache.get_or_load(
+            (doctor_id, patient_id), lambda: _load_patient_reports(patient_id, doctor_id, summary),
+            variant=('summary',) if summary else None
+        )
     except Exception as e:
         print(f"❌ Error getting reports for patient {patient_id} for doctor {doctor_id}: {e}")
         import traceback
         traceback.print_exc()
         return []
 
+def get_patient_reports_page(patient_id: str, doctor_id: str, limit: int, page_token: str = None,
+                             summary: bool = False) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of a patient's reports (list-view fields only with summary=True), newest first,
+    and the token of the next page (None on the last page). Raises ValueError for an invalid page_token.
+    """
+    patient_id = str(patient_id)
+    doctor_id = str(doctor_id)
+    cursor = decode_page_token(page_token) if page_token else None
+    try:
+        reports = _reports_cache.get_or_load(
+            (doctor_id, patient_id),
+            lambda: _load_patient_reports_page(patient_id, doctor_id, limit, cursor, summary),
+            variant=(limit, page_token, summary)
+        )
+    except Exception as e:
+        print(f"❌ Error getting reports page for patient {patient_id} for doctor {doctor_id}: {e}")
+        import traceback
+        traceback.print_exc()
+        return [], None
+    return split_page(reports, limit, 'test_date')
+
 def get_report_by_id(report_id: str, doctor_id: str) -> Optional[Dict]:
     """Get a specific report by ID"""
     try:
@@ -561,12 +763,17 @@ def delete_patient(patient_id: str, doctor_id: str) -> Tuple[bool, str]:
         reports_docs = list(reports_query.stream())
         
         deleted_reports_count = 0
-        for report_doc in reports_docs:
-            report_doc.reference.delete()
-            deleted_reports_count += 1
-        
-        # Delete patient document
-        patient_doc.reference.delete()
+        try:
+            for report_doc in reports_docs:
+                report_doc.reference.delete()
+                deleted_reports_count += 1
+            
+            # Delete patient document
+            patient_doc.reference.delete()
+        finally:
+            # Also after a partial delete: the cached lists no longer match Firestore
+            _reports_cache.invalidate((doctor_id, patient_id))
+            _patients_cache.invalidate(doctor_id)
         
         print(f"✅ Deleted patient {patient_id} (doc_id: {patient_doc_id}) and {deleted_reports_count} report(s) for doctor_id: {doctor_id}")
         return True, f"Patient {patient_id} and {deleted_reports_count} report(s) deleted successfully"
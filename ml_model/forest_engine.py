@@ -0,0 +1,114 @@
+"""
+Flattened RandomForest evaluator
+Exports a fitted sklearn RandomForestClassifier once into contiguous NumPy node
+arrays and evaluates every tree with vectorized traversal. Probabilities are
+bit-identical to forest.predict_proba, without sklearn's per-call validation
+and joblib dispatch overhead (which dominates for single-row predictions).
+"""
+import numpy as np
+
+# Inference engines selectable in load_models()
+ENGINE_SKLEARN = 'sklearn'
+ENGINE_FLAT = 'flat'
+AVAILABLE_ENGINES = (ENGINE_SKLEARN, ENGINE_FLAT)
+
+_TREE_LEAF = -1
+
+
+class FlatForest:
+    """
+    Read-only, array-backed copy of a fitted RandomForestClassifier.
+    Exposes predict_proba(X) with the same output as the sklearn model.
+    """
+
+    def __init__(self, forest):
+        estimators = getattr(forest, 'estimators_', None)
+        if not estimators:
+            raise ValueError("Forest is not fitted")
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests are supported")
+
+        self.n_features_in_ = forest.n_features_in_
+        self.classes_ = forest.classes_
+        self.n_classes = len(forest.classes_)
+        self.n_trees = len(estimators)
+
+        features, thresholds, children, leaf_proba, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in estimators:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes, dtype=np.intp)
+            is_leaf = tree.children_left == _TREE_LEAF
+
+            # Leaves loop back to themselves so a fixed number of steps is safe
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            children.append(np.stack([left, right], axis=1))
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :self.n_classes].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            leaf_proba.append(proba / normalizer)
+
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        self.feature = np.ascontiguousarray(np.concatenate(features), dtype=np.intp)
+        self.threshold = np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64)
+        self.children = np.ascontiguousarray(np.concatenate(children), dtype=np.intp)
+        self.leaf_proba = np.ascontiguousarray(np.concatenate(leaf_proba))
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max_depth
+        self.node_count = offset
+
+    def apply(self, X) -> np.ndarray:
+        """Return the leaf node index (in the flat arrays) per tree and sample, shape (n_trees, n_samples)"""
+        # sklearn casts inputs to float32 before comparing against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, forest expects {self.n_features_in_}")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity")
+
+        n_samples = X.shape[0]
+        rows = np.arange(n_samples)[np.newaxis, :]
+        nodes = np.repeat(self.roots[:, np.newaxis], n_samples, axis=1)
+
+        for _ in range(self.max_depth):
+            go_right = ~(X[rows, self.feature[nodes]] <= self.threshold[nodes])
+            nodes = self.children[nodes, go_right.astype(np.intp)]
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities averaged over trees, shape (n_samples, n_classes)"""
+        per_tree = self.leaf_proba[self.apply(X)]
+        # cumsum adds trees strictly in order, matching sklearn's sequential accumulation
+        proba = np.cumsum(per_tree, axis=0)[-1]
+        proba /= self.n_trees
+        return proba
+
+
+def build_engine(model, engine: str = ENGINE_SKLEARN):
+    """
+    Return an object with predict_proba for the requested engine.
+    Falls back to the sklearn model if the forest cannot be flattened.
+    """
+    if model is None or engine == ENGINE_SKLEARN:
+        return model
+    if engine != ENGINE_FLAT:
+        raise ValueError(f"Unknown inference engine '{engine}', expected one of {AVAILABLE_ENGINES}")
+    try:
+        return FlatForest(model)
+    except (AttributeError, ValueError) as e:
+        print(f"⚠️ Could not flatten {type(model).__name__} ({e}), using sklearn predict_proba")
+        return model
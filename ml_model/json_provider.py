@@ -0,0 +1,24 @@
+"""
+Flask JSON provider backed by eeg_realtime.json_codec
+jsonify()/request.get_json() go through orjson when it is installed, and NumPy
+scalars/arrays in response payloads serialise directly. Types the codec does
+not know (dates, Decimal, UUID, dataclasses) fall back to Flask's handling.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+from eeg_realtime import json_codec
+
+
+class CodecJSONProvider(DefaultJSONProvider):
+    # Clients do not depend on key order; skipping the sort keeps large reports cheap
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs.get('indent') is not None:
+            # Pretty-printed output (JSONIFY_PRETTYPRINT / debug): keep the stdlib formatting
+            kwargs.setdefault('default', json_codec.chain_default(self.default))
+            return super().dumps(obj, **kwargs)
+        return json_codec.dumps(obj, default=self.default, sort_keys=kwargs.get('sort_keys', self.sort_keys))
+
+    def loads(self, s, **kwargs):
+        return json_codec.loads(s)
@@ -0,0 +1,125 @@
+"""
+Micro-batching scheduler for concurrent predictions
+Feature rows submitted from concurrent request threads are queued for up to
+max_wait_ms (or until max_batch_size rows are waiting), scored with one
+vectorized model call, and each caller's Future is resolved with its own row.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Collects single rows into batches for batch_fn.
+    batch_fn takes an (N, n_features) array and returns an (N, ...) array.
+    """
+
+    def __init__(self, batch_fn: Callable[[np.ndarray], np.ndarray], name: str = 'batcher',
+                 max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.batch_fn = batch_fn
+        self.name = name
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        # Metrics
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_seen = 0
+        self.last_batch_size = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.errors = 0
+
+    def _ensure_worker(self):
+        # Started lazily so forking servers (gunicorn --preload) get a live thread per worker
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name=f"{self.name}-micro-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def submit(self, row) -> Future:
+        """Queue one feature row; the Future resolves to that row's model output"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((np.asarray(row, dtype=np.float64), future, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            with self._stats_lock:
+                self.max_queue_depth = max(self.max_queue_depth, depth)
+        return future
+
+    def _collect_batch(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # Take whatever is already waiting without blocking
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+            futures = [item[1] for item in batch]
+            try:
+                outputs = self.batch_fn(np.vstack([item[0] for item in batch]))
+                for i, future in enumerate(futures):
+                    future.set_result(outputs[i])
+            except Exception as e:
+                with self._stats_lock:
+                    self.errors += 1
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+            waits = [started - item[2] for item in batch]
+            with self._stats_lock:
+                self.batches += 1
+                self.rows += len(batch)
+                self.last_batch_size = len(batch)
+                self.max_batch_seen = max(self.max_batch_seen, len(batch))
+                self.total_wait += sum(waits)
+                self.max_wait_seen = max(self.max_wait_seen, max(waits))
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                'name': self.name,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'batches': self.batches,
+                'rows': self.rows,
+                'last_batch_size': self.last_batch_size,
+                'max_batch_size_seen': self.max_batch_seen,
+                'mean_batch_size': round(self.rows / self.batches, 2) if self.batches else 0.0,
+                'mean_wait_ms': round(self.total_wait / self.rows * 1000, 3) if self.rows else 0.0,
+                'max_wait_ms_seen': round(self.max_wait_seen * 1000, 3),
+                'errors': self.errors
+            }
@@ -0,0 +1,53 @@
+"""
+Keyset (cursor) pagination helpers shared by the Firestore and SQLite backends
+Listings are ordered newest first by a sort field (created_at / test_date)
+with the document id as tie-breaker. A page token is the opaque base64url
+form of the last returned item's [sort value, id]; the next page starts
+strictly after it, so each page costs one bounded, index-ordered query
+however deep the listing is, and inserts between requests never shift pages.
+"""
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_page_token(sort_value: Any, item_id: Any) -> str:
+    raw = json.dumps([sort_value, item_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_page_token(token: str) -> Tuple[Any, Any]:
+    """(sort value, id) of a page token; raises ValueError for anything we did not issue"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value = json.loads(raw)
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid page_token")
+    if not isinstance(value, list) or len(value) != 2 or value[1] is None:
+        raise ValueError("Invalid page_token")
+    return value[0], value[1]
+
+
+def parse_page_size(value: Optional[str]) -> int:
+    """?limit= value -> page size in 1..MAX_PAGE_SIZE (DEFAULT_PAGE_SIZE when absent)"""
+    if value is None or value == '':
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def split_page(items: List[Dict], limit: int, sort_field: str) -> Tuple[List[Dict], Optional[str]]:
+    """Page and next-page token from the up to limit + 1 items a page query fetched"""
+    if len(items) <= limit:
+        return items, None
+    page = items[:limit]
+    last = page[-1]
+    return page, encode_page_token(last.get(sort_field), last.get('id'))
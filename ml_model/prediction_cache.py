@@ -0,0 +1,77 @@
+"""
+Quantized LRU prediction cache
+Repeated EEG/biometric inputs (Arduino re-posts, frontend re-sends of the same
+averages) are answered from memory. Keys are the feature vector rounded to a
+configurable number of decimals plus the model version, so reloading models
+never serves stale results.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional
+
+
+class PredictionCache:
+    """Thread-safe bounded LRU cache with hit/miss/eviction counters"""
+
+    def __init__(self, maxsize: int = 1024, decimals: int = 2):
+        self.maxsize = max(0, int(maxsize))
+        self.decimals = int(decimals)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def make_key(self, kind: str, model_version: int, features: Iterable[float]) -> Hashable:
+        """Build a cache key from the model kind, model version and quantized features"""
+        # + 0.0 folds -0.0 into 0.0 so both round to the same key
+        return (kind, model_version) + tuple(round(float(v), self.decimals) + 0.0 for v in features)
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        """Return the cached result (shared, treat as read-only) or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: Hashable, result: Dict) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        """Drop every entry (called whenever models are reloaded)"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'decimals': self.decimals,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,122 @@
+"""
+Read-through TTL cache for Firestore query results
+Used by firebase_database.py for the per-doctor patient list and the
+per-patient report list, which the dashboard re-reads on every refresh.
+Entries are keyed by (scope, variant): the scope is what a write touches
+(a doctor's patients, a patient's reports) and the variant tells apart the
+full list and its pages. Entries expire after `ttl` seconds (writes made by
+other workers/nodes become visible within that time) and the least recently
+used are evicted beyond `maxsize`; writes in this process invalidate their
+whole scope immediately. Each entry remembers how many documents the query
+streamed, so stats() can report the Firestore document reads saved.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Set
+
+DEFAULT_MAXSIZE = 512
+DEFAULT_TTL = 60.0  # seconds
+
+
+class QueryCache:
+    """Thread-safe bounded LRU of query key -> list of documents (dicts), with expiry"""
+
+    def __init__(self, name: str, maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL):
+        self.name = name
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (scope, variant) -> (expires_at, documents)
+        self._scopes: Dict[Hashable, Set] = {}  # scope -> its cached variants
+        self._lock = threading.Lock()
+        # Bumped by every invalidation: a load that overlapped one is not stored, since it may predate the write
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.documents_loaded = 0
+        self.documents_saved = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def _drop_locked(self, key) -> None:
+        del self._entries[key]
+        variants = self._scopes.get(key[0])
+        if variants is not None:
+            variants.discard(key[1])
+            if not variants:
+                del self._scopes[key[0]]
+
+    def get_or_load(self, scope: Hashable, loader: Callable[[], List[Dict]], variant: Hashable = None) -> List[Dict]:
+        """Cached documents for (scope, variant), else loader() (exceptions propagate and are not cached)"""
+        if not self.enabled:
+            return loader()
+        key = (scope, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._drop_locked(key)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.documents_saved += len(entry[1])
+                documents = entry[1]
+            else:
+                self.misses += 1
+                epoch = self._epoch
+                documents = None
+        if documents is not None:
+            # Callers may edit the dicts they get back; the cached copies stay untouched
+            return [dict(doc) for doc in documents]
+
+        documents = loader()
+        with self._lock:
+            self.documents_loaded += len(documents)
+            if epoch == self._epoch:
+                self._entries[key] = (time.monotonic() + self.ttl, [dict(doc) for doc in documents])
+                self._entries.move_to_end(key)
+                self._scopes.setdefault(scope, set()).add(variant)
+                while len(self._entries) > self.maxsize:
+                    self._drop_locked(next(iter(self._entries)))
+                    self.evictions += 1
+        return documents
+
+    def invalidate(self, scope: Hashable) -> None:
+        """Drop every cached variant (full list and pages) of a scope"""
+        with self._lock:
+            self._epoch += 1
+            variants = self._scopes.pop(scope, ())
+            for variant in variants:
+                del self._entries[(scope, variant)]
+            if variants:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._scopes.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'documents_loaded': self.documents_loaded,
+                'document_reads_saved': self.documents_saved
+            }
@@ -43,6 +43,7 @@ const Header = () => {
     
     localStorage.removeItem('isDoctorLoggedIn');
     localStorage.removeItem('doctor');
+    localStorage.removeItem('doctorToken');
     setIsDoctorLoggedIn(false);
     setDoctor(null);
     
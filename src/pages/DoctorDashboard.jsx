@@ -64,10 +64,31 @@ const DoctorDashboard = () => {
     if (doctor.id) {
       headers['X-Doctor-Id'] = doctor.id.toString();
     }
+    const token = localStorage.getItem('doctorToken');
+    if (token) {
+      headers['Authorization'] = `Bearer ${token}`;
+    }
     
     return headers;
   };
 
+  // Expired or rejected login: clear it and send the doctor back to the login page
+  const handleUnauthorized = (response) => {
+    if (response.status !== 401) {
+      return false;
+    }
+    localStorage.removeItem('isDoctorLoggedIn');
+    localStorage.removeItem('doctor');
+    localStorage.removeItem('doctorToken');
+    toast.warning('Your session has expired. Please login again.', {
+      toastId: 'session-expired',
+      position: "top-right",
+      autoClose: 3000,
+    });
+    navigate('/doctor-login');
+    return true;
+  };
+
   const loadPatients = async (isRefresh = false) => {
     if (isRefresh) {
       setRefreshing(true);
@@ -98,6 +119,9 @@ const DoctorDashboard = () => {
       
       console.log('🔍 [DASHBOARD DEBUG] Response status:', response.status);
       console.log('🔍 [DASHBOARD DEBUG] Response ok:', response.ok);
+      if (handleUnauthorized(response)) {
+        return;
+      }
       
       const data = await response.json();
       
@@ -232,6 +256,9 @@ const DoctorDashboard = () => {
       });
       
       console.log('🔍 [DASHBOARD DEBUG] Reports response status:', response.status);
+      if (handleUnauthorized(response)) {
+        return;
+      }
       
       const data = await response.json();
       
@@ -480,11 +507,15 @@ const DoctorDashboard = () => {
     // Load reports for all patients in parallel
     const promises = patients.map(async (patient) => {
       try {
-        const url = `${SERVER_BASE}/api/patients/${patient.patient_id}/reports?doctor_id=${doctor.id}`;
+        // Only the latest report's list-view fields are needed here
+        const url = `${SERVER_BASE}/api/patients/${patient.patient_id}/reports?doctor_id=${doctor.id}&view=summary&limit=1`;
         const response = await fetch(url, {
           headers: getAuthHeaders(),
           credentials: 'include',
         });
+        if (handleUnauthorized(response)) {
+          return null;
+        }
         
         const data = await response.json();
         if (response.ok && data.success && data.reports && data.reports.length > 0) {
@@ -523,7 +554,7 @@ const DoctorDashboard = () => {
   };
 
   // Download latest report as PDF
-  const handleDownloadLatestReport = (patient) => {
+  const handleDownloadLatestReport = async (patient) => {
     const latestReport = patientReportsMap[patient.patient_id];
     if (!latestReport) {
       toast.warning('No reports available for this patient', {
@@ -536,7 +567,22 @@ const DoctorDashboard = () => {
       });
       return;
     }
-    downloadReport(latestReport, patient);
+    // The table holds report summaries: fetch the full report for the PDF
+    try {
+      const doctor = JSON.parse(localStorage.getItem('doctor') || '{}');
+      const response = await fetch(`${SERVER_BASE}/api/reports/${latestReport.id}?doctor_id=${doctor.id}`, {
+        headers: getAuthHeaders(),
+        credentials: 'include',
+      });
+      if (handleUnauthorized(response)) {
+        return;
+      }
+      const data = await response.json();
+      downloadReport(response.ok && data.success ? data.report : latestReport, patient);
+    } catch (err) {
+      console.error(`Error loading report ${latestReport.id}:`, err);
+      downloadReport(latestReport, patient);
+    }
   };
 
   // Delete patient
@@ -557,6 +603,9 @@ const DoctorDashboard = () => {
           ...(doctor.id && { doctor_id: doctor.id.toString() })
         })
       });
+      if (handleUnauthorized(response)) {
+        return;
+      }
       
       const data = await response.json();
       
@@ -630,7 +679,10 @@ const DoctorDashboard = () => {
       }
       
       // Calculate average confidence
-      if (report.combined_confidence_scores && report.combined_confidence_scores.length > 0) {
+      if (typeof report.combined_top_confidence === 'number') {
+        totalConfidence += report.combined_top_confidence;
+        confidenceCount++;
+      } else if (report.combined_confidence_scores && report.combined_confidence_scores.length > 0) {
         const topConfidence = typeof report.combined_confidence_scores[0] === 'object' 
           ? report.combined_confidence_scores[0].confidence 
           : report.combined_confidence_scores[0];
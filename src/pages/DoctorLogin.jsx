@@ -170,6 +170,9 @@ const DoctorLogin = () => {
         // Store doctor info in localStorage for easy access
         localStorage.setItem('doctor', JSON.stringify(data.doctor));
         localStorage.setItem('isDoctorLoggedIn', 'true');
+        if (data.token) {
+          localStorage.setItem('doctorToken', data.token);
+        }
         
         // Success notification
         toast.success(
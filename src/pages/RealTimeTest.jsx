@@ -446,6 +446,7 @@ const RealTimeTest = () => {
           headers: {
             'Content-Type': 'application/json',
             ...(doctor.id && { 'X-Doctor-Id': doctor.id.toString() }),
+            ...(localStorage.getItem('doctorToken') && { 'Authorization': `Bearer ${localStorage.getItem('doctorToken')}` }),
           },
           credentials: 'include',
           body: JSON.stringify({
@@ -521,7 +522,20 @@ const RealTimeTest = () => {
       });
       
       if (realtimeRes.ok) {
-        const realtimePayload = await realtimeRes.json();
+        let realtimePayload = await realtimeRes.json();
+        // Collection runs as a background job: poll until it finishes
+        if (realtimePayload.success && realtimePayload.job_id) {
+          const statusUrl = `${serverBase}/api/eeg/jobs/${realtimePayload.job_id}`;
+          while (realtimePayload.status === 'queued' || realtimePayload.status === 'running') {
+            await new Promise((resolve) => setTimeout(resolve, 1000));
+            const statusRes = await fetch(statusUrl);
+            if (!statusRes.ok) throw new Error(`job status ${statusRes.status}`);
+            realtimePayload = await statusRes.json();
+          }
+          if (realtimePayload.status !== 'succeeded') {
+            console.warn('[EEG Autofill] Real-time collection job ended:', realtimePayload.status, realtimePayload.message);
+          }
+        }
         if (realtimePayload.success && realtimePayload.data) {
           console.log('[EEG Autofill] Real-time collection successful!', realtimePayload.data);
           toast.success('EEG data collected automatically!', {